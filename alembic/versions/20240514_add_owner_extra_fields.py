@@ -14,19 +14,26 @@ branch_labels = None
 depends_on = None
 
 
+def _columns():
+    return [
+        sa.Column("email", sa.String(), nullable=True, unique=True),
+        sa.Column("phone", sa.String(), nullable=True),
+        sa.Column("address", sa.String(), nullable=True),
+        sa.Column("city", sa.String(), nullable=True),
+        sa.Column("state", sa.String(), nullable=True),
+        sa.Column("zip_code", sa.String(), nullable=True),
+        sa.Column("country", sa.String(), nullable=True),
+        sa.Column("date_of_birth", sa.String(), nullable=True),
+    ]
+
+
 def upgrade():
-    op.add_column(
-        "owners", sa.Column("email", sa.String(), nullable=True, unique=True)
-    )
-    op.add_column("owners", sa.Column("phone", sa.String(), nullable=True))
-    op.add_column("owners", sa.Column("address", sa.String(), nullable=True))
-    op.add_column("owners", sa.Column("city", sa.String(), nullable=True))
-    op.add_column("owners", sa.Column("state", sa.String(), nullable=True))
-    op.add_column("owners", sa.Column("zip_code", sa.String(), nullable=True))
-    op.add_column("owners", sa.Column("country", sa.String(), nullable=True))
-    op.add_column(
-        "owners", sa.Column("date_of_birth", sa.String(), nullable=True)
-    )
+    # Databases built by database.py's create_all already have the columns
+    inspector = sa.inspect(op.get_bind())
+    existing = {c["name"] for c in inspector.get_columns("owners")}
+    for column in _columns():
+        if column.name not in existing:
+            op.add_column("owners", column)
 
 
 def downgrade():
@@ -0,0 +1,49 @@
+"""
+Revision ID: 20240514_add_pet_extra_fields
+Revises: c99452ad221d
+Create Date: 2025-05-14
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "20240514_add_pet_extra_fields"
+down_revision = "c99452ad221d"
+branch_labels = None
+depends_on = None
+
+
+def _columns():
+    return [
+        sa.Column("age", sa.Integer(), nullable=True),
+        sa.Column("breed", sa.String(), nullable=True),
+        sa.Column("color", sa.String(), nullable=True),
+        sa.Column("weight", sa.Float(), nullable=True),
+        sa.Column("description", sa.String(), nullable=True),
+        sa.Column("gender", sa.String(), nullable=True),
+        sa.Column("is_vaccinated", sa.Boolean(), nullable=True),
+        sa.Column("birthdate", sa.String(), nullable=True),
+        sa.Column("date_added", sa.String(), nullable=True),
+    ]
+
+
+def upgrade():
+    # Databases built by database.py's create_all already have the columns
+    inspector = sa.inspect(op.get_bind())
+    existing = {c["name"] for c in inspector.get_columns("pets")}
+    for column in _columns():
+        if column.name not in existing:
+            op.add_column("pets", column)
+
+
+def downgrade():
+    op.drop_column("pets", "date_added")
+    op.drop_column("pets", "birthdate")
+    op.drop_column("pets", "is_vaccinated")
+    op.drop_column("pets", "gender")
+    op.drop_column("pets", "description")
+    op.drop_column("pets", "weight")
+    op.drop_column("pets", "color")
+    op.drop_column("pets", "breed")
+    op.drop_column("pets", "age")
@@ -0,0 +1,67 @@
+"""
+Revision ID: 20261017_add_change_versions
+Revises: 20261017_typed_pet_dates
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "20261017_add_change_versions"
+down_revision = "20261017_typed_pet_dates"
+branch_labels = None
+depends_on = None
+
+# Tables whose inserts are stamped for GET /changes, in backfill order
+VERSIONED_TABLES = ("owners", "pets")
+
+LATEST_VERSIONS = (
+    "(SELECT change_version AS version FROM owners UNION ALL "
+    "SELECT change_version FROM pets) AS versions"
+)
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    for table in VERSIONED_TABLES:
+        # Databases built by create_all already have the column
+        columns = {c["name"] for c in inspector.get_columns(table)}
+        if "change_version" not in columns:
+            op.add_column(
+                table,
+                sa.Column("change_version", sa.Integer(), nullable=True),
+            )
+        op.create_index(
+            f"ix_{table}_change_version",
+            table,
+            ["change_version"],
+            if_not_exists=True,
+        )
+    op.create_table(
+        "change_counter",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("version", sa.Integer(), nullable=False),
+        if_not_exists=True,
+    )
+    # Existing rows count as changed once, owners before pets, each
+    # numbered by id past every version handed out so far (none, unless
+    # the app already ran against a create_all schema)
+    for table in VERSIONED_TABLES:
+        op.execute(
+            f"UPDATE {table} SET change_version = id + "
+            f"(SELECT COALESCE(MAX(version), 0) FROM {LATEST_VERSIONS}) "
+            f"WHERE change_version IS NULL"
+        )
+    op.execute("DELETE FROM change_counter")
+    op.execute(
+        f"INSERT INTO change_counter (id, version) "
+        f"SELECT 1, COALESCE(MAX(version), 0) FROM {LATEST_VERSIONS}"
+    )
+
+
+def downgrade():
+    op.drop_table("change_counter")
+    for table in reversed(VERSIONED_TABLES):
+        op.drop_index(f"ix_{table}_change_version", table_name=table)
+        op.drop_column(table, "change_version")
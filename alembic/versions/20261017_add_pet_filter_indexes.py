@@ -0,0 +1,36 @@
+"""
+Revision ID: 20261017_add_pet_filter_indexes
+Revises: 20240514_add_owner_extra_fields
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "20261017_add_pet_filter_indexes"
+down_revision = "20240514_add_owner_extra_fields"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # pets.owner_id had no index at all; (owner_id, id) also serves the
+    # owner-scoped keyset pagination of GET /owners/{id}/pets
+    op.create_index(
+        "ix_pets_owner_id_id",
+        "pets",
+        ["owner_id", "id"],
+        if_not_exists=True,
+    )
+    op.create_index(
+        "ix_pets_species_id", "pets", ["species", "id"], if_not_exists=True
+    )
+    op.create_index("ix_pets_age", "pets", ["age"], if_not_exists=True)
+    op.create_index("ix_pets_weight", "pets", ["weight"], if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index("ix_pets_weight", table_name="pets")
+    op.drop_index("ix_pets_age", table_name="pets")
+    op.drop_index("ix_pets_species_id", table_name="pets")
+    op.drop_index("ix_pets_owner_id_id", table_name="pets")
@@ -0,0 +1,77 @@
+"""
+Revision ID: 20261017_add_pet_stats
+Revises: 20261017_add_search_index
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "20261017_add_pet_stats"
+down_revision = "20261017_add_search_index"
+branch_labels = None
+depends_on = None
+
+# Running sums behind GET /stats, kept up to date by pet_stats on every
+# pet insert
+AGGREGATES = (
+    ("pet_count", sa.Integer),
+    ("vaccinated_count", sa.Integer),
+    ("age_sum", sa.Integer),
+    ("age_count", sa.Integer),
+    ("weight_sum", sa.Float),
+    ("weight_count", sa.Integer),
+)
+
+AGGREGATE_SQL = (
+    "COUNT(*), "
+    "SUM(CASE WHEN is_vaccinated IS TRUE THEN 1 ELSE 0 END), "
+    "COALESCE(SUM(age), 0), COUNT(age), "
+    "COALESCE(SUM(weight), 0.0), COUNT(weight)"
+)
+
+
+def _aggregate_columns():
+    return [
+        sa.Column(name, type_, nullable=False) for name, type_ in AGGREGATES
+    ]
+
+
+def upgrade():
+    op.create_table(
+        "species_stats",
+        sa.Column("species", sa.String(), primary_key=True),
+        *_aggregate_columns(),
+        if_not_exists=True,
+    )
+    op.create_table(
+        "owner_stats",
+        sa.Column(
+            "owner_id",
+            sa.Integer(),
+            sa.ForeignKey("owners.id"),
+            primary_key=True,
+        ),
+        *_aggregate_columns(),
+        if_not_exists=True,
+    )
+    # Summarize the pets that already exist, replacing anything a
+    # create_all made table picked up before this ran
+    op.execute("DELETE FROM species_stats")
+    op.execute("DELETE FROM owner_stats")
+    names = ", ".join(name for name, _ in AGGREGATES)
+    op.execute(
+        f"INSERT INTO species_stats (species, {names}) "
+        f"SELECT COALESCE(species, ''), {AGGREGATE_SQL} "
+        f"FROM pets GROUP BY COALESCE(species, '')"
+    )
+    op.execute(
+        f"INSERT INTO owner_stats (owner_id, {names}) "
+        f"SELECT owner_id, {AGGREGATE_SQL} FROM pets GROUP BY owner_id"
+    )
+
+
+def downgrade():
+    op.drop_table("owner_stats")
+    op.drop_table("species_stats")
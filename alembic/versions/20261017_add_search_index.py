@@ -0,0 +1,62 @@
+"""
+Revision ID: 20261017_add_search_index
+Revises: 20261017_add_pet_filter_indexes
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "20261017_add_search_index"
+down_revision = "20261017_add_pet_filter_indexes"
+branch_labels = None
+depends_on = None
+
+# External-content FTS5 tables (they index pets / owners rows in place,
+# without a second copy of the text) kept in step by triggers
+SEARCH_TABLES = (
+    ("pets_fts", "pets", ("name", "breed", "description")),
+    ("owners_fts", "owners", ("name", "email", "city")),
+)
+
+
+def upgrade():
+    # FTS5 and these triggers are SQLite only; elsewhere search answers 501
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    for fts, table, columns in SEARCH_TABLES:
+        cols = ", ".join(columns)
+        new = ", ".join(f"new.{c}" for c in columns)
+        old = ", ".join(f"old.{c}" for c in columns)
+        op.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+            f"{cols}, content='{table}', content_rowid='id', "
+            f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+        )
+        op.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} "
+            f"BEGIN INSERT INTO {fts}(rowid, {cols}) "
+            f"VALUES (new.id, {new}); END"
+        )
+        op.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} "
+            f"BEGIN INSERT INTO {fts}({fts}, rowid, {cols}) "
+            f"VALUES ('delete', old.id, {old}); END"
+        )
+        op.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE ON {table} "
+            f"BEGIN INSERT INTO {fts}({fts}, rowid, {cols}) "
+            f"VALUES ('delete', old.id, {old}); "
+            f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new}); END"
+        )
+        # Index the rows that already exist
+        op.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    for fts, _, _ in SEARCH_TABLES:
+        for suffix in ("au", "ad", "ai"):
+            op.execute(f"DROP TRIGGER IF EXISTS {fts}_{suffix}")
+        op.execute(f"DROP TABLE IF EXISTS {fts}")
@@ -0,0 +1,116 @@
+"""
+Revision ID: 20261017_typed_pet_dates
+Revises: 20261017_add_pet_stats
+Create Date: 2026-10-17
+"""
+
+from datetime import date, datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "20261017_typed_pet_dates"
+down_revision = "20261017_add_pet_stats"
+branch_labels = None
+depends_on = None
+
+# Rows rewritten per UPDATE batch on SQLite
+BATCH_SIZE = 5000
+
+# How SQLAlchemy's SQLite Date / DateTime types write values. Range
+# filters compare the stored text, so every row must use exactly this
+# form: "2025-06-01T10:00:00" (isoformat) or a missing fraction would
+# sort out of place.
+SQLITE_FORMATS = {
+    "birthdate": (date.fromisoformat, "%Y-%m-%d"),
+    "date_added": (datetime.fromisoformat, "%Y-%m-%d %H:%M:%S.%f"),
+}
+
+
+def _normalize_sqlite_dates():
+    bind = op.get_bind()
+    pets = sa.table(
+        "pets",
+        sa.column("id", sa.Integer),
+        sa.column("birthdate", sa.String),
+        sa.column("date_added", sa.String),
+    )
+    update = (
+        sa.update(pets)
+        .where(pets.c.id == sa.bindparam("pet_id"))
+        .values(
+            birthdate=sa.bindparam("new_birthdate"),
+            date_added=sa.bindparam("new_date_added"),
+        )
+    )
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(pets.c.id, pets.c.birthdate, pets.c.date_added)
+            .where(pets.c.id > last_id)
+            .order_by(pets.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        params = []
+        for row in rows:
+            values = {"pet_id": row.id}
+            for column, (parse, fmt) in SQLITE_FORMATS.items():
+                value = getattr(row, column)
+                try:
+                    values[f"new_{column}"] = (
+                        None if not value else parse(value).strftime(fmt)
+                    )
+                except ValueError:
+                    raise ValueError(
+                        f"pets.{column} of pet {row.id} is not an ISO "
+                        f"date: {value!r}; fix it and run the migration "
+                        f"again"
+                    ) from None
+            # Only rewrite rows that change; each update also re-indexes
+            # the pet for search
+            if (values["new_birthdate"], values["new_date_added"]) != (
+                row.birthdate,
+                row.date_added,
+            ):
+                params.append(values)
+        if params:
+            bind.execute(update, params)
+        last_id = rows[-1].id
+
+
+def upgrade():
+    if op.get_bind().dialect.name == "sqlite":
+        # SQLite column types are only affinities and changing one means
+        # rebuilding pets (dropping its search triggers); the stored text
+        # just has to be in the form the new types read and write
+        _normalize_sqlite_dates()
+    else:
+        op.alter_column(
+            "pets",
+            "birthdate",
+            type_=sa.Date(),
+            postgresql_using="NULLIF(birthdate, '')::date",
+        )
+        op.alter_column(
+            "pets",
+            "date_added",
+            type_=sa.DateTime(),
+            postgresql_using="NULLIF(date_added, '')::timestamp",
+        )
+    op.create_index(
+        "ix_pets_date_added_id",
+        "pets",
+        ["date_added", "id"],
+        if_not_exists=True,
+    )
+
+
+def downgrade():
+    op.drop_index("ix_pets_date_added_id", table_name="pets")
+    # Normalized SQLite values are still valid ISO strings
+    if op.get_bind().dialect.name != "sqlite":
+        op.alter_column("pets", "date_added", type_=sa.String())
+        op.alter_column("pets", "birthdate", type_=sa.String())
@@ -0,0 +1,241 @@
+"""
+Async variants of the crud operations, for endpoints running on the event
+loop. They mirror crud.py one for one and return the same Results; the
+user operations exist only here, for the async login and signup.
+"""
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import SQLAlchemyError, IntegrityError
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy import select
+from datetime import date, datetime
+from typing import List
+
+from change_feed import claim_versions
+from crud import _owners_stmt, _pets_stmt
+from pet_stats import stats_upserts
+from cache import response_cache
+from metrics import timed
+from database import Owner, Pet, User
+from result import Result
+from schemas import PetFilters
+from exceptions import (
+    EntityNotFoundError,
+    IntegrityConstraintError,
+    DatabaseError,
+)
+
+
+async def _claim_version(db: AsyncSession) -> int:
+    # See crud._claim_versions
+    stmt = claim_versions(db.get_bind().dialect.name, 1)
+    return (await db.execute(stmt)).scalar_one()
+
+
+# Owner operations
+@timed
+async def create_owner(
+    db: AsyncSession,
+    name: str,
+    email: str | None = None,
+    phone: str | None = None,
+    address: str | None = None,
+    city: str | None = None,
+    state: str | None = None,
+    zip_code: str | None = None,
+    country: str | None = None,
+    date_of_birth: str | None = None,
+) -> Result[Owner]:
+    try:
+        change_version = await _claim_version(db)
+        db_owner = Owner(
+            name=name,
+            email=email,
+            phone=phone,
+            address=address,
+            city=city,
+            state=state,
+            zip_code=zip_code,
+            country=country,
+            date_of_birth=date_of_birth,
+            change_version=change_version,
+        )
+        db.add(db_owner)
+        await db.commit()
+        response_cache.invalidate()
+        await db.refresh(db_owner)
+        # A brand-new owner has no pets; say so instead of lazy loading
+        set_committed_value(db_owner, "pets", [])
+        return Result.ok(db_owner)
+    except IntegrityError:
+        await db.rollback()
+        return Result.err(
+            IntegrityConstraintError(
+                f"Owner with name '{name}' or email '{email}' may violate "
+                f"constraints"
+            )
+        )
+    except SQLAlchemyError as e:
+        await db.rollback()
+        return Result.err(DatabaseError(f"Database error: {str(e)}"))
+
+
+@timed
+async def get_owners(
+    db: AsyncSession,
+    limit: int | None = None,
+    after: int | None = None,
+    include_pets: bool = False,
+    with_pet_count: bool = False,
+) -> Result[List[Owner]]:
+    try:
+        stmt = _owners_stmt(
+            limit, after, include_pets, with_pet_count=with_pet_count
+        )
+        result = (await db.execute(stmt)).scalars().all()
+        return Result.ok(list(result))
+    except SQLAlchemyError as e:
+        return Result.err(DatabaseError(f"Error retrieving owners: {str(e)}"))
+
+
+@timed
+async def get_owner(
+    db: AsyncSession, owner_id: int, include_pets: bool = False
+) -> Result[Owner]:
+    try:
+        stmt = _owners_stmt(None, None, include_pets).where(
+            Owner.id == owner_id
+        )
+        owner = (await db.execute(stmt)).scalar_one_or_none()
+        if not owner:
+            return Result.err(
+                EntityNotFoundError(f"Owner with id {owner_id} not found")
+            )
+        return Result.ok(owner)
+    except SQLAlchemyError as e:
+        return Result.err(
+            DatabaseError(f"Error retrieving owner {owner_id}: {str(e)}")
+        )
+
+
+# Pet operations
+@timed
+async def create_pet(
+    db: AsyncSession,
+    name: str,
+    owner_id: int,
+    species: str | None = None,
+    photo_filename: str | None = None,
+    age: int | None = None,
+    breed: str | None = None,
+    color: str | None = None,
+    weight: float | None = None,
+    description: str | None = None,
+    gender: str | None = None,
+    is_vaccinated: bool | None = None,
+    birthdate: date | None = None,
+    date_added: datetime | None = None,
+) -> Result[Pet]:
+    try:
+        change_version = await _claim_version(db)
+        db_pet = Pet(
+            name=name,
+            owner_id=owner_id,
+            species=species,
+            photo_filename=photo_filename,
+            age=age,
+            breed=breed,
+            color=color,
+            weight=weight,
+            description=description,
+            gender=gender,
+            is_vaccinated=is_vaccinated,
+            birthdate=birthdate,
+            date_added=date_added,
+            change_version=change_version,
+        )
+        db.add(db_pet)
+        # Same transaction as the pet; see crud._add_pet_stats
+        pet_row = {
+            "owner_id": owner_id,
+            "species": species,
+            "age": age,
+            "weight": weight,
+            "is_vaccinated": is_vaccinated,
+        }
+        for stmt, rows in stats_upserts(db.get_bind().dialect.name, [pet_row]):
+            await db.execute(stmt, rows)
+        await db.commit()
+        response_cache.invalidate()
+        await db.refresh(db_pet)
+        return Result.ok(db_pet)
+    except IntegrityError:
+        await db.rollback()
+        return Result.err(
+            IntegrityConstraintError(
+                f"Invalid owner_id {owner_id} or constraint violation"
+            )
+        )
+    except SQLAlchemyError as e:
+        await db.rollback()
+        return Result.err(DatabaseError(f"Database error: {str(e)}"))
+
+
+@timed
+async def get_pets(
+    db: AsyncSession,
+    limit: int | None = None,
+    after: int | None = None,
+    filters: PetFilters | None = None,
+) -> Result[List[Pet]]:
+    try:
+        stmt = _pets_stmt(limit, after, filters)
+        result = (await db.execute(stmt)).scalars().all()
+        return Result.ok(list(result))
+    except SQLAlchemyError as e:
+        return Result.err(DatabaseError(f"Error retrieving pets: {str(e)}"))
+
+
+# User operations
+@timed
+async def get_user_by_username(
+    db: AsyncSession, username: str
+) -> Result[User | None]:
+    try:
+        stmt = select(User).where(User.username == username)
+        return Result.ok((await db.execute(stmt)).scalar_one_or_none())
+    except SQLAlchemyError as e:
+        return Result.err(DatabaseError(f"Error retrieving user: {str(e)}"))
+
+
+@timed
+async def create_user(
+    db: AsyncSession, username: str, hashed_password: str
+) -> Result[User]:
+    try:
+        user = User(username=username, hashed_password=hashed_password)
+        db.add(user)
+        await db.commit()
+        await db.refresh(user)
+        return Result.ok(user)
+    except IntegrityError:
+        await db.rollback()
+        return Result.err(
+            IntegrityConstraintError(f"Username '{username}' already taken")
+        )
+    except SQLAlchemyError as e:
+        await db.rollback()
+        return Result.err(DatabaseError(f"Database error: {str(e)}"))
+
+
+@timed
+async def update_password_hash(
+    db: AsyncSession, user: User, hashed_password: str
+) -> Result[User]:
+    try:
+        user.hashed_password = hashed_password
+        await db.commit()
+        return Result.ok(user)
+    except SQLAlchemyError as e:
+        await db.rollback()
+        return Result.err(DatabaseError(f"Error updating user: {str(e)}"))
@@ -0,0 +1,146 @@
+"""
+Resolving the logged-in user from the session cookie.
+
+SessionMiddleware only stores ``user_id``; current_user turns it into a
+UserRead, caching it per process so authenticated requests don't each
+pay a users query. Entries expire after a TTL and are dropped as soon as
+a commit updates or deletes that user (e.g. clearing User.is_active), so
+a deactivated user is locked out on the next request. Like the response
+cache, invalidation is per process: other workers notice within the TTL.
+Writes that bypass the ORM (Core UPDATEs, raw SQL) are only caught by the
+TTL.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Set, Tuple
+
+from fastapi import Depends, HTTPException, status
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from starlette.requests import Request
+
+import crud
+from database import PrimarySession, User, get_db
+from schemas import UserRead
+
+USER_ID_SESSION_KEY = "user_id"
+
+
+class UserCache:
+    """Thread-safe TTL + LRU cache of UserRead snapshots by user id."""
+
+    def __init__(self, ttl: float = 30.0, max_entries: int = 10_000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[int, Tuple[UserRead, float]]" = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+        # Bumped on every invalidation so a lookup that read the row before
+        # a concurrent commit can't store the old version afterwards
+        self.generation = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_entries > 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, user_id: int) -> UserRead | None:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            user, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return user
+
+    def put(self, user: UserRead, generation: int) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._entries[user.id] = (user, time.monotonic() + self.ttl)
+            self._entries.move_to_end(user.id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, *user_ids: int) -> None:
+        with self._lock:
+            self.generation += 1
+            for user_id in user_ids:
+                self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+
+user_cache = UserCache(
+    ttl=float(os.getenv("PETSHOP_USER_CACHE_TTL", "30")),
+    max_entries=int(os.getenv("PETSHOP_USER_CACHE_MAX_ENTRIES", "10000")),
+)
+
+_CHANGED_USERS_KEY = "petshop_changed_users"
+
+
+@event.listens_for(PrimarySession, "after_flush")
+def _collect_changed_users(session: Session, flush_context):
+    changed: Set[int] = session.info.setdefault(_CHANGED_USERS_KEY, set())
+    for obj in (*session.dirty, *session.deleted):
+        if isinstance(obj, User) and obj.id is not None:
+            changed.add(obj.id)
+
+
+@event.listens_for(PrimarySession, "after_commit")
+def _invalidate_changed_users(session: Session):
+    # After the commit, not the flush: a reader between the two would
+    # still see (and re-cache) the old row
+    changed = session.info.pop(_CHANGED_USERS_KEY, None)
+    if changed:
+        user_cache.invalidate(*changed)
+
+
+@event.listens_for(PrimarySession, "after_rollback")
+def _forget_changed_users(session: Session):
+    session.info.pop(_CHANGED_USERS_KEY, None)
+
+
+def current_user(request: Request, db=Depends(get_db)) -> UserRead:
+    """
+    The logged-in, active user; 401 otherwise.
+
+    Misses read the primary: a lagging replica could hand back a user
+    that was just deactivated, and we would cache it. The session only
+    connects on a miss, so a hit costs no database round trip.
+    """
+    user_id = request.session.get(USER_ID_SESSION_KEY)
+    if user_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not logged in",
+        )
+    user = user_cache.get(user_id)
+    if user is None:
+        generation = user_cache.generation
+        result = crud.get_user(db, user_id)
+        if result.is_err:
+            raise result.as_http_error()
+        if result.value is not None:
+            user = UserRead.model_validate(result.value)
+            user_cache.put(user, generation)
+    if user is None or not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not logged in",
+        )
+    return user
@@ -0,0 +1,315 @@
+"""
+End-to-end latency and throughput of the API against a real database.
+
+Seeds a throwaway SQLite database at the requested scale, then drives the
+ASGI app in-process (httpx over ASGITransport, no sockets) at each
+concurrency level, and prints one JSON report:
+
+    python -m benchmarks.api --pets 100000 --concurrency 1 16 \\
+        --output bench.json
+    python -m benchmarks.api --pets 100000 --baseline bench.json
+
+With --baseline, each scenario's p95 is compared to the stored run and the
+exit status is 1 if any regressed by more than --max-regression percent.
+The response cache is off unless --cache is given, so list scenarios
+measure the database path.
+"""
+
+import argparse
+import asyncio
+import io
+import itertools
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import replace
+from typing import Awaitable, Dict, List
+
+import httpx
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+import main
+import sample_data
+from cache import response_cache
+from database import (
+    ENGINE_PROFILES,
+    Base,
+    Owner,
+    Pet,
+    PrimarySession,
+    User,
+    create_profile_async_engine,
+    create_profile_engine,
+    get_async_db,
+    get_db,
+    get_read_db,
+    get_session_factory,
+)
+from passwords import PasswordHasher, make_context
+from photo_store import PhotoStore
+from photo_variants import VariantPipeline
+
+SCENARIOS = (
+    "list_pets",
+    "list_owners",
+    "create_pet",
+    "create_pet_photo",
+    "login",
+    "signup",
+)
+
+PAGE_SIZE = 50
+PETS_PER_OWNER = 3
+BENCH_USER = "bench"
+BENCH_PASSWORD = "bench-password"
+
+
+def seed(db_engine, pets: int) -> None:
+    """Synthetic pets (and a third as many owners) plus the bench user."""
+    with db_engine.begin() as conn:
+        sample_data.generate(conn, max(1, pets // PETS_PER_OWNER), pets)
+        conn.execute(
+            insert(User).values(
+                username=BENCH_USER,
+                hashed_password=main.password_hasher.context.hash(
+                    BENCH_PASSWORD
+                ),
+            )
+        )
+
+
+def sample_photo() -> bytes:
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new("RGB", (1200, 900), (90, 140, 60)).save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))
+    return sorted_values[index]
+
+
+class Bench:
+    """Installs a database and photo store under main.app and drives it."""
+
+    def __init__(self, tmp: str, pets: int, profile: str, use_cache: bool):
+        engine_profile = replace(
+            ENGINE_PROFILES[profile],
+            url=f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+            async_url=None,
+            echo=False,
+        )
+        self.engine = create_profile_engine(engine_profile)
+        self.async_engine = create_profile_async_engine(engine_profile)
+        Base.metadata.create_all(self.engine)
+        seed(self.engine, pets)
+        with self.engine.connect() as conn:
+            self.max_pet_id = conn.execute(select(func.max(Pet.id))).scalar()
+            self.max_owner_id = conn.execute(
+                select(func.max(Owner.id))
+            ).scalar()
+
+        session_factory = sessionmaker(bind=self.engine, class_=PrimarySession)
+        async_session_factory = async_sessionmaker(
+            self.async_engine,
+            expire_on_commit=False,
+            sync_session_class=PrimarySession,
+        )
+
+        def db():
+            with session_factory() as session:
+                yield session
+
+        async def async_db():
+            async with async_session_factory() as session:
+                yield session
+
+        main.app.dependency_overrides.update(
+            {
+                get_db: db,
+                get_read_db: db,
+                get_async_db: async_db,
+                get_session_factory: lambda: session_factory,
+            }
+        )
+        main.photo_store = PhotoStore(tmp)
+        main.variant_pipeline = VariantPipeline(tmp)
+        if not use_cache:
+            response_cache.ttl = 0
+        self.photo = sample_photo()
+        self.counter = itertools.count()
+        self.rng = random.Random(1)
+
+    def close(self) -> None:
+        main.app.dependency_overrides.clear()
+        # Let running encodes finish before the directory is removed
+        main.variant_pipeline.shutdown(wait=True)
+        self.engine.dispose()
+
+    def request(
+        self, scenario: str, client: httpx.AsyncClient
+    ) -> Awaitable[httpx.Response]:
+        n = next(self.counter)
+        if scenario == "list_pets":
+            after = self.rng.randint(0, max(0, self.max_pet_id - PAGE_SIZE))
+            return client.get(f"/pets/?limit={PAGE_SIZE}&after={after}")
+        if scenario == "list_owners":
+            after = self.rng.randint(0, max(0, self.max_owner_id - PAGE_SIZE))
+            return client.get(f"/owners/?limit={PAGE_SIZE}&after={after}")
+        if scenario in ("create_pet", "create_pet_photo"):
+            data = {
+                "name": f"Bench pet {n}",
+                "owner_id": str(self.rng.randint(1, self.max_owner_id)),
+                "species": "Dog",
+            }
+            files = None
+            if scenario == "create_pet_photo":
+                # Distinct bytes each time so nothing is deduplicated
+                photo = self.photo + n.to_bytes(8, "big")
+                files = {"photo": ("photo.jpg", photo, "image/jpeg")}
+            return client.post("/pets/", data=data, files=files)
+        if scenario == "login":
+            return client.post(
+                "/login",
+                json={"username": BENCH_USER, "password": BENCH_PASSWORD},
+            )
+        if scenario == "signup":
+            return client.post(
+                "/signup",
+                json={"username": f"bench-{n}", "password": BENCH_PASSWORD},
+            )
+        raise ValueError(f"Unknown scenario {scenario}")
+
+
+async def run_scenario(
+    bench: Bench, scenario: str, requests: int, concurrency: int
+) -> Dict[str, object]:
+    transport = httpx.ASGITransport(app=main.app)
+    latencies: List[float] = []
+    errors = 0
+    remaining = iter(range(requests))
+
+    async def worker(client: httpx.AsyncClient) -> None:
+        nonlocal errors
+        for _ in remaining:
+            start = time.perf_counter()
+            response = await bench.request(scenario, client)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": errors,
+        "throughput_rps": round(requests / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 2),
+    }
+
+
+def compare(
+    results: List[Dict[str, object]],
+    baseline: Dict[str, object],
+    max_regression: float,
+) -> bool:
+    """Annotate results with the baseline p95; False if any regressed."""
+    previous = {
+        (r["scenario"], r["concurrency"]): r for r in baseline["results"]
+    }
+    ok = True
+    for result in results:
+        before = previous.get((result["scenario"], result["concurrency"]))
+        if before is None:
+            continue
+        change = (result["p95_ms"] / before["p95_ms"] - 1) * 100
+        result["baseline_p95_ms"] = before["p95_ms"]
+        result["p95_change_pct"] = round(change, 1)
+        result["regressed"] = change > max_regression
+        ok = ok and not result["regressed"]
+    return ok
+
+
+async def run(args: argparse.Namespace) -> Dict[str, object]:
+    if args.bcrypt_rounds is not None:
+        main.password_hasher = PasswordHasher(make_context(args.bcrypt_rounds))
+    with tempfile.TemporaryDirectory() as tmp:
+        seed_start = time.perf_counter()
+        bench = Bench(tmp, args.pets, args.profile, args.cache)
+        seed_seconds = time.perf_counter() - seed_start
+        try:
+            results = [
+                await run_scenario(bench, scenario, args.requests, level)
+                for scenario in args.scenarios
+                for level in args.concurrency
+            ]
+        finally:
+            bench.close()
+    return {
+        "pets": args.pets,
+        "profile": args.profile,
+        "cache": args.cache,
+        "seed_seconds": round(seed_seconds, 2),
+        "results": results,
+    }
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--pets", type=int, default=1000, help="e.g. 1000, 100000, 1000000"
+    )
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16])
+    parser.add_argument(
+        "--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS)
+    )
+    parser.add_argument(
+        "--profile", choices=sorted(ENGINE_PROFILES), default="prod"
+    )
+    parser.add_argument("--cache", action="store_true")
+    parser.add_argument(
+        "--bcrypt-rounds",
+        type=int,
+        default=None,
+        help="Override PETSHOP_BCRYPT_ROUNDS for login / signup",
+    )
+    parser.add_argument("--output", help="Also write the report here")
+    parser.add_argument("--baseline", help="Report to compare against")
+    parser.add_argument("--max-regression", type=float, default=10.0)
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    ok = True
+    if args.baseline:
+        with open(args.baseline) as f:
+            ok = compare(report["results"], json.load(f), args.max_regression)
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main_cli()
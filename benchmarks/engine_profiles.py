@@ -0,0 +1,100 @@
+"""
+Compare read and write throughput of the database engine profiles.
+
+Each profile runs against its own throwaway SQLite file, so the numbers
+show the effect of the pool settings and connection pragmas alone:
+
+    python -m benchmarks.engine_profiles --writes 2000 --reads 20000
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import sessionmaker
+
+from database import (
+    ENGINE_PROFILES,
+    Base,
+    Owner,
+    create_profile_engine,
+)
+
+
+def _rate(count: int, seconds: float) -> float:
+    return round(count / seconds, 1) if seconds else float("inf")
+
+
+def bench_profile(name: str, writes: int, reads: int, threads: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        profile = replace(
+            ENGINE_PROFILES[name],
+            url=f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+            echo=False,
+        )
+        db_engine = create_profile_engine(profile)
+        Base.metadata.create_all(db_engine)
+        Session = sessionmaker(bind=db_engine)
+
+        # One committed transaction per row, like create_owner
+        start = time.perf_counter()
+        with db_engine.connect() as conn:
+            for i in range(writes):
+                conn.execute(insert(Owner).values(name=f"Owner {i}"))
+                conn.commit()
+        write_seconds = time.perf_counter() - start
+
+        ids = [random.randint(1, writes) for _ in range(reads)]
+
+        def read(chunk):
+            with Session() as db:
+                for owner_id in chunk:
+                    db.execute(
+                        select(Owner).where(Owner.id == owner_id)
+                    ).scalar_one()
+                    db.expunge_all()
+
+        start = time.perf_counter()
+        read(ids)
+        read_seconds = time.perf_counter() - start
+
+        chunks = [ids[i::threads] for i in range(threads)]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            list(pool.map(read, chunks))
+        concurrent_seconds = time.perf_counter() - start
+
+        db_engine.dispose()
+        return {
+            "profile": name,
+            "pragmas": profile.sqlite_pragmas,
+            "writes_per_sec": _rate(writes, write_seconds),
+            "reads_per_sec": _rate(reads, read_seconds),
+            f"reads_per_sec_{threads}_threads": _rate(
+                reads, concurrent_seconds
+            ),
+        }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--writes", type=int, default=1000)
+    parser.add_argument("--reads", type=int, default=10000)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument(
+        "--profiles", nargs="+", default=sorted(ENGINE_PROFILES)
+    )
+    args = parser.parse_args()
+    for name in args.profiles:
+        result = bench_profile(name, args.writes, args.reads, args.threads)
+        print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Compare the default and fast (serialization.dump_list) list renderers.
+
+Builds in-memory ORM rows, so only serialization is measured:
+
+    python -m benchmarks.serialization --rows 1000 --repeat 50
+
+Both renderers must produce the same bytes; the run fails otherwise.
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from datetime import date, datetime
+from typing import Any, Callable, List, Sequence, Type
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+from database import Owner, Pet
+from schemas import OwnerRead, OwnerReadBase, PetRead
+from serialization import dump_list
+
+
+def make_pets(count: int, first_id: int = 1) -> List[Pet]:
+    rng = random.Random(first_id)
+    return [
+        Pet(
+            id=i,
+            name=f"Pet {i}",
+            owner_id=rng.randint(1, 1000),
+            species=rng.choice(["Dog", "Cat", "Bird"]),
+            age=rng.randint(0, 15),
+            breed="Beagle",
+            color="Brown",
+            weight=round(rng.uniform(0.1, 40), 2),
+            description="Friendly and house-trained",
+            gender=rng.choice(["male", "female"]),
+            is_vaccinated=rng.random() < 0.8,
+            birthdate=date(2022, 3, 1),
+            date_added=datetime(2025, 6, 1, 10),
+            # Every other pet has a photo, so variants are rendered too
+            photo_filename=(
+                f"ab/cd/{i:064x}.jpg" if i % 2 else f"legacy_{i}.jpg"
+            ),
+        )
+        for i in range(first_id, first_id + count)
+    ]
+
+
+def make_owners(count: int, pets_each: int) -> List[Owner]:
+    owners = []
+    for i in range(1, count + 1):
+        owner = Owner(id=i, name=f"Owner {i}", email=f"owner{i}@example.com")
+        owner.pets = make_pets(pets_each, first_id=i * pets_each)
+        owners.append(owner)
+    return owners
+
+
+def default_render(schema: Type[BaseModel], items: Sequence[Any]) -> bytes:
+    # main.render_list without PETSHOP_FAST_SERIALIZATION
+    content = jsonable_encoder([schema.model_validate(i) for i in items])
+    return bytes(JSONResponse(content=content).body)
+
+
+def _best_ms(render: Callable[[], bytes], repeat: int) -> float:
+    render()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        render()
+        timings.append(time.perf_counter() - start)
+    return round(min(timings) * 1000, 2)
+
+
+def bench(
+    name: str, schema: Type[BaseModel], items: Sequence[Any], repeat: int
+) -> dict:
+    if default_render(schema, items) != dump_list(schema, items):
+        raise AssertionError(f"{name}: fast output differs from default")
+    default_ms = _best_ms(lambda: default_render(schema, items), repeat)
+    fast_ms = _best_ms(lambda: dump_list(schema, items), repeat)
+    return {
+        "case": name,
+        "rows": len(items),
+        "default_ms": default_ms,
+        "fast_ms": fast_ms,
+        "speedup": round(default_ms / fast_ms, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--pets-per-owner", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    owners = make_owners(args.rows, args.pets_per_owner)
+    results = [
+        bench("pets", PetRead, make_pets(args.rows), args.repeat),
+        bench("owners", OwnerReadBase, owners, args.repeat),
+        bench("owners_with_pets", OwnerRead, owners, args.repeat),
+    ]
+    json.dump(results, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""
+In-process cache for rendered list responses, with strong ETags.
+
+Entries expire after a TTL and are evicted least-recently-used once the
+entry count or byte budget is exceeded. Every successful owner or pet
+write invalidates the whole cache. Invalidation is per process: with
+several workers, a worker that did not take the write may serve its
+cached copy until the TTL runs out. With read replicas, the cache is
+neither read nor filled for the sticky window after an invalidation, so a
+lagging replica can't refill it with rows from before the write.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Tuple
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    body: bytes
+    etag: str
+    headers: Tuple[Tuple[str, str], ...]
+    media_type: str
+    expires_at: float
+
+
+def make_etag(body: bytes) -> str:
+    """Strong ETag derived from the exact response bytes."""
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Check If-None-Match, which uses the weak comparison function."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return etag in candidates
+
+
+def cache_key(request: Request) -> str:
+    # Sorted so ?limit=2&after=4 and ?after=4&limit=2 share an entry
+    query = "&".join(
+        f"{key}={value}"
+        for key, value in sorted(request.query_params.multi_items())
+    )
+    return f"{request.url.path}?{query}"
+
+
+class ResponseCache:
+    """Thread-safe TTL + LRU cache of rendered responses, bounded in bytes."""
+
+    def __init__(
+        self, ttl: float = 30.0, max_entries: int = 256, max_bytes: int = 0
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        # Bumped on every invalidation so a render that started before a
+        # write can't store its (now stale) result afterwards
+        self.generation = 0
+        self._invalidated_at = float("-inf")
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_entries > 0
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @property
+    def seconds_since_invalidation(self) -> float:
+        return time.monotonic() - self._invalidated_at
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> CachedResponse | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires_at <= time.monotonic():
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(
+        self,
+        key: str,
+        body: bytes,
+        etag: str,
+        headers: Dict[str, str],
+        media_type: str,
+        generation: int,
+    ) -> None:
+        if not self.enabled:
+            return
+        if self.max_bytes and len(body) > self.max_bytes:
+            return
+        entry = CachedResponse(
+            body=body,
+            etag=etag,
+            headers=tuple(headers.items()),
+            media_type=media_type,
+            expires_at=time.monotonic() + self.ttl,
+        )
+        with self._lock:
+            if generation != self.generation:
+                return
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = entry
+            self._size += len(body)
+            while len(self._entries) > self.max_entries or (
+                self.max_bytes and self._size > self.max_bytes
+            ):
+                self._drop(next(iter(self._entries)))
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self.generation += 1
+            self._invalidated_at = time.monotonic()
+            self._entries.clear()
+            self._size = 0
+
+    def _drop(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        self._size -= len(entry.body)
+
+
+def not_modified(etag: str) -> Response:
+    return Response(
+        status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"}
+    )
+
+
+def cached_response(entry: CachedResponse, request: Request) -> Response:
+    """Serve a cache entry, or a bodiless 304 if the client already has it."""
+    if etag_matches(request, entry.etag):
+        return not_modified(entry.etag)
+    return Response(
+        content=entry.body,
+        media_type=entry.media_type,
+        headers=dict(entry.headers),
+    )
+
+
+def with_etag(
+    request: Request,
+    response: Response,
+    key: str | None = None,
+    generation: int = 0,
+) -> Response:
+    """
+    Add a strong ETag (and revalidation policy) to a rendered response,
+    answer If-None-Match with 304, and store it in the cache under key.
+    """
+    body = bytes(response.body)
+    etag = make_etag(body)
+    headers = {
+        name: value
+        for name, value in response.headers.items()
+        if name not in ("content-length", "content-type")
+    }
+    # Browsers may reuse the body but must revalidate it with the ETag
+    headers["etag"] = etag
+    headers["cache-control"] = "no-cache"
+    if key is not None:
+        response_cache.put(
+            key, body, etag, headers, response.media_type, generation
+        )
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+response_cache = ResponseCache(
+    ttl=float(os.getenv("PETSHOP_CACHE_TTL", "30")),
+    max_entries=int(os.getenv("PETSHOP_CACHE_MAX_ENTRIES", "256")),
+    max_bytes=int(os.getenv("PETSHOP_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+)
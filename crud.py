@@ -1,18 +1,50 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, raiseload, selectinload, with_expression
+from sqlalchemy.orm.attributes import set_committed_value
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
-from sqlalchemy import select, func
-from typing import List
+from sqlalchemy import (
+    Row,
+    RowMapping,
+    Select,
+    column,
+    func,
+    insert,
+    literal_column,
+    or_,
+    select,
+    table,
+)
+from datetime import date, datetime
+from typing import Any, Dict, Iterator, List, Sequence, Tuple, Type
 
-from database import Owner, Pet
+from cache import response_cache
+from metrics import timed
+from database import Base, Owner, OwnerStats, Pet, SpeciesStats, User
+from change_feed import claim_versions, claimed_range
+from pet_stats import recompute_pet_stats, stats_upserts
 from result import Result
+from schemas import PetFilters
+from search_index import match_query, supports_search
 from exceptions import (
     EntityNotFoundError,
     IntegrityConstraintError,
     DatabaseError,
+    SearchUnavailableError,
 )
 
+# Rows fetched per round trip when streaming through a server-side cursor
+STREAM_BATCH_SIZE = 500
+
+
+def _claim_versions(db: Session, count: int) -> range:
+    # Locks the change counter until the caller's transaction ends
+    if not count:
+        return range(0)
+    stmt = claim_versions(db.get_bind().dialect.name, count)
+    return claimed_range(db.execute(stmt).scalar_one(), count)
+
 
 # Owner operations
+@timed
 def create_owner(
     db: Session,
     name: str,
@@ -26,6 +58,7 @@ def create_owner(
     date_of_birth: str | None = None,
 ) -> Result[Owner]:
     try:
+        (change_version,) = _claim_versions(db, 1)
         db_owner = Owner(
             name=name,
             email=email,
@@ -36,10 +69,14 @@ def create_owner(
             zip_code=zip_code,
             country=country,
             date_of_birth=date_of_birth,
+            change_version=change_version,
         )
         db.add(db_owner)
         db.commit()
+        response_cache.invalidate()
         db.refresh(db_owner)
+        # A brand-new owner has no pets; say so instead of lazy loading
+        set_committed_value(db_owner, "pets", [])
         return Result.ok(db_owner)
     except IntegrityError:
         db.rollback()
@@ -54,19 +91,201 @@ def create_owner(
         return Result.err(DatabaseError(f"Database error: {str(e)}"))
 
 
-def get_owners(db: Session) -> Result[List[Owner]]:
+def _insert_many(
+    db: Session, model: Type[Base], rows: Sequence[Dict[str, Any]]
+) -> List[Row]:
+    # One executemany-style INSERT ... RETURNING (batched by SQLAlchemy's
+    # insertmanyvalues), in input order. Core rows are returned instead of
+    # ORM objects so the commit doesn't expire them and force a SELECT per
+    # row when they are serialized.
+    if not rows:
+        return []
+    table = model.__table__
+    stmt = insert(table).returning(*table.c, sort_by_parameter_order=True)
+    return list(db.execute(stmt, list(rows)).all())
+
+
+@timed
+def create_owners_bulk(
+    db: Session, owners: Sequence[Dict[str, Any]]
+) -> Result[List[Result[Row]]]:
+    """
+    Insert many owners in a single transaction.
+
+    Rows that would violate the unique email constraint are rejected up
+    front with their own error Result, so the rest of the batch still goes
+    in. The outer Result fails only if the transaction itself does.
+    """
+    try:
+        results: List[Result[Row]] = [Result.err("Not inserted")] * len(owners)
+        emails = {o["email"] for o in owners if o.get("email")}
+        taken = set()
+        if emails:
+            stmt = select(Owner.email).where(Owner.email.in_(emails))
+            taken = set(db.execute(stmt).scalars().all())
+
+        accepted: List[int] = []
+        for index, owner in enumerate(owners):
+            email = owner.get("email")
+            if email and email in taken:
+                results[index] = Result.err(
+                    IntegrityConstraintError(
+                        f"Owner with email '{email}' already exists"
+                    )
+                )
+                continue
+            if email:
+                # Also rejects duplicates within the batch itself
+                taken.add(email)
+            accepted.append(index)
+
+        versions = _claim_versions(db, len(accepted))
+        rows = [
+            {**owners[i], "change_version": version}
+            for i, version in zip(accepted, versions)
+        ]
+        inserted = _insert_many(db, Owner, rows)
+        db.commit()
+        response_cache.invalidate()
+        for index, row in zip(accepted, inserted):
+            results[index] = Result.ok(row)
+        return Result.ok(results)
+    except IntegrityError:
+        db.rollback()
+        return Result.err(
+            IntegrityConstraintError(
+                "Bulk owner insert violated a constraint; no owners were saved"
+            )
+        )
+    except SQLAlchemyError as e:
+        db.rollback()
+        return Result.err(DatabaseError(f"Database error: {str(e)}"))
+
+
+def _columns_select(model: Type[Base], columns: Sequence[str]) -> Select:
+    # Table columns rather than mapped attributes: a Core select, so rows
+    # come back as tuples with no entity hydration or identity map
+    return select(*(model.__table__.c[name] for name in columns))
+
+
+def _owner_pets_loader(include_pets: bool):
+    # Pets are fetched for the whole page in one extra SELECT ... IN query,
+    # never one query per owner; without them any access is an error.
+    if include_pets:
+        return selectinload(Owner.pets)
+    return raiseload(Owner.pets)
+
+
+def _pet_count():
+    # Correlated rather than a GROUP BY over all pets: each owner on the
+    # page is counted from the (owner_id, id) index alone, so a page costs
+    # the same however many pets other owners have
+    return (
+        select(func.count(Pet.id))
+        .where(Pet.owner_id == Owner.id)
+        .correlate(Owner)
+        .scalar_subquery()
+    )
+
+
+def _owners_stmt(
+    limit: int | None,
+    after: int | None,
+    include_pets: bool,
+    columns: Sequence[str] = (),
+    with_pet_count: bool = False,
+) -> Select:
+    # Keyset pagination on the primary key: the page cost stays flat
+    # however deep the cursor is, unlike OFFSET.
+    if columns:
+        stmt = _columns_select(Owner, columns).order_by(Owner.id)
+    else:
+        stmt = (
+            select(Owner)
+            .options(_owner_pets_loader(include_pets))
+            .order_by(Owner.id)
+        )
+    if with_pet_count:
+        stmt = stmt.options(with_expression(Owner.pet_count, _pet_count()))
+    if after is not None:
+        stmt = stmt.where(Owner.id > after)
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    return stmt
+
+
+@timed
+def get_owners(
+    db: Session,
+    limit: int | None = None,
+    after: int | None = None,
+    include_pets: bool = False,
+    with_pet_count: bool = False,
+) -> Result[List[Owner]]:
+    """
+    A page of owners; with_pet_count fills Owner.pet_count in the same
+    query instead of loading the pets.
+    """
     try:
-        stmt = select(Owner)
+        stmt = _owners_stmt(
+            limit, after, include_pets, with_pet_count=with_pet_count
+        )
         result = db.execute(stmt).scalars().all()
         return Result.ok(list(result))
     except SQLAlchemyError as e:
         return Result.err(DatabaseError(f"Error retrieving owners: {str(e)}"))
 
 
-def get_owner(db: Session, owner_id: int) -> Result[Owner]:
+@timed
+def get_owner_fields(
+    db: Session,
+    columns: Sequence[str],
+    limit: int | None = None,
+    after: int | None = None,
+) -> Result[List[RowMapping]]:
+    """Only the named owners columns, as plain row mappings."""
+    try:
+        stmt = _owners_stmt(limit, after, False, columns)
+        return Result.ok(list(db.execute(stmt).mappings()))
+    except SQLAlchemyError as e:
+        return Result.err(DatabaseError(f"Error retrieving owners: {str(e)}"))
+
+
+@timed
+def stream_owners(
+    db: Session,
+    limit: int | None = None,
+    after: int | None = None,
+    include_pets: bool = False,
+    batch_size: int = STREAM_BATCH_SIZE,
+    with_pet_count: bool = False,
+) -> Result[Iterator[Owner]]:
+    """
+    Iterate owners through a server-side cursor, batch_size rows at a time.
+
+    The cursor stays open until the iterator is exhausted, so the session
+    must outlive the caller (see database.get_session_factory).
+    """
+    try:
+        stmt = _owners_stmt(
+            limit, after, include_pets, with_pet_count=with_pet_count
+        ).execution_options(yield_per=batch_size)
+        return Result.ok(iter(db.execute(stmt).scalars()))
+    except SQLAlchemyError as e:
+        return Result.err(DatabaseError(f"Error streaming owners: {str(e)}"))
+
+
+@timed
+def get_owner(
+    db: Session, owner_id: int, include_pets: bool = False
+) -> Result[Owner]:
     try:
         # SQLAlchemy 2.0 style
-        stmt = select(Owner).where(Owner.id == owner_id)
+        stmt = (
+            select(Owner)
+            .options(_owner_pets_loader(include_pets))
+            .where(Owner.id == owner_id)
+        )
         owner = db.execute(stmt).scalar_one_or_none()
         if not owner:
             return Result.err(
@@ -80,6 +299,14 @@ def get_owner(db: Session, owner_id: int) -> Result[Owner]:
 
 
 # Pet operations
+def _add_pet_stats(db: Session, pets: Sequence[Dict[str, Any]]) -> None:
+    # Runs inside the caller's transaction, so the summary rows commit or
+    # roll back together with the pets
+    for stmt, rows in stats_upserts(db.get_bind().dialect.name, pets):
+        db.execute(stmt, rows)
+
+
+@timed
 def create_pet(
     db: Session,
     name: str,
@@ -93,10 +320,11 @@ def create_pet(
     description: str | None = None,
     gender: str | None = None,
     is_vaccinated: bool | None = None,
-    birthdate: str | None = None,
-    date_added: str | None = None,
+    birthdate: date | None = None,
+    date_added: datetime | None = None,
 ) -> Result[Pet]:
     try:
+        (change_version,) = _claim_versions(db, 1)
         db_pet = Pet(
             name=name,
             owner_id=owner_id,
@@ -111,9 +339,23 @@ def create_pet(
             is_vaccinated=is_vaccinated,
             birthdate=birthdate,
             date_added=date_added,
+            change_version=change_version,
         )
         db.add(db_pet)
+        _add_pet_stats(
+            db,
+            [
+                {
+                    "owner_id": owner_id,
+                    "species": species,
+                    "age": age,
+                    "weight": weight,
+                    "is_vaccinated": is_vaccinated,
+                }
+            ],
+        )
         db.commit()
+        response_cache.invalidate()
         db.refresh(db_pet)
         return Result.ok(db_pet)
     except IntegrityError:
@@ -128,17 +370,327 @@ def create_pet(
         return Result.err(DatabaseError(f"Database error: {str(e)}"))
 
 
-def get_pets(db: Session) -> Result[List[Pet]]:
+@timed
+def create_pets_bulk(
+    db: Session, pets: Sequence[Dict[str, Any]]
+) -> Result[List[Result[Row]]]:
+    """
+    Insert many pets in a single transaction.
+
+    Every owner_id is checked with one query; pets whose owner does not
+    exist get their own error Result and the rest of the batch still goes
+    in. The outer Result fails only if the transaction itself does.
+    """
     try:
-        # SQLAlchemy 2.0 style
-        stmt = select(Pet)
+        results: List[Result[Row]] = [Result.err("Not inserted")] * len(pets)
+        owner_ids = {p["owner_id"] for p in pets}
+        stmt = select(Owner.id).where(Owner.id.in_(owner_ids))
+        known_owners = set(db.execute(stmt).scalars().all())
+
+        accepted: List[int] = []
+        for index, pet in enumerate(pets):
+            if pet["owner_id"] not in known_owners:
+                results[index] = Result.err(
+                    EntityNotFoundError(
+                        f"Owner with id {pet['owner_id']} not found"
+                    )
+                )
+                continue
+            accepted.append(index)
+
+        versions = _claim_versions(db, len(accepted))
+        rows = [
+            {**pets[i], "change_version": version}
+            for i, version in zip(accepted, versions)
+        ]
+        inserted = _insert_many(db, Pet, rows)
+        _add_pet_stats(db, rows)
+        db.commit()
+        response_cache.invalidate()
+        for index, row in zip(accepted, inserted):
+            results[index] = Result.ok(row)
+        return Result.ok(results)
+    except IntegrityError:
+        db.rollback()
+        return Result.err(
+            IntegrityConstraintError(
+                "Bulk pet insert violated a constraint; no pets were saved"
+            )
+        )
+    except SQLAlchemyError as e:
+        db.rollback()
+        return Result.err(DatabaseError(f"Database error: {str(e)}"))
+
+
+def _pets_stmt(
+    limit: int | None,
+    after: int | None,
+    filters: PetFilters | None = None,
+    columns: Sequence[str] = (),
+) -> Select:
+    # SQLAlchemy 2.0 style, keyset paginated on the primary key. Equality
+    # filters on owner_id / species pair with the (column, id) indexes so
+    # a filtered page is still a single index range scan.
+    stmt = _columns_select(Pet, columns) if columns else select(Pet)
+    if filters is not None:
+        stmt = _filter_pets(stmt, filters)
+    if filters is not None and filters.newest_first:
+        stmt = _newest_first(stmt, after)
+    else:
+        stmt = stmt.order_by(Pet.id)
+        if after is not None:
+            stmt = stmt.where(Pet.id > after)
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    return stmt
+
+
+def _filter_pets(stmt: Select, filters: PetFilters) -> Select:
+    equal = {
+        Pet.species: filters.species,
+        Pet.owner_id: filters.owner_id,
+        Pet.is_vaccinated: filters.is_vaccinated,
+        Pet.gender: filters.gender,
+    }
+    for column, value in equal.items():
+        if value is not None:
+            stmt = stmt.where(column == value)
+    if filters.min_age is not None:
+        stmt = stmt.where(Pet.age >= filters.min_age)
+    if filters.max_age is not None:
+        stmt = stmt.where(Pet.age <= filters.max_age)
+    if filters.min_weight is not None:
+        stmt = stmt.where(Pet.weight >= filters.min_weight)
+    if filters.max_weight is not None:
+        stmt = stmt.where(Pet.weight <= filters.max_weight)
+    if filters.added_since is not None:
+        stmt = stmt.where(Pet.date_added >= filters.added_since)
+    if filters.added_before is not None:
+        stmt = stmt.where(Pet.date_added < filters.added_before)
+    return stmt
+
+
+def _newest_first(stmt: Select, after: int | None) -> Select:
+    # Walks the (date_added, id) index backwards. The cursor is still a pet
+    # id: the page continues below that pet's (date_added, id), looked up
+    # in the same query. Pets without a date_added have no place in this
+    # order and are left out.
+    stmt = stmt.where(Pet.date_added.is_not(None)).order_by(
+        Pet.date_added.desc(), Pet.id.desc()
+    )
+    if after is not None:
+        cursor_added = (
+            select(Pet.date_added).where(Pet.id == after).scalar_subquery()
+        )
+        # The first condition bounds the index range; the second breaks
+        # date_added ties by id
+        stmt = stmt.where(
+            Pet.date_added <= cursor_added,
+            or_(Pet.date_added < cursor_added, Pet.id < after),
+        )
+    return stmt
+
+
+@timed
+def get_pets(
+    db: Session,
+    limit: int | None = None,
+    after: int | None = None,
+    filters: PetFilters | None = None,
+) -> Result[List[Pet]]:
+    try:
+        stmt = _pets_stmt(limit, after, filters)
         result = db.execute(stmt).scalars().all()
         return Result.ok(list(result))
     except SQLAlchemyError as e:
         return Result.err(DatabaseError(f"Error retrieving pets: {str(e)}"))
 
 
+@timed
+def get_pet_fields(
+    db: Session,
+    columns: Sequence[str],
+    limit: int | None = None,
+    after: int | None = None,
+    filters: PetFilters | None = None,
+) -> Result[List[RowMapping]]:
+    """Only the named pets columns, as plain row mappings."""
+    try:
+        stmt = _pets_stmt(limit, after, filters, columns)
+        return Result.ok(list(db.execute(stmt).mappings()))
+    except SQLAlchemyError as e:
+        return Result.err(DatabaseError(f"Error retrieving pets: {str(e)}"))
+
+
+@timed
+def stream_pets(
+    db: Session,
+    limit: int | None = None,
+    after: int | None = None,
+    filters: PetFilters | None = None,
+    batch_size: int = STREAM_BATCH_SIZE,
+) -> Result[Iterator[Pet]]:
+    """
+    Iterate pets through a server-side cursor, batch_size rows at a time.
+
+    The cursor stays open until the iterator is exhausted, so the session
+    must outlive the caller (see database.get_session_factory).
+    """
+    try:
+        stmt = _pets_stmt(limit, after, filters).execution_options(
+            yield_per=batch_size
+        )
+        return Result.ok(iter(db.execute(stmt).scalars()))
+    except SQLAlchemyError as e:
+        return Result.err(DatabaseError(f"Error streaming pets: {str(e)}"))
+
+
+# Change feed operations
+@timed
+def get_changes(
+    db: Session, since: int, limit: int
+) -> Result[Tuple[List[Owner], List[Pet]]]:
+    """
+    Up to limit owners and limit pets stamped after since, each in version
+    order; change_feed.page_changes merges them into one page. Both are
+    range scans of the change_version indexes.
+    """
+    try:
+        owners_stmt = (
+            select(Owner)
+            .options(_owner_pets_loader(False))
+            .where(Owner.change_version > since)
+            .order_by(Owner.change_version)
+            .limit(limit)
+        )
+        pets_stmt = (
+            select(Pet)
+            .where(Pet.change_version > since)
+            .order_by(Pet.change_version)
+            .limit(limit)
+        )
+        owners = list(db.execute(owners_stmt).scalars().all())
+        pets = list(db.execute(pets_stmt).scalars().all())
+        return Result.ok((owners, pets))
+    except SQLAlchemyError as e:
+        return Result.err(DatabaseError(f"Error retrieving changes: {str(e)}"))
+
+
+# Statistics operations
+@timed
+def get_species_stats(db: Session) -> Result[List[SpeciesStats]]:
+    """One summary row per species; cost is independent of pet count."""
+    try:
+        stmt = select(SpeciesStats).order_by(SpeciesStats.species)
+        return Result.ok(list(db.execute(stmt).scalars().all()))
+    except SQLAlchemyError as e:
+        return Result.err(
+            DatabaseError(f"Error retrieving pet statistics: {str(e)}")
+        )
+
+
+@timed
+def get_owner_stats(db: Session, owner_id: int) -> Result[OwnerStats | None]:
+    """An owner's summary row; None when they have no pets yet."""
+    try:
+        return Result.ok(db.get(OwnerStats, owner_id))
+    except SQLAlchemyError as e:
+        return Result.err(
+            DatabaseError(f"Error retrieving owner statistics: {str(e)}")
+        )
+
+
+# User operations
+@timed
+def get_user(db: Session, user_id: int) -> Result[User | None]:
+    try:
+        return Result.ok(db.get(User, user_id))
+    except SQLAlchemyError as e:
+        return Result.err(DatabaseError(f"Error retrieving user: {str(e)}"))
+
+
+# Search operations
+# bm25 column weights, in search_index.SEARCH_TABLES column order: a hit
+# in the name outranks one in the breed / email, which outranks the rest
+PET_SEARCH_WEIGHTS = (10.0, 4.0, 1.0)
+OWNER_SEARCH_WEIGHTS = (10.0, 4.0, 2.0)
+
+
+def _search_stmt(
+    model: Type[Base],
+    fts_name: str,
+    weights: Sequence[float],
+    match: str,
+    limit: int,
+    offset: int,
+) -> Select:
+    fts = table(fts_name, column("rowid"))
+    fts_ref = literal_column(fts_name)
+    return (
+        select(model)
+        .join(fts, fts.c.rowid == model.id)
+        .where(fts_ref.op("MATCH")(match))
+        # bm25() is lower for better matches; id breaks ties so pages
+        # don't overlap
+        .order_by(func.bm25(fts_ref, *weights), model.id)
+        .limit(limit)
+        .offset(offset)
+    )
+
+
+def _search_unavailable(db: Session) -> Result | None:
+    dialect_name = db.get_bind().dialect.name
+    if supports_search(dialect_name):
+        return None
+    return Result.err(
+        SearchUnavailableError(
+            f"Full-text search is not available on {dialect_name}"
+        )
+    )
+
+
+@timed
+def search_pets(
+    db: Session, query: str, limit: int, offset: int = 0
+) -> Result[List[Pet]]:
+    """Pets whose name, breed or description match query, best first."""
+    unavailable = _search_unavailable(db)
+    if unavailable is not None:
+        return unavailable
+    match = match_query(query)
+    if match is None:
+        return Result.ok([])
+    try:
+        stmt = _search_stmt(
+            Pet, "pets_fts", PET_SEARCH_WEIGHTS, match, limit, offset
+        )
+        return Result.ok(list(db.execute(stmt).scalars().all()))
+    except SQLAlchemyError as e:
+        return Result.err(DatabaseError(f"Error searching pets: {str(e)}"))
+
+
+@timed
+def search_owners(
+    db: Session, query: str, limit: int, offset: int = 0
+) -> Result[List[Owner]]:
+    """Owners whose name, email or city match query, best first."""
+    unavailable = _search_unavailable(db)
+    if unavailable is not None:
+        return unavailable
+    match = match_query(query)
+    if match is None:
+        return Result.ok([])
+    try:
+        stmt = _search_stmt(
+            Owner, "owners_fts", OWNER_SEARCH_WEIGHTS, match, limit, offset
+        ).options(_owner_pets_loader(False))
+        return Result.ok(list(db.execute(stmt).scalars().all()))
+    except SQLAlchemyError as e:
+        return Result.err(DatabaseError(f"Error searching owners: {str(e)}"))
+
+
 # Sample data operations
+@timed
 def create_sample_data(db: Session) -> Result[None]:
     try:
         # Only insert if tables are empty
@@ -182,11 +734,11 @@ def create_sample_data(db: Session) -> Result[None]:
                     date_of_birth="1992-12-05",
                 ),
             ]
+            for owner, version in zip(owners, _claim_versions(db, 3)):
+                owner.change_version = version
             db.add_all(owners)
             db.commit()
 
-            from datetime import date, datetime
-
             pet1 = Pet(
                 name="Fluffy",
                 owner_id=owners[0].id,
@@ -198,8 +750,8 @@ def create_sample_data(db: Session) -> Result[None]:
                 description="Playful and fluffy.",
                 gender="female",
                 is_vaccinated=True,
-                birthdate=str(date(2023, 3, 1)),
-                date_added=str(datetime.now()),
+                birthdate=date(2023, 3, 1),
+                date_added=datetime.now(),
             )
             pet2 = Pet(
                 name="Spot",
@@ -212,8 +764,8 @@ def create_sample_data(db: Session) -> Result[None]:
                 description="Energetic and loyal.",
                 gender="male",
                 is_vaccinated=False,
-                birthdate=str(date(2020, 7, 15)),
-                date_added=str(datetime.now()),
+                birthdate=date(2020, 7, 15),
+                date_added=datetime.now(),
             )
             pet3 = Pet(
                 name="Whiskers",
@@ -226,11 +778,17 @@ def create_sample_data(db: Session) -> Result[None]:
                 description="Curious and vocal.",
                 gender="male",
                 is_vaccinated=True,
-                birthdate=str(date(2022, 1, 10)),
-                date_added=str(datetime.now()),
+                birthdate=date(2022, 1, 10),
+                date_added=datetime.now(),
             )
-            db.add_all([pet1, pet2, pet3])
+            pets = [pet1, pet2, pet3]
+            for pet, version in zip(pets, _claim_versions(db, 3)):
+                pet.change_version = version
+            db.add_all(pets)
+            db.flush()
+            recompute_pet_stats(db.connection())
             db.commit()
+            response_cache.invalidate()
         return Result.ok(None)
     except SQLAlchemyError as e:
         db.rollback()
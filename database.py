@@ -1,18 +1,431 @@
-from sqlalchemy import create_engine, Integer, String, ForeignKey
+import itertools
+import math
+import os
+import re
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field, replace
+from datetime import date, datetime
+
+from sqlalchemy import (
+    Engine,
+    create_engine,
+    event,
+    inspect,
+    make_url,
+    Date,
+    DateTime,
+    Float,
+    Integer,
+    String,
+    ForeignKey,
+    Index,
+)
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    async_sessionmaker,
+    create_async_engine,
+)
 from sqlalchemy.orm import (
     DeclarativeBase,
+    Session,
     sessionmaker,
     Mapped,
     mapped_column,
+    query_expression,
     relationship,
 )
-from typing import List
-from passlib.hash import bcrypt
+from typing import Any, Dict, List, Mapping, Sequence, Tuple
+from passwords import pwd_context
+from starlette.datastructures import MutableHeaders
+from starlette.requests import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+@dataclass(frozen=True)
+class EngineProfile:
+    """Connection settings for one deployment environment."""
+
+    url: str
+    # Defaults to url with its driver swapped for the asyncio one
+    async_url: str | None = None
+    echo: bool = False
+    pool_size: int = 5
+    max_overflow: int = 10
+    # Seconds before a pooled connection is replaced; -1 keeps it forever
+    pool_recycle: int = -1
+    pool_pre_ping: bool = False
+    # Read replicas for read-only endpoints; empty means read the primary
+    replica_urls: Tuple[str, ...] = ()
+    # After a client writes, its reads stay on the primary this long
+    sticky_seconds: float = 5.0
+    # Applied to every new SQLite connection, in order
+    sqlite_pragmas: Dict[str, str | int] = field(default_factory=dict)
+
+
+# Connection-level pragmas only: they cost nothing on disk, so the dev
+# database file stays in its original rollback-journal mode.
+_SAFE_SQLITE_PRAGMAS: Dict[str, str | int] = {
+    "foreign_keys": "ON",
+    "busy_timeout": 5000,
+}
+
+ENGINE_PROFILES: Dict[str, EngineProfile] = {
+    "dev": EngineProfile(
+        url="sqlite:///./petshop.db",
+        echo=True,
+        sqlite_pragmas=_SAFE_SQLITE_PRAGMAS,
+    ),
+    "test": EngineProfile(
+        url="sqlite:///./petshop.db",
+        sqlite_pragmas=_SAFE_SQLITE_PRAGMAS,
+    ),
+    "prod": EngineProfile(
+        url="sqlite:///./petshop.db",
+        pool_size=10,
+        max_overflow=20,
+        pool_recycle=1800,
+        pool_pre_ping=True,
+        sqlite_pragmas={
+            # WAL lets readers run alongside the single writer; with it,
+            # synchronous=NORMAL is still durable against app crashes.
+            "journal_mode": "WAL",
+            "synchronous": "NORMAL",
+            "busy_timeout": 5000,
+            # Negative = KiB, so a 64 MiB page cache per connection
+            "cache_size": -64000,
+            "mmap_size": 268435456,
+            "temp_store": "MEMORY",
+            "foreign_keys": "ON",
+        },
+    ),
+}
+
+_PRAGMA_TOKEN = re.compile(r"^-?[A-Za-z0-9_]+$")
+
+
+def _env_bool(value: str) -> bool:
+    return value.lower() in ("1", "true", "yes", "on")
+
+
+def load_engine_profile(env: Mapping[str, str] = os.environ) -> EngineProfile:
+    """
+    Pick the profile named by PETSHOP_DB_PROFILE (default "dev") and apply
+    any PETSHOP_DATABASE_URL / PETSHOP_ASYNC_DATABASE_URL /
+    PETSHOP_DATABASE_REPLICA_URLS / PETSHOP_DB_* / PETSHOP_SQLITE_PRAGMAS
+    overrides from the environment.
+    """
+    name = env.get("PETSHOP_DB_PROFILE", "dev")
+    if name not in ENGINE_PROFILES:
+        raise ValueError(
+            f"Unknown PETSHOP_DB_PROFILE '{name}'; "
+            f"expected one of {', '.join(sorted(ENGINE_PROFILES))}"
+        )
+    profile = ENGINE_PROFILES[name]
+    overrides: Dict[str, Any] = {}
+    if "PETSHOP_DATABASE_URL" in env:
+        overrides["url"] = env["PETSHOP_DATABASE_URL"]
+    if "PETSHOP_ASYNC_DATABASE_URL" in env:
+        overrides["async_url"] = env["PETSHOP_ASYNC_DATABASE_URL"]
+    if "PETSHOP_DB_ECHO" in env:
+        overrides["echo"] = _env_bool(env["PETSHOP_DB_ECHO"])
+    for key in ("pool_size", "max_overflow", "pool_recycle"):
+        env_key = f"PETSHOP_DB_{key.upper()}"
+        if env_key in env:
+            overrides[key] = int(env[env_key])
+    if env.get("PETSHOP_DATABASE_REPLICA_URLS"):
+        # e.g. "sqlite:///file:replica.db?mode=ro&uri=true,..."
+        overrides["replica_urls"] = tuple(
+            url.strip()
+            for url in env["PETSHOP_DATABASE_REPLICA_URLS"].split(",")
+            if url.strip()
+        )
+    if "PETSHOP_DB_STICKY_SECONDS" in env:
+        overrides["sticky_seconds"] = float(env["PETSHOP_DB_STICKY_SECONDS"])
+    if "PETSHOP_DB_POOL_PRE_PING" in env:
+        overrides["pool_pre_ping"] = _env_bool(env["PETSHOP_DB_POOL_PRE_PING"])
+    if env.get("PETSHOP_SQLITE_PRAGMAS"):
+        # e.g. "journal_mode=WAL,synchronous=NORMAL"
+        pragmas = dict(profile.sqlite_pragmas)
+        for item in env["PETSHOP_SQLITE_PRAGMAS"].split(","):
+            key, _, value = item.partition("=")
+            pragmas[key.strip()] = value.strip()
+        overrides["sqlite_pragmas"] = pragmas
+    return replace(profile, **overrides)
+
+
+def _engine_kwargs(profile: EngineProfile) -> Dict[str, Any]:
+    kwargs: Dict[str, Any] = {"echo": profile.echo}
+    url = make_url(profile.url)
+    # In-memory SQLite uses a singleton pool that takes no sizing options
+    if url.get_backend_name() == "sqlite" and url.database in (
+        None,
+        "",
+        ":memory:",
+    ):
+        return kwargs
+    kwargs.update(
+        pool_size=profile.pool_size,
+        max_overflow=profile.max_overflow,
+        pool_recycle=profile.pool_recycle,
+        pool_pre_ping=profile.pool_pre_ping,
+    )
+    return kwargs
+
+
+def _install_sqlite_pragmas(sync_engine: Engine, profile: EngineProfile):
+    if sync_engine.dialect.name != "sqlite" or not profile.sqlite_pragmas:
+        return
+    for key, value in profile.sqlite_pragmas.items():
+        if not (_PRAGMA_TOKEN.match(key) and _PRAGMA_TOKEN.match(str(value))):
+            raise ValueError(f"Invalid SQLite pragma {key}={value}")
+    statements = [
+        f"PRAGMA {key}={value}"
+        for key, value in profile.sqlite_pragmas.items()
+    ]
+
+    @event.listens_for(sync_engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+
+
+def async_database_url(url: str) -> str:
+    """Swap a sync driver URL for its asyncio counterpart."""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend == "sqlite":
+        return parsed.set(drivername="sqlite+aiosqlite").render_as_string(
+            hide_password=False
+        )
+    if backend == "postgresql":
+        # psycopg 3 serves both sync and async under the same dialect
+        return parsed.set(drivername="postgresql+psycopg").render_as_string(
+            hide_password=False
+        )
+    return url
+
+
+def create_profile_engine(profile: EngineProfile) -> Engine:
+    db_engine = create_engine(profile.url, **_engine_kwargs(profile))
+    _install_sqlite_pragmas(db_engine, profile)
+    _install_query_accounting(db_engine)
+    return db_engine
+
+
+def create_profile_async_engine(profile: EngineProfile) -> AsyncEngine:
+    db_engine = create_async_engine(
+        profile.async_url or async_database_url(profile.url),
+        **_engine_kwargs(profile),
+    )
+    _install_sqlite_pragmas(db_engine.sync_engine, profile)
+    _install_query_accounting(db_engine.sync_engine)
+    return db_engine
+
+
+class PrimarySession(Session):
+    """Session on the primary (writable) database."""
+
+
+@dataclass
+class WriteTracker:
+    """Records whether the current request committed to the primary."""
+
+    wrote: bool = False
+
+
+_write_tracker: ContextVar[WriteTracker | None] = ContextVar(
+    "petshop_write_tracker", default=None
+)
+
+
+def track_writes() -> WriteTracker:
+    """
+    Start tracking primary commits for the current request.
+
+    The tracker is shared by reference, so commits made in threadpool
+    workers or child tasks of the request are still seen by the caller.
+    """
+    tracker = WriteTracker()
+    _write_tracker.set(tracker)
+    return tracker
+
+
+@event.listens_for(PrimarySession, "after_commit")
+def _record_write(session: Session):
+    tracker = _write_tracker.get()
+    if tracker is not None:
+        tracker.wrote = True
+
+
+# Per-request SQL accounting, enabled by PETSHOP_QUERY_ACCOUNTING
+QUERY_ACCOUNTING = os.getenv("PETSHOP_QUERY_ACCOUNTING", "").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+# A statement shape run more often than this in one request is reported as
+# a likely N+1
+N_PLUS_ONE_THRESHOLD = int(os.getenv("PETSHOP_N_PLUS_ONE_THRESHOLD", "5"))
+
+# Expanding IN lists render one placeholder per value; collapse them so
+# "IN (?, ?)" and "IN (?, ?, ?)" are the same shape
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    return _PLACEHOLDER_LIST.sub(
+        "(?)", _WHITESPACE.sub(" ", statement)
+    ).strip()
+
+
+@dataclass
+class QueryStats:
+    """Queries executed on behalf of one request."""
+
+    count: int = 0
+    seconds: float = 0.0
+    shapes: Dict[str, int] = field(default_factory=dict)
+
+    def record(self, statement: str, elapsed: float) -> None:
+        self.count += 1
+        self.seconds += elapsed
+        shape = statement_shape(statement)
+        self.shapes[shape] = self.shapes.get(shape, 0) + 1
+
+    def repeated(
+        self, threshold: int = N_PLUS_ONE_THRESHOLD
+    ) -> List[Tuple[str, int]]:
+        """Shapes executed more than threshold times, most frequent first."""
+        return sorted(
+            (
+                (shape, count)
+                for shape, count in self.shapes.items()
+                if count > threshold
+            ),
+            key=lambda item: -item[1],
+        )
+
+
+_query_stats: ContextVar[QueryStats | None] = ContextVar(
+    "petshop_query_stats", default=None
+)
+
+
+def track_queries() -> QueryStats:
+    """
+    Start counting queries for the current request.
+
+    Shared by reference like track_writes, so queries run from threadpool
+    workers and from the async engine's greenlets are included.
+    """
+    stats = QueryStats()
+    _query_stats.set(stats)
+    return stats
+
+
+_QUERY_START_KEY = "petshop_query_start"
+
+
+def _install_query_accounting(sync_engine: Engine) -> None:
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def start_query(conn, cursor, statement, parameters, context, many):
+        if _query_stats.get() is not None:
+            conn.info.setdefault(_QUERY_START_KEY, []).append(
+                time.perf_counter()
+            )
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def end_query(conn, cursor, statement, parameters, context, many):
+        stats = _query_stats.get()
+        starts = conn.info.get(_QUERY_START_KEY)
+        if stats is not None and starts:
+            stats.record(statement, time.perf_counter() - starts.pop())
+
+
+class SessionRouter:
+    """
+    Chooses the database a read-only request should use.
 
-DATABASE_URL = "sqlite:///./petshop.db"
+    Reads rotate across the replicas, except that a client which wrote in
+    the last ``sticky_seconds`` keeps reading from the primary so it sees
+    its own writes despite replication lag.
+    """
 
-engine = create_engine(DATABASE_URL, echo=True)
-SessionLocal = sessionmaker(bind=engine)
+    def __init__(
+        self,
+        primary: sessionmaker,
+        replicas: Sequence[sessionmaker] = (),
+        sticky_seconds: float = 5.0,
+    ):
+        self.primary = primary
+        self.replicas = list(replicas)
+        self.sticky_seconds = sticky_seconds
+        self._next_replica = itertools.cycle(self.replicas)
+        self._lock = threading.Lock()
+
+    def pins_primary(self, last_write_at: float | None) -> bool:
+        """Whether a client's reads must stay on the primary for now."""
+        return (
+            bool(self.replicas)
+            and last_write_at is not None
+            and time.time() - last_write_at < self.sticky_seconds
+        )
+
+    def replicas_may_lag(self, seconds_since_write: float) -> bool:
+        """Whether a replica read may not show a write that long ago yet."""
+        return (
+            bool(self.replicas) and seconds_since_write < self.sticky_seconds
+        )
+
+    def reader(self, last_write_at: float | None = None) -> sessionmaker:
+        if not self.replicas or self.pins_primary(last_write_at):
+            return self.primary
+        with self._lock:
+            return next(self._next_replica)
+
+
+ENGINE_PROFILE = load_engine_profile()
+DATABASE_URL = ENGINE_PROFILE.url
+
+engine = create_profile_engine(ENGINE_PROFILE)
+SessionLocal = sessionmaker(bind=engine, class_=PrimarySession)
+
+replica_engines = [
+    create_profile_engine(replace(ENGINE_PROFILE, url=url))
+    for url in ENGINE_PROFILE.replica_urls
+]
+router = SessionRouter(
+    SessionLocal,
+    [sessionmaker(bind=replica) for replica in replica_engines],
+    ENGINE_PROFILE.sticky_seconds,
+)
+
+# Same database through an asyncio driver, for endpoints that must not
+# block the event loop. expire_on_commit=False because an expired
+# attribute would need implicit (blocking) IO to reload.
+async_engine = create_profile_async_engine(ENGINE_PROFILE)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    expire_on_commit=False,
+    sync_session_class=PrimarySession,
+)
+
+# Strict loading turns any lazy load of Owner.pets / Pet.owner that would
+# emit SQL into an error, so N+1 patterns fail loudly in dev and tests.
+# Queries must then choose a loading strategy explicitly (see crud.py).
+STRICT_LOADING = os.getenv("PETSHOP_STRICT_LOADING", "").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+RELATIONSHIP_LAZY = "raise_on_sql" if STRICT_LOADING else "select"
 
 
 class Base(DeclarativeBase):
@@ -33,16 +446,38 @@ class Owner(Base):
     zip_code: Mapped[str | None] = mapped_column(String, nullable=True)
     country: Mapped[str | None] = mapped_column(String, nullable=True)
     date_of_birth: Mapped[str | None] = mapped_column(String, nullable=True)
-    pets: Mapped[List["Pet"]] = relationship("Pet", back_populates="owner")
+    # Stamped on insert from change_counter; see change_feed
+    change_version: Mapped[int | None] = mapped_column(
+        Integer, nullable=True, index=True
+    )
+    pets: Mapped[List["Pet"]] = relationship(
+        "Pet", back_populates="owner", lazy=RELATIONSHIP_LAZY
+    )
+    # Not a column: filled by queries that ask for it (see
+    # crud._owners_stmt), None otherwise
+    pet_count: Mapped[int | None] = query_expression()
 
 
 class Pet(Base):
     __tablename__ = "pets"
+    # Leading equality column + id so filtered keyset pages are a single
+    # index range scan; see alembic/versions/20261017_add_pet_filter_indexes
+    __table_args__ = (
+        Index("ix_pets_owner_id_id", "owner_id", "id"),
+        Index("ix_pets_species_id", "species", "id"),
+        Index("ix_pets_age", "age"),
+        Index("ix_pets_weight", "weight"),
+        # Time-range filters and the newest-first listing; see
+        # alembic/versions/20261017_typed_pet_dates
+        Index("ix_pets_date_added_id", "date_added", "id"),
+    )
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     name: Mapped[str] = mapped_column(String, index=True)
     species: Mapped[str | None] = mapped_column(String, nullable=True)
     owner_id: Mapped[int] = mapped_column(ForeignKey("owners.id"))
-    owner: Mapped["Owner"] = relationship("Owner", back_populates="pets")
+    owner: Mapped["Owner"] = relationship(
+        "Owner", back_populates="pets", lazy=RELATIONSHIP_LAZY
+    )
     photo_filename: Mapped[str | None] = mapped_column(String, nullable=True)
     age: Mapped[int | None] = mapped_column(Integer, nullable=True)
     breed: Mapped[str | None] = mapped_column(String, nullable=True)
@@ -51,10 +486,54 @@ class Pet(Base):
     description: Mapped[str | None] = mapped_column(String, nullable=True)
     gender: Mapped[str | None] = mapped_column(String, nullable=True)
     is_vaccinated: Mapped[bool | None] = mapped_column(nullable=True)
-    # ISO string for SQLite
-    birthdate: Mapped[str | None] = mapped_column(String, nullable=True)
-    # ISO string for SQLite
-    date_added: Mapped[str | None] = mapped_column(String, nullable=True)
+    birthdate: Mapped[date | None] = mapped_column(Date, nullable=True)
+    date_added: Mapped[datetime | None] = mapped_column(
+        DateTime, nullable=True
+    )
+    # Stamped on insert from change_counter; see change_feed
+    change_version: Mapped[int | None] = mapped_column(
+        Integer, nullable=True, index=True
+    )
+
+
+class ChangeCounter(Base):
+    """The single row handing out change versions; see change_feed."""
+
+    __tablename__ = "change_counter"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    version: Mapped[int] = mapped_column(Integer, default=0)
+
+
+class PetAggregates:
+    """
+    Running sums behind the /stats averages and rates. Kept as sums and
+    counts (not averages) so a new pet is a constant-time increment.
+    """
+
+    pet_count: Mapped[int] = mapped_column(Integer, default=0)
+    vaccinated_count: Mapped[int] = mapped_column(Integer, default=0)
+    # Pets with no age / weight don't count towards those averages
+    age_sum: Mapped[int] = mapped_column(Integer, default=0)
+    age_count: Mapped[int] = mapped_column(Integer, default=0)
+    weight_sum: Mapped[float] = mapped_column(Float, default=0.0)
+    weight_count: Mapped[int] = mapped_column(Integer, default=0)
+
+
+class SpeciesStats(PetAggregates, Base):
+    """Per-species aggregates, maintained by pet_stats (see there)."""
+
+    __tablename__ = "species_stats"
+    # "" stands for pets with no species, since a key can't be NULL
+    species: Mapped[str] = mapped_column(String, primary_key=True)
+
+
+class OwnerStats(PetAggregates, Base):
+    """Per-owner aggregates, maintained by pet_stats (see there)."""
+
+    __tablename__ = "owner_stats"
+    owner_id: Mapped[int] = mapped_column(
+        ForeignKey("owners.id"), primary_key=True
+    )
 
 
 class User(Base):
@@ -69,15 +548,132 @@ class User(Base):
     is_active: Mapped[bool] = mapped_column(default=True)
 
     def verify_password(self, password: str) -> bool:
-        return bcrypt.verify(password, self.hashed_password)
+        # Blocking (bcrypt); request handlers use passwords.password_hasher
+        return pwd_context.verify(password, self.hashed_password)
 
 
+# Creates whatever tables are missing (existing ones are left alone), so a
+# fresh database works out of the box. Columns added to existing tables
+# still need `alembic upgrade head`.
 Base.metadata.create_all(bind=engine)
 
 
+def missing_columns(bind: Engine) -> List[str]:
+    """
+    Model tables the database lacks, and columns as "table.column".
+
+    Anything listed was added to an existing table by a migration; an
+    older database (including the checked-in petshop.db) is brought up to
+    date with `alembic upgrade head`.
+    """
+    inspector = inspect(bind)
+    missing = []
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            missing.append(table.name)
+            continue
+        existing = {c["name"] for c in inspector.get_columns(table.name)}
+        missing += [
+            f"{table.name}.{column.name}"
+            for column in table.columns
+            if column.name not in existing
+        ]
+    return missing
+
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+# Cookie holding the time of the client's last committed write. It is
+# separate from the session so that only write responses carry a
+# Set-Cookie for it, never the public, cacheable photo responses, and it
+# expires on its own once reads may go back to the replicas.
+LAST_WRITE_COOKIE = "petshop_last_write"
+
+
+def last_write_at(request: Request) -> float | None:
+    try:
+        return float(request.cookies[LAST_WRITE_COOKIE])
+    except (KeyError, ValueError):
+        return None
+
+
+class ReadYourWritesMiddleware:
+    """
+    Pure ASGI middleware that sets the last write cookie when the request
+    committed to the primary, so the client's reads stay there for a
+    while. Nothing is set when there are no replicas to route away from.
+
+    Every message other than the response start, including zero-copy file
+    sends, passes through as is.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        tracker = track_writes()
+
+        async def send_wrapper(message: Message) -> None:
+            if (
+                message["type"] == "http.response.start"
+                and tracker.wrote
+                and router.replicas
+            ):
+                headers = MutableHeaders(raw=list(message["headers"]))
+                headers.append(
+                    "Set-Cookie",
+                    f"{LAST_WRITE_COOKIE}={time.time()}; "
+                    f"Max-Age={math.ceil(router.sticky_seconds)}; "
+                    f"Path=/; HttpOnly; SameSite=lax",
+                )
+                message["headers"] = headers.raw
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+def reads_pinned_to_primary(request: Request) -> bool:
+    """Whether this client just wrote and is reading from the primary."""
+    return router.pins_primary(last_write_at(request))
+
+
+def replicas_may_lag(seconds_since_write: float) -> bool:
+    return router.replicas_may_lag(seconds_since_write)
+
+
+def get_read_db(request: Request):
+    """Session for read-only endpoints, routed to a replica if possible."""
+    factory = router.reader(last_write_at(request))
+    db = factory()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def get_session_factory(request: Request):
+    """
+    Read session factory for endpoints that manage the session themselves,
+    chiefly streaming ones.
+
+    Dependencies with ``yield`` are torn down before the response body is
+    sent, which would close a server-side cursor mid-stream. A streaming
+    endpoint opens its own session from this factory and the response
+    closes it once it is over.
+    """
+    return router.reader(last_write_at(request))
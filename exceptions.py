@@ -14,3 +14,29 @@ class IntegrityConstraintError(DatabaseError):
     """Raised when a database constraint is violated."""
 
     pass
+
+
+class SearchUnavailableError(DatabaseError):
+    """Raised when the database has no full-text search index."""
+
+    pass
+
+
+class StorageError(Exception):
+    """Raised when an uploaded file cannot be stored."""
+
+    pass
+
+
+class PhotoTooLargeError(StorageError):
+    """Raised when an upload exceeds the configured size limit."""
+
+    pass
+
+
+class PasswordHasherBusyError(Exception):
+    """Raised when the password hashing queue is full."""
+
+    def __init__(self, message: str, retry_after: int = 1):
+        super().__init__(message)
+        self.retry_after = retry_after
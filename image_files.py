@@ -0,0 +1,145 @@
+"""
+Cache-friendly responses for stored photos.
+
+Photo names are content hashes (see photo_store and photo_variants), so a
+URL's bytes can never change: those responses are marked immutable for a
+year and carry a strong ETag derived from the name, which needs no disk
+read. Anything else (legacy upload names) must be revalidated.
+
+Bodies go out through the ASGI zero-copy extensions when the server
+offers them, so the kernel copies the file to the socket instead of the
+worker reading it through Python in 64 KiB chunks. Byte ranges are
+handled by Starlette's FileResponse.
+"""
+
+import os
+import re
+from typing import Dict
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.requests import Request
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Receive, Scope, Send
+
+from cache import etag_matches
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# A content-addressed original or one of its sized variants
+IMMUTABLE_NAME = re.compile(
+    r"[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}(_[0-9]+)?(\.[a-z0-9]{1,5})?"
+)
+
+
+def is_immutable_name(name: str) -> bool:
+    return IMMUTABLE_NAME.fullmatch(name) is not None
+
+
+def cache_headers(name: str, immutable: bool) -> Dict[str, str]:
+    if not immutable:
+        return {"Cache-Control": "no-cache"}
+    # The name already identifies the bytes, so it is a strong validator
+    return {
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL,
+        "ETag": f'"{os.path.basename(name)}"',
+    }
+
+
+class SendfileResponse(FileResponse):
+    """
+    FileResponse that hands the file to the server for zero-copy sending.
+
+    Whole-file GETs use ``http.response.pathsend`` or
+    ``http.response.zerocopysend`` when the ASGI server advertises them.
+    HEAD, byte ranges and servers without either extension (e.g. uvicorn)
+    get FileResponse's own chunked reads.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        extensions = scope.get("extensions") or {}
+        if (
+            scope["method"].upper() != "GET"
+            or "range" in Headers(scope=scope)
+            or not (
+                "http.response.pathsend" in extensions
+                or "http.response.zerocopysend" in extensions
+            )
+        ):
+            await super().__call__(scope, receive, send)
+            return
+
+        if self.stat_result is None:
+            self.stat_result = await anyio.to_thread.run_sync(
+                os.stat, self.path
+            )
+            self.set_stat_headers(self.stat_result)
+        await send(
+            {
+                "type": "http.response.start",
+                "status": self.status_code,
+                "headers": self.raw_headers,
+            }
+        )
+        if "http.response.pathsend" in extensions:
+            await send(
+                {
+                    "type": "http.response.pathsend",
+                    "path": os.path.abspath(self.path),
+                }
+            )
+        else:
+            await self._zerocopysend(send)
+        if self.background is not None:
+            await self.background()
+
+    async def _zerocopysend(self, send: Send) -> None:
+        file = await anyio.to_thread.run_sync(open, self.path, "rb")
+        try:
+            await send(
+                {
+                    "type": "http.response.zerocopysend",
+                    "file": file,
+                    "more_body": False,
+                }
+            )
+        finally:
+            await anyio.to_thread.run_sync(file.close)
+
+
+def photo_response(
+    request: Request,
+    path: str,
+    name: str,
+    immutable: bool,
+    media_type: str | None = None,
+    headers: Dict[str, str] | None = None,
+) -> Response:
+    """Serve path with the caching policy for name, or 304 on a match."""
+    all_headers = {**(headers or {}), **cache_headers(name, immutable)}
+    if immutable and etag_matches(request, all_headers["ETag"]):
+        return Response(status_code=304, headers=all_headers)
+    return SendfileResponse(path, media_type=media_type, headers=all_headers)
+
+
+class PhotoStaticFiles(StaticFiles):
+    """StaticFiles with immutable caching and zero-copy sends for photos."""
+
+    def file_response(
+        self,
+        full_path: str | os.PathLike[str],
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        name = self.get_path(scope).replace(os.sep, "/")
+        response = SendfileResponse(
+            full_path,
+            status_code=status_code,
+            stat_result=stat_result,
+            headers=cache_headers(name, is_immutable_name(name)),
+        )
+        if self.is_not_modified(response.headers, Headers(scope=scope)):
+            return NotModifiedResponse(response.headers)
+        return response
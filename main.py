@@ -4,7 +4,9 @@ Provides endpoints to create and list owners and pets.
 """
 
 import os
+from itertools import islice
 from fastapi import (
+    BackgroundTasks,
     FastAPI,
     Depends,
     status,
@@ -12,20 +14,93 @@ from fastapi import (
     UploadFile,
     File,
     Form,
+    Query,
     Request,
+    Response,
 )
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import (
+    FileResponse,
+    JSONResponse,
+    StreamingResponse,
+)
+from starlette.concurrency import run_in_threadpool
 from starlette.middleware.sessions import SessionMiddleware
-from fastapi.staticfiles import StaticFiles
-from typing import List
+from starlette.types import Receive, Scope, Send
+from typing import (
+    Any,
+    Callable,
+    Iterable,
+    Iterator,
+    List,
+    Literal,
+    Sequence,
+    Set,
+    Tuple,
+    Type,
+)
 from contextlib import asynccontextmanager
-from datetime import datetime
+from datetime import date, datetime
 from pydantic import BaseModel
+from sqlalchemy import RowMapping
 
-from database import get_db, User
-from schemas import PetRead, OwnerCreate, OwnerRead
+from cache import (
+    cache_key,
+    cached_response,
+    response_cache,
+    with_etag,
+)
+from database import (
+    QUERY_ACCOUNTING,
+    ReadYourWritesMiddleware,
+    async_engine,
+    engine,
+    replica_engines,
+    reads_pinned_to_primary,
+    replicas_may_lag,
+    get_db,
+    get_async_db,
+    get_read_db,
+    get_session_factory,
+    missing_columns,
+    User,
+)
+from schemas import (
+    PetRead,
+    OwnerCreate,
+    OwnerRead,
+    OwnerReadBase,
+    OwnerSummary,
+    OwnerPetStats,
+    PetStats,
+    ChangeSet,
+    SpeciesSummary,
+    BulkItemResult,
+    BulkOwnerCreate,
+    BulkPetCreate,
+    PetFilters,
+    SearchResults,
+    UserRead,
+    field_subset,
+)
+from photo_store import is_content_name, photo_store
+from photo_variants import MEDIA_TYPES, accepted_formats, variant_pipeline
+from image_files import PhotoStaticFiles, photo_response
+from result import Result
+from serialization import FAST_SERIALIZATION, dump_list
+from pet_stats import UNKNOWN_SPECIES, summarize
+from change_feed import page_changes
 import crud
-from passlib.hash import bcrypt
+import async_crud
+from passwords import password_hasher
+from auth import USER_ID_SESSION_KEY, current_user
+from metrics import (
+    CONTENT_TYPE,
+    MetricsMiddleware,
+    QueryAccountingMiddleware,
+    registry,
+)
 
 
 def get_app_description() -> str:
@@ -39,12 +114,324 @@ def get_app_description() -> str:
         - **Create and list owners**
         - **Create and list pets**
         - **Relational integrity**: Pets must have a valid owner
+        - **Cursor pagination**: Pass `limit` (and `after`) to list
+          endpoints and follow the `X-Next-Cursor` response header
+        - **Embedding**: `GET /owners/?include=pets` nests each owner's pets;
+          `include=pet_count` adds just the number of pets, in the same
+          query
+        - **Filtering**: `GET /pets/` filters by species, owner,
+          vaccination, gender, age / weight ranges and the time added
+          (`added_since`, `added_before`); `order=newest` lists the most
+          recently added first
+        - **Sparse fieldsets**: `fields=id,name,species` on `GET /pets/`
+          and `GET /owners/` selects and returns only those columns
+        - **Caching**: list responses carry strong ETags; send
+          `If-None-Match` to get a bodiless 304 when nothing changed
+        - **Streaming**: `stream=json` or `stream=ndjson` on list endpoints
+          writes rows as they are read, in constant memory
+        - **Photos**: uploads are streamed to content-addressed storage,
+          so identical photos are stored once; `GET /photos/{name}?w=`
+          serves resized AVIF / WebP / JPEG copies by `Accept`; photo
+          URLs are content hashes, served immutable with strong ETags and
+          byte ranges
+        - **Search**: `GET /search?q=` ranks pets and owners by full-text
+          relevance
+        - **Change feed**: `GET /changes?since=` returns only the owners and
+          pets added after a cursor, plus the next cursor, for incremental
+          sync
+        - **Statistics**: `GET /stats` and `GET /owners/{id}/stats` report
+          pet counts, vaccination rate and average age / weight from
+          summary tables, without scanning pets
         """
 
 
+# Largest page a client may request from the list endpoints
+MAX_PAGE_SIZE = 1000
+
+
+def paginate(
+    items: Sequence[Any], limit: int | None, response: Response
+) -> List[Any]:
+    """
+    Trim a page fetched with one extra row and advertise the next cursor.
+
+    The crud layer is asked for ``limit + 1`` rows; if the extra row came
+    back there is another page, and its cursor is the id of the last row
+    we return.
+    """
+    page = list(items)
+    if limit is not None and len(page) > limit:
+        page = page[:limit]
+        last = page[-1]
+        # ?fields= pages are row mappings rather than objects
+        cursor = last["id"] if isinstance(last, RowMapping) else last.id
+        response.headers["X-Next-Cursor"] = str(cursor)
+    return page
+
+
+def parse_include(include: str | None, allowed: Set[str]) -> Set[str]:
+    """Parse a comma-separated `include` query value into relation names."""
+    if not include:
+        return set()
+    requested = {part.strip() for part in include.split(",") if part.strip()}
+    unknown = requested - allowed
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=(
+                f"Cannot include {', '.join(sorted(unknown))}; "
+                f"allowed: {', '.join(sorted(allowed))}"
+            ),
+        )
+    return requested
+
+
+def parse_fields(
+    fields: str | None, schema: Type[BaseModel]
+) -> Tuple[str, ...]:
+    """
+    Parse a comma-separated `fields` query value into column names.
+
+    Names come back in the schema's order, always starting with `id` (the
+    pagination cursor), so equivalent requests select the same columns.
+    """
+    if not fields:
+        return ()
+    requested = {part.strip() for part in fields.split(",") if part.strip()}
+    unknown = requested - set(schema.model_fields)
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=(
+                f"Unknown fields {', '.join(sorted(unknown))}; "
+                f"allowed: {', '.join(schema.model_fields)}"
+            ),
+        )
+    return tuple(
+        name
+        for name in schema.model_fields
+        if name == "id" or name in requested
+    )
+
+
+def reject_with_fields(columns: Tuple[str, ...], **options: Any) -> None:
+    """400 if `fields` was combined with an option it doesn't support."""
+    used = [name for name, value in options.items() if value is not None]
+    if columns and used:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"fields cannot be combined with {', '.join(used)}",
+        )
+
+
+def render_fields(
+    schema: Type[BaseModel],
+    columns: Tuple[str, ...],
+    rows: Sequence[Any],
+    response: Response,
+) -> Response:
+    """Serialize projected rows with just the selected schema fields."""
+    return Response(
+        dump_list(field_subset(schema, columns), rows),
+        media_type="application/json",
+        headers=dict(response.headers),
+    )
+
+
+def render_list(
+    schema: Type[BaseModel], items: Sequence[Any], response: Response
+) -> Response:
+    """
+    Serialize items with a schema other than the route's response_model.
+
+    Headers already set on the injected response (e.g. the pagination
+    cursor) are carried over, since returning a Response bypasses it.
+    """
+    if FAST_SERIALIZATION:
+        return Response(
+            dump_list(schema, items),
+            media_type="application/json",
+            headers=dict(response.headers),
+        )
+    content = jsonable_encoder([schema.model_validate(i) for i in items])
+    return JSONResponse(content=content, headers=dict(response.headers))
+
+
+STREAM_MEDIA_TYPES = {
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+}
+
+StreamFormat = Literal["json", "ndjson"]
+
+
+class CursorStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse that closes the session owning its cursor once the
+    response is over, however it ends: body written, client gone before
+    or during the stream, or an error.
+    """
+
+    def __init__(
+        self, content: Iterator[bytes], close: Callable[[], None], **kwargs
+    ):
+        super().__init__(content, **kwargs)
+        self.close = close
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await run_in_threadpool(self.close)
+
+
+def stream_list(
+    schema: Type[BaseModel],
+    rows: Iterable[Any],
+    fmt: StreamFormat,
+    close: Callable[[], None],
+    chunk_size: int = crud.STREAM_BATCH_SIZE,
+) -> StreamingResponse:
+    """
+    Encode rows incrementally as a JSON array or NDJSON.
+
+    Rows are serialized one chunk at a time so only a single batch is ever
+    held in memory. ``close`` releases the session that owns the cursor
+    once the response is over.
+    """
+    separator = b"," if fmt == "json" else b"\n"
+
+    def body() -> Iterator[bytes]:
+        rows_iter = iter(rows)
+        first = True
+        if fmt == "json":
+            yield b"["
+        while chunk := list(islice(rows_iter, chunk_size)):
+            encoded = separator.join(
+                schema.model_validate(row).model_dump_json().encode()
+                for row in chunk
+            )
+            if fmt == "json" and not first:
+                encoded = separator + encoded
+            elif fmt == "ndjson":
+                encoded += separator
+            first = False
+            yield encoded
+        if fmt == "json":
+            yield b"]"
+
+    return CursorStreamingResponse(
+        body(), close, media_type=STREAM_MEDIA_TYPES[fmt]
+    )
+
+
+PetOrder = Literal["id", "newest"]
+
+
+def pet_filters(
+    species: str | None = Query(None),
+    owner_id: int | None = Query(None),
+    is_vaccinated: bool | None = Query(None),
+    gender: str | None = Query(None),
+    min_age: int | None = Query(None, ge=0),
+    max_age: int | None = Query(None, ge=0),
+    min_weight: float | None = Query(None, ge=0),
+    max_weight: float | None = Query(None, ge=0),
+    added_since: datetime | None = Query(
+        None,
+        description=(
+            "Only pets added at or after this time; without an offset it "
+            "is the server's local time"
+        ),
+    ),
+    added_before: datetime | None = Query(
+        None,
+        description="Only pets added before this time, read as added_since",
+    ),
+    order: PetOrder = Query(
+        "id",
+        description=(
+            "`id`, or `newest` for the most recently added first (pets "
+            "without a date added are left out)"
+        ),
+    ),
+) -> PetFilters:
+    """Collect the pet filter and ordering query parameters."""
+    return PetFilters(
+        species=species,
+        owner_id=owner_id,
+        is_vaccinated=is_vaccinated,
+        gender=gender,
+        min_age=min_age,
+        max_age=max_age,
+        min_weight=min_weight,
+        max_weight=max_weight,
+        added_since=added_since,
+        added_before=added_before,
+        newest_first=order == "newest",
+    )
+
+
+def lookup_list_cache(
+    request: Request,
+) -> Tuple[Response | None, str | None, int]:
+    """
+    Look a list request up in the response cache.
+
+    Returns the cached response (or 304) on a hit, otherwise the key to
+    store the fresh response under and the cache generation to store it
+    against. Clients pinned to the primary after a write bypass the cache,
+    which may hold a replica's older view. Until replicas have had time to
+    catch up with the write that last invalidated the cache, nobody uses
+    it: a replica read could refill it with the pre-write rows.
+    """
+    generation = response_cache.generation
+    if (
+        not response_cache.enabled
+        or reads_pinned_to_primary(request)
+        or replicas_may_lag(response_cache.seconds_since_invalidation)
+    ):
+        return None, None, generation
+    key = cache_key(request)
+    entry = response_cache.get(key)
+    if entry is not None:
+        return cached_response(entry, request), key, generation
+    return None, key, generation
+
+
+def bulk_response(
+    results: Sequence[Result[Any]], response: Response
+) -> List[dict]:
+    """
+    Turn per-row Results into BulkItemResult payloads.
+
+    The status is 201 when every row was created and 207 (Multi-Status)
+    when some rows were rejected.
+    """
+    if any(r.is_err for r in results):
+        response.status_code = status.HTTP_207_MULTI_STATUS
+    return [
+        {
+            "index": index,
+            "ok": r.is_ok,
+            "item": r.value,
+            "error": r.error,
+            "error_type": r.error_type,
+        }
+        for index, r in enumerate(results)
+    ]
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Lifespan event handler to insert sample data on startup."""
+    # Every query on Owner / Pet would fail against an older schema
+    missing = missing_columns(engine)
+    if missing:
+        raise RuntimeError(
+            f"Database schema is out of date (missing {', '.join(missing)}); "
+            f"run `alembic upgrade head`"
+        )
     db = next(get_db())
     try:
         result = crud.create_sample_data(db)
@@ -56,6 +443,8 @@ async def lifespan(app: FastAPI):
     finally:
         db.close()
     yield
+    variant_pipeline.shutdown()
+    password_hasher.shutdown()
 
 
 app = FastAPI(
@@ -65,6 +454,9 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
+
+app.add_middleware(ReadYourWritesMiddleware)
+
 # Add CORS middleware for frontend-backend communication
 app.add_middleware(
     CORSMiddleware,
@@ -72,6 +464,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[
+        "X-Next-Cursor",
+        "ETag",
+        "X-Query-Count",
+        "Server-Timing",
+    ],
 )
 
 # Add Session middleware for user authentication
@@ -81,6 +479,17 @@ app.add_middleware(
     session_cookie="petshop_session",
 )
 
+if QUERY_ACCOUNTING:
+    app.add_middleware(QueryAccountingMiddleware)
+
+# Added last so it is outermost and times the other middleware too
+app.add_middleware(MetricsMiddleware, router=app.router)
+
+registry.watch_engine("primary", engine)
+registry.watch_engine("primary_async", async_engine.sync_engine)
+for index, replica in enumerate(replica_engines):
+    registry.watch_engine(f"replica_{index}", replica)
+
 
 @app.post(
     "/owners/",
@@ -118,30 +527,240 @@ def create_owner(owner: OwnerCreate, db=Depends(get_db)):
     return result.value
 
 
+@app.post(
+    "/owners/bulk",
+    response_model=List[BulkItemResult[OwnerReadBase]],
+    status_code=status.HTTP_201_CREATED,
+    tags=["Owners"],
+    summary="Create many owners at once",
+    response_description="One result per submitted owner, in order",
+)
+def create_owners_bulk(
+    owners: BulkOwnerCreate, response: Response, db=Depends(get_db)
+):
+    """
+    Create many pet owners in a single transaction.
+
+    Owners that clash with an existing email are reported individually;
+    the others are still created.
+    """
+    result = crud.create_owners_bulk(db, [o.model_dump() for o in owners])
+    if result.is_err:
+        raise result.as_http_error()
+    return bulk_response(result.value or [], response)
+
+
+def owner_schema(include_pets: bool, with_pet_count: bool) -> Type[BaseModel]:
+    """The owner representation for the requested `include`."""
+    if include_pets:
+        return OwnerRead
+    if with_pet_count:
+        return OwnerSummary
+    return OwnerReadBase
+
+
 @app.get(
     "/owners/",
-    response_model=List[OwnerRead],
+    response_model=List[OwnerReadBase],
     tags=["Owners"],
     summary="List all owners",
-    response_description="A list of all owners",
+    response_description=(
+        "A list of all owners; with `include=pets` each owner also has a "
+        "`pets` list, with `include=pet_count` a `pet_count`"
+    ),
+)
+def list_owners(
+    request: Request,
+    response: Response,
+    limit: int | None = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: int | None = Query(None, ge=0),
+    include: str | None = Query(
+        None,
+        description=(
+            "Comma-separated relations to embed: `pets`, or `pet_count` "
+            "for just the number of pets"
+        ),
+    ),
+    stream: StreamFormat | None = Query(
+        None, description="Stream the rows as a `json` array or `ndjson`"
+    ),
+    fields: str | None = Query(
+        None,
+        description="Comma-separated fields to return, e.g. `id,name,city`",
+    ),
+    session_factory=Depends(get_session_factory),
+):
+    """
+    List pet owners in the system, ordered by id.
+
+    Args:
+        request (Request): Used for the response cache and `If-None-Match`.
+        response (Response): Used to set the `X-Next-Cursor` header.
+        limit (int | None): Page size; omit to list every owner.
+        after (int | None): Cursor from a previous page's `X-Next-Cursor`.
+        include (str | None): `pets` to embed each owner's pets, or
+            `pet_count` to add how many pets each owner has.
+        stream (str | None): `json` or `ndjson` to stream every row from a
+            server-side cursor; no `X-Next-Cursor` header is sent.
+        fields (str | None): Only these fields (plus `id`) are selected
+            and returned; not combinable with `include` or `stream`.
+        session_factory: Opens the read session, on a replica when one
+            is configured; a streamed response owns and closes it.
+
+    Returns:
+        List[OwnerReadBase]: A page of owners, as List[OwnerRead] when
+        pets are included and List[OwnerSummary] with pet counts.
+    """
+    included = parse_include(include, {"pets", "pet_count"})
+    if included == {"pets", "pet_count"}:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Include pets or pet_count, not both",
+        )
+    include_pets = "pets" in included
+    with_pet_count = "pet_count" in included
+    schema = owner_schema(include_pets, with_pet_count)
+    columns = parse_fields(fields, OwnerReadBase)
+    reject_with_fields(columns, include=include, stream=stream)
+    if stream is not None:
+        stream_db = session_factory()
+        stream_result = crud.stream_owners(
+            stream_db,
+            limit=limit,
+            after=after,
+            include_pets=include_pets,
+            with_pet_count=with_pet_count,
+        )
+        if stream_result.is_err:
+            stream_db.close()
+            raise stream_result.as_http_error()
+        return stream_list(
+            schema, stream_result.value or [], stream, stream_db.close
+        )
+    cached, key, generation = lookup_list_cache(request)
+    if cached is not None:
+        return cached
+    db = session_factory()
+    try:
+        if columns:
+            rows = crud.get_owner_fields(
+                db,
+                columns,
+                limit=None if limit is None else limit + 1,
+                after=after,
+            )
+            if rows.is_err:
+                raise rows.as_http_error()
+            page = paginate(rows.value or [], limit, response)
+            return with_etag(
+                request,
+                render_fields(OwnerReadBase, columns, page, response),
+                key,
+                generation,
+            )
+        result = crud.get_owners(
+            db,
+            limit=None if limit is None else limit + 1,
+            after=after,
+            include_pets=include_pets,
+            with_pet_count=with_pet_count,
+        )
+        if result.is_err:
+            raise result.as_http_error()
+        # An empty list instead of None
+        page = paginate(result.value or [], limit, response)
+        return with_etag(
+            request, render_list(schema, page, response), key, generation
+        )
+    finally:
+        db.close()
+
+
+@app.get(
+    "/owners/{owner_id}/pets",
+    response_model=List[PetRead],
+    tags=["Owners"],
+    summary="List an owner's pets",
+    response_description="A list of the owner's pets",
 )
-def list_owners(db=Depends(get_db)):
+def list_owner_pets(
+    owner_id: int,
+    request: Request,
+    response: Response,
+    limit: int | None = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: int | None = Query(None, ge=0),
+    db=Depends(get_read_db),
+):
     """
-    List all pet owners in the system.
+    List one owner's pets, ordered by id.
+
+    Served by the (owner_id, id) index, so a page costs the same however
+    many pets other owners have.
 
     Args:
-        db (Session): The database session (dependency-injected).
+        owner_id (int): The owner whose pets to list.
+        request (Request): Used for the response cache and `If-None-Match`.
+        response (Response): Used to set the `X-Next-Cursor` header.
+        limit (int | None): Page size; omit to list every pet.
+        after (int | None): Cursor from a previous page's `X-Next-Cursor`.
+        db (Session): Read session, on a replica when one is configured.
 
     Returns:
-        List[OwnerRead]: A list of all owners.
+        List[PetRead]: A page of the owner's pets.
     """
-    result = crud.get_owners(db)
+    cached, key, generation = lookup_list_cache(request)
+    if cached is not None:
+        return cached
+    owner_result = crud.get_owner(db, owner_id)
+    if owner_result.is_err:
+        raise owner_result.as_http_error()
+    result = crud.get_pets(
+        db,
+        limit=None if limit is None else limit + 1,
+        after=after,
+        filters=PetFilters(owner_id=owner_id),
+    )
     if result.is_err:
         raise result.as_http_error()
-    if result.value is None:
-        # Return empty list instead of None
-        return []
-    return result.value
+    page = paginate(result.value or [], limit, response)
+    return with_etag(
+        request, render_list(PetRead, page, response), key, generation
+    )
+
+
+@app.get(
+    "/owners/{owner_id}/stats",
+    response_model=OwnerPetStats,
+    tags=["Owners"],
+    summary="Statistics over an owner's pets",
+    response_description="The owner's pet count, vaccination rate and averages",
+)
+def read_owner_stats(owner_id: int, request: Request, db=Depends(get_read_db)):
+    """
+    Pet count, vaccination rate and average age and weight of one owner's
+    pets, read from a single summary row.
+
+    Args:
+        owner_id (int): The owner whose pets to summarize.
+        request (Request): Used for the response cache and `If-None-Match`.
+        db (Session): Read session, on a replica when one is configured.
+
+    Returns:
+        OwnerPetStats: The owner's statistics; zero pets gives null rates.
+    """
+    cached, key, generation = lookup_list_cache(request)
+    if cached is not None:
+        return cached
+    owner_result = crud.get_owner(db, owner_id)
+    if owner_result.is_err:
+        raise owner_result.as_http_error()
+    result = crud.get_owner_stats(db, owner_id)
+    if result.is_err:
+        raise result.as_http_error()
+    rows = [] if result.value is None else [result.value]
+    stats = OwnerPetStats(owner_id=owner_id, **summarize(rows))
+    response = JSONResponse(content=jsonable_encoder(stats))
+    return with_etag(request, response, key, generation)
 
 
 @app.post(
@@ -153,6 +772,7 @@ def list_owners(db=Depends(get_db)):
     response_description="The created pet object",
 )
 async def create_pet(
+    background_tasks: BackgroundTasks,
     name: str = Form(...),
     owner_id: int = Form(...),
     species: str = Form(None),
@@ -163,14 +783,17 @@ async def create_pet(
     description: str = Form(None),
     gender: str = Form(None),
     is_vaccinated: bool = Form(None),
-    birthdate: str = Form(None),
+    birthdate: date = Form(None),
     photo: UploadFile = File(None),
-    db=Depends(get_db),
+    db=Depends(get_async_db),
 ):
     """
     Create a new pet for an owner, with optional photo upload and extra fields.
+
+    Runs on the event loop, so database access goes through async_crud
+    and the photo is streamed to content-addressed storage off the loop.
     """
-    owner_result = crud.get_owner(db, owner_id)
+    owner_result = await async_crud.get_owner(db, owner_id)
     if owner_result.is_err:
         raise owner_result.as_http_error()
     if owner_result.value is None:
@@ -181,17 +804,15 @@ async def create_pet(
 
     photo_filename = None
     if photo:
-        images_dir = os.path.join(os.path.dirname(__file__), "images")
-        os.makedirs(images_dir, exist_ok=True)
-        photo_filename = photo.filename or "uploaded_photo"
-        file_path = os.path.join(images_dir, str(photo_filename))
-        with open(file_path, "wb") as f:
-            f.write(await photo.read())
+        photo_result = await photo_store.save(photo)
+        if photo_result.is_err:
+            raise photo_result.as_http_error()
+        photo_filename = photo_result.value
 
     # Set date_added to now if not provided
-    date_added = datetime.now().isoformat()
+    date_added = datetime.now()
 
-    pet_result = crud.create_pet(
+    pet_result = await async_crud.create_pet(
         db,
         name,
         owner_id,
@@ -214,9 +835,37 @@ async def create_pet(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Server error: Pet creation succeeded but returned no data",
         )
+    if photo_filename is not None:
+        # Thumbnails are encoded in the process pool after we respond
+        background_tasks.add_task(variant_pipeline.submit, photo_filename)
     return pet_result.value
 
 
+@app.post(
+    "/pets/bulk",
+    response_model=List[BulkItemResult[PetRead]],
+    status_code=status.HTTP_201_CREATED,
+    tags=["Pets"],
+    summary="Create many pets at once",
+    response_description="One result per submitted pet, in order",
+)
+def create_pets_bulk(
+    pets: BulkPetCreate, response: Response, db=Depends(get_db)
+):
+    """
+    Create many pets in a single transaction (JSON only, no photos).
+
+    Pets whose owner does not exist are reported individually; the others
+    are still created.
+    """
+    date_added = datetime.now()
+    rows = [{**pet.model_dump(), "date_added": date_added} for pet in pets]
+    result = crud.create_pets_bulk(db, rows)
+    if result.is_err:
+        raise result.as_http_error()
+    return bulk_response(result.value or [], response)
+
+
 @app.get(
     "/pets/",
     response_model=List[PetRead],
@@ -224,29 +873,302 @@ async def create_pet(
     summary="List all pets",
     response_description="A list of all pets",
 )
-def list_pets(db=Depends(get_db)):
+def list_pets(
+    request: Request,
+    response: Response,
+    limit: int | None = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: int | None = Query(None, ge=0),
+    stream: StreamFormat | None = Query(
+        None, description="Stream the rows as a `json` array or `ndjson`"
+    ),
+    filters: PetFilters = Depends(pet_filters),
+    fields: str | None = Query(
+        None,
+        description=(
+            "Comma-separated fields to return, e.g. `id,name,species`"
+        ),
+    ),
+    session_factory=Depends(get_session_factory),
+):
     """
-    List all pets in the system.
+    List pets in the system, ordered by id or newest first, optionally
+    filtered.
 
     Args:
-        db (Session): The database session (dependency-injected).
+        request (Request): Used for the response cache and `If-None-Match`.
+        response (Response): Used to set the `X-Next-Cursor` header.
+        limit (int | None): Page size; omit to list every pet.
+        after (int | None): Cursor from a previous page's `X-Next-Cursor`.
+        stream (str | None): `json` or `ndjson` to stream every row from a
+            server-side cursor; no `X-Next-Cursor` header is sent.
+        filters (PetFilters): species, owner, vaccination, gender, age /
+            weight and date added filters, and the order, from the query
+            string.
+        fields (str | None): Only these fields (plus `id`) are selected
+            and returned; not combinable with `stream`. `photo_variants`
+            is computed, so it is only in full responses.
+        session_factory: Opens the read session, on a replica when one
+            is configured; a streamed response owns and closes it.
 
     Returns:
-        List[PetRead]: A list of all pets.
+        List[PetRead]: A page of pets.
+    """
+    columns = parse_fields(fields, PetRead)
+    reject_with_fields(columns, stream=stream)
+    if stream is not None:
+        stream_db = session_factory()
+        stream_result = crud.stream_pets(
+            stream_db, limit=limit, after=after, filters=filters
+        )
+        if stream_result.is_err:
+            stream_db.close()
+            raise stream_result.as_http_error()
+        return stream_list(
+            PetRead, stream_result.value or [], stream, stream_db.close
+        )
+    cached, key, generation = lookup_list_cache(request)
+    if cached is not None:
+        return cached
+    db = session_factory()
+    try:
+        if columns:
+            rows = crud.get_pet_fields(
+                db,
+                columns,
+                limit=None if limit is None else limit + 1,
+                after=after,
+                filters=filters,
+            )
+            if rows.is_err:
+                raise rows.as_http_error()
+            page = paginate(rows.value or [], limit, response)
+            return with_etag(
+                request,
+                render_fields(PetRead, columns, page, response),
+                key,
+                generation,
+            )
+        result = crud.get_pets(
+            db,
+            limit=None if limit is None else limit + 1,
+            after=after,
+            filters=filters,
+        )
+        if result.is_err:
+            raise result.as_http_error()
+        # An empty list instead of None
+        page = paginate(result.value or [], limit, response)
+        return with_etag(
+            request, render_list(PetRead, page, response), key, generation
+        )
+    finally:
+        db.close()
+
+
+SearchScope = Literal["all", "pets", "owners"]
+
+
+@app.get(
+    "/search",
+    response_model=SearchResults,
+    tags=["Search"],
+    summary="Full-text search over pets and owners",
+    response_description="The best matching pets and owners",
+)
+def search(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=200),
+    scope: SearchScope = Query("all"),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db=Depends(get_read_db),
+):
     """
-    result = crud.get_pets(db)
+    Search pet names, breeds and descriptions and owner names, emails and
+    cities, best match first.
+
+    Every word of `q` must match, as a whole word or a word prefix. Only
+    SQLite databases have the search index; elsewhere this returns 501.
+
+    Args:
+        request (Request): Used for the response cache and `If-None-Match`.
+        q (str): Free-text query.
+        scope (str): `pets`, `owners` or `all`.
+        limit (int): Most results of each kind per page.
+        offset (int): Pass the previous page's `next_offset`.
+        db (Session): Read session, on a replica when one is configured.
+
+    Returns:
+        SearchResults: A page of matching pets and owners.
+    """
+    cached, key, generation = lookup_list_cache(request)
+    if cached is not None:
+        return cached
+    results = SearchResults()
+    has_more = False
+    # One extra row of each kind tells us whether there is another page
+    if scope in ("all", "pets"):
+        pets = crud.search_pets(db, q, limit + 1, offset)
+        if pets.is_err:
+            raise pets.as_http_error()
+        has_more |= len(pets.value or []) > limit
+        results.pets = [PetRead.model_validate(p) for p in pets.value[:limit]]
+    if scope in ("all", "owners"):
+        owners = crud.search_owners(db, q, limit + 1, offset)
+        if owners.is_err:
+            raise owners.as_http_error()
+        has_more |= len(owners.value or []) > limit
+        results.owners = [
+            OwnerReadBase.model_validate(o) for o in owners.value[:limit]
+        ]
+    if has_more:
+        results.next_offset = offset + limit
+    response = JSONResponse(content=jsonable_encoder(results))
+    return with_etag(request, response, key, generation)
+
+
+@app.get(
+    "/stats",
+    response_model=PetStats,
+    tags=["Stats"],
+    summary="Pet statistics overall and per species",
+    response_description="Pet counts, vaccination rates and averages",
+)
+def read_stats(request: Request, db=Depends(get_read_db)):
+    """
+    Pet count, vaccination rate and average age and weight, over all pets
+    and per species.
+
+    Served from the species_stats summary table, which every pet insert
+    updates, so the cost grows with the number of species, not of pets.
+
+    Args:
+        request (Request): Used for the response cache and `If-None-Match`.
+        db (Session): Read session, on a replica when one is configured.
+
+    Returns:
+        PetStats: Totals, then one entry per species in name order.
+    """
+    cached, key, generation = lookup_list_cache(request)
+    if cached is not None:
+        return cached
+    result = crud.get_species_stats(db)
     if result.is_err:
         raise result.as_http_error()
-    if result.value is None:
-        # Return empty list instead of None
-        return []
-    return result.value
+    rows = result.value or []
+    stats = PetStats(
+        total=summarize(rows),
+        species=[
+            SpeciesSummary(
+                species=(
+                    None if row.species == UNKNOWN_SPECIES else row.species
+                ),
+                **summarize([row]),
+            )
+            for row in rows
+        ],
+    )
+    response = JSONResponse(content=jsonable_encoder(stats))
+    return with_etag(request, response, key, generation)
+
+
+# Default page size of the change feed
+CHANGES_PAGE_SIZE = 100
+
+
+@app.get(
+    "/changes",
+    response_model=ChangeSet,
+    tags=["Sync"],
+    summary="Owners and pets added since a cursor",
+    response_description="The changed rows and the cursor to sync from next",
+)
+def list_changes(
+    request: Request,
+    since: int = Query(0, ge=0, description="`cursor` of the last sync"),
+    limit: int = Query(CHANGES_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db=Depends(get_read_db),
+):
+    """
+    Owners and pets added after `since`, in the order they were committed.
+
+    Every insert stamps its row with a version from one increasing
+    counter, so a sync costs a range scan over the new rows only. Start
+    with `since=0`, then keep passing back the returned `cursor`; while
+    `has_more` is true there is another page waiting.
+
+    Args:
+        request (Request): Used for the response cache and `If-None-Match`.
+        since (int): Cursor from the previous response; 0 for everything.
+        limit (int): Most rows (owners and pets together) per page.
+        db (Session): Read session, on a replica when one is configured.
+
+    Returns:
+        ChangeSet: The page of changes and the next cursor.
+    """
+    cached, key, generation = lookup_list_cache(request)
+    if cached is not None:
+        return cached
+    # One extra row of each kind tells us whether there is another page
+    result = crud.get_changes(db, since, limit + 1)
+    if result.is_err:
+        raise result.as_http_error()
+    owners, pets = result.value
+    owners, pets, cursor, has_more = page_changes(owners, pets, since, limit)
+    changes = ChangeSet(
+        owners=[OwnerReadBase.model_validate(o) for o in owners],
+        pets=[PetRead.model_validate(p) for p in pets],
+        cursor=cursor,
+        has_more=has_more,
+    )
+    response = JSONResponse(content=jsonable_encoder(changes))
+    return with_etag(request, response, key, generation)
+
+
+@app.get(
+    "/photos/{name:path}",
+    tags=["Pets"],
+    summary="A pet photo, resized and in the best format the client accepts",
+    response_class=FileResponse,
+)
+def get_photo(
+    name: str,
+    request: Request,
+    w: int | None = Query(None, ge=1, le=4096, description="Display width"),
+):
+    """
+    Serve the smallest derivative at least `w` pixels wide, as AVIF or WebP
+    when `Accept` allows, otherwise JPEG.
+
+    Until the derivatives have been generated the original is served,
+    with a short-lived caching policy; after that the response is
+    immutable.
+    """
+    if not is_content_name(name) or not os.path.isfile(photo_store.path(name)):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Photo not found"
+        )
+    # The body depends on Accept, so caches must key on it
+    headers = {"Vary": "Accept"}
+    accept = request.headers.get("accept")
+    variant = variant_pipeline.locate(name, w, accept)
+    if variant is None:
+        return photo_response(
+            request, photo_store.path(name), name, False, headers=headers
+        )
+    path, media_type = variant
+    # Immutable only once the best format for this Accept exists; until
+    # then a better variant may still replace what we serve
+    best = media_type == MEDIA_TYPES[accepted_formats(accept)[0]]
+    return photo_response(
+        request, path, os.path.basename(path), best, media_type, headers
+    )
 
 
 # Serve pet images
 app.mount(
     "/images",
-    StaticFiles(directory=os.path.join(os.path.dirname(__file__), "images")),
+    PhotoStaticFiles(directory=photo_store.root),
     name="images",
 )
 
@@ -257,20 +1179,41 @@ class LoginRequest(BaseModel):
 
 
 @app.post("/login")
-def login(
+async def login(
     login_req: LoginRequest,
     request: Request,
-    db=Depends(get_db),
+    db=Depends(get_async_db),
 ):
-    user: User | None = (
-        db.query(User).filter(User.username == login_req.username).first()
+    """
+    Log in and start a session.
+
+    Runs on the event loop with the bcrypt check on the password hashing
+    executor, so logins never occupy the shared threadpool. A hash made
+    with an outdated cost is replaced with one at the configured cost.
+    """
+    user_result = await async_crud.get_user_by_username(db, login_req.username)
+    if user_result.is_err:
+        raise user_result.as_http_error()
+    user: User | None = user_result.value
+    if not user:
+        raise HTTPException(
+            status_code=401, detail="Invalid username or password"
+        )
+    check = await password_hasher.verify_and_update(
+        login_req.password, user.hashed_password
     )
-    if not user or not user.verify_password(login_req.password):
+    if check.is_err:
+        raise check.as_http_error()
+    valid, new_hash = check.value or (False, None)
+    if not valid:
         raise HTTPException(
             status_code=401, detail="Invalid username or password"
         )
+    if new_hash is not None:
+        # Best effort: the login succeeds even if the rehash isn't saved
+        await async_crud.update_password_hash(db, user, new_hash)
     # Set session
-    request.session["user_id"] = user.id
+    request.session[USER_ID_SESSION_KEY] = user.id
     return {"message": "Login successful", "username": user.username}
 
 
@@ -280,20 +1223,37 @@ class SignupRequest(BaseModel):
 
 
 @app.post("/signup")
-def signup(
+async def signup(
     signup_req: SignupRequest,
-    db=Depends(get_db),
+    db=Depends(get_async_db),
 ):
+    """Create a user; the password is hashed on the hashing executor."""
     # Check if username already exists
-    existing = (
-        db.query(User).filter(User.username == signup_req.username).first()
-    )
-    if existing:
+    existing = await async_crud.get_user_by_username(db, signup_req.username)
+    if existing.is_err:
+        raise existing.as_http_error()
+    if existing.value:
         raise HTTPException(status_code=400, detail="Username already taken")
     # Hash the password
-    hashed_pw = bcrypt.hash(signup_req.password)
-    user = User(username=signup_req.username, hashed_password=hashed_pw)
-    db.add(user)
-    db.commit()
-    db.refresh(user)
+    hashed = await password_hasher.hash(signup_req.password)
+    if hashed.is_err:
+        raise hashed.as_http_error()
+    user_result = await async_crud.create_user(
+        db, signup_req.username, hashed.value or ""
+    )
+    if user_result.is_err:
+        raise user_result.as_http_error()
+    user = user_result.value
     return {"message": "Signup successful", "username": user.username}
+
+
+@app.get("/me", response_model=UserRead, tags=["Users"])
+def read_current_user(user: UserRead = Depends(current_user)):
+    """The logged-in user, resolved through the per-process user cache."""
+    return user
+
+
+@app.get("/metrics", include_in_schema=False)
+def read_metrics():
+    """Request, crud and connection pool metrics for Prometheus."""
+    return Response(registry.render(), media_type=CONTENT_TYPE)
@@ -0,0 +1,413 @@
+"""
+Process-local metrics in the Prometheus text exposition format.
+
+MetricsMiddleware records, per method and route template (``/pets/{pet_id}``
+rather than every concrete path, so label cardinality stays bounded):
+
+    petshop_http_requests_total             counter, also by status
+    petshop_http_request_duration_seconds   histogram
+    petshop_http_requests_in_flight         gauge
+
+@timed wraps the crud / async_crud functions into
+petshop_crud_duration_seconds and petshop_crud_errors_total, and the
+connection pool gauges are read from the engines at scrape time, so they
+cost nothing between scrapes. Recording is a dict lookup, a bisect and a
+few additions under an uncontended lock, cheap enough to leave on in
+production. With several workers, each process reports only the requests
+it handled.
+"""
+
+import abc
+import bisect
+import functools
+import inspect
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple, TypeVar
+
+from sqlalchemy import Engine
+from sqlalchemy.pool import QueuePool
+from starlette.datastructures import MutableHeaders
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from database import N_PLUS_ONE_THRESHOLD, track_queries
+from result import Result
+
+F = TypeVar("F", bound=Callable)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; spans cache hits (~1 ms) to bcrypt and large uploads
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+# Label for requests no route matched, so scanners probing random paths
+# can't create unbounded series
+UNMATCHED_ROUTE = "<unmatched>"
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Iterable[str]) -> str:
+    pairs = ",".join(
+        f'{name}="{_escape(value)}"' for name, value in zip(names, values)
+    )
+    return f"{{{pairs}}}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric(abc.ABC):
+    """A named family of series keyed by label values."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.help_text}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+
+    @abc.abstractmethod
+    def render(self) -> List[str]:
+        """The family's samples in exposition format, without the header."""
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        super().__init__(name, help_text, labels)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[label_values] = (
+                self._values.get(label_values, 0) + amount
+            )
+
+    def value(self, *label_values: str) -> float:
+        return self._values.get(label_values, 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.label_names, labels)} "
+            f"{_format_value(value)}"
+            for labels, value in items
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *label_values: str, amount: float = 1) -> None:
+        self.inc(*label_values, amount=-amount)
+
+    def set(self, *label_values: str, value: float) -> None:
+        with self._lock:
+            self._values[label_values] = value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+        # Per series: non-cumulative bucket counts (+Inf last) and the sum;
+        # cumulating happens at scrape time, not on every observation
+        self._series: Dict[Labels, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, *label_values: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = ([0] * (len(self.buckets) + 1), [0.0])
+                self._series[label_values] = series
+            series[0][index] += 1
+            series[1][0] += value
+
+    def count(self, *label_values: str) -> int:
+        series = self._series.get(label_values)
+        return sum(series[0]) if series else 0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = [
+                (labels, list(counts), total[0])
+                for labels, (counts, total) in self._series.items()
+            ]
+        lines = []
+        names = (*self.label_names, "le")
+        for labels, counts, total in items:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                lines.append(
+                    f"{self.name}_bucket"
+                    f"{_format_labels(names, (*labels, _format_value(bound)))}"
+                    f" {cumulative}"
+                )
+            suffix = _format_labels(self.label_names, labels)
+            lines.append(f"{self.name}_sum{suffix} {_format_value(total)}")
+            lines.append(f"{self.name}_count{suffix} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: List[Metric] = []
+        # name -> engine; their pool gauges are read when scraped
+        self._engines: Dict[str, Engine] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help_text: str, labels=()) -> Counter:
+        return self.register(Counter(name, help_text, labels))
+
+    def gauge(self, name: str, help_text: str, labels=()) -> Gauge:
+        return self.register(Gauge(name, help_text, labels))
+
+    def histogram(self, name: str, help_text: str, labels=()) -> Histogram:
+        return self.register(Histogram(name, help_text, labels))
+
+    def watch_engine(self, name: str, db_engine: Engine) -> None:
+        self._engines[name] = db_engine
+
+    def _pool_metrics(self) -> List[Metric]:
+        gauges = {
+            "checked_out": Gauge(
+                "petshop_db_pool_checked_out",
+                "Connections currently lent out by the pool",
+                ("engine",),
+            ),
+            "checked_in": Gauge(
+                "petshop_db_pool_checked_in",
+                "Idle connections held by the pool",
+                ("engine",),
+            ),
+            "overflow": Gauge(
+                "petshop_db_pool_overflow",
+                "Connections open beyond pool_size (negative: unused slots)",
+                ("engine",),
+            ),
+            "size": Gauge(
+                "petshop_db_pool_size", "Configured pool_size", ("engine",)
+            ),
+        }
+        for name, db_engine in self._engines.items():
+            pool = db_engine.pool
+            # SingletonThreadPool / StaticPool / NullPool don't keep counts
+            if not isinstance(pool, QueuePool):
+                continue
+            gauges["checked_out"].set(name, value=pool.checkedout())
+            gauges["checked_in"].set(name, value=pool.checkedin())
+            gauges["overflow"].set(name, value=pool.overflow())
+            gauges["size"].set(name, value=pool.size())
+        return list(gauges.values())
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in (*self._metrics, *self._pool_metrics()):
+            samples = metric.render()
+            if samples:
+                lines += metric.header() + samples
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+http_requests = registry.counter(
+    "petshop_http_requests_total",
+    "HTTP requests completed",
+    ("method", "route", "status"),
+)
+http_duration = registry.histogram(
+    "petshop_http_request_duration_seconds",
+    "Time from receiving a request to sending its last body chunk",
+    ("method", "route"),
+)
+http_in_flight = registry.gauge(
+    "petshop_http_requests_in_flight",
+    "Requests currently being handled",
+    ("method", "route"),
+)
+crud_duration = registry.histogram(
+    "petshop_crud_duration_seconds",
+    "Time spent in crud / async_crud functions",
+    ("function",),
+)
+crud_errors = registry.counter(
+    "petshop_crud_errors_total",
+    "crud / async_crud calls that returned an error Result or raised",
+    ("function",),
+)
+
+
+def timed(func: F) -> F:
+    """Record a crud function's duration and failures."""
+    label = f"{func.__module__}.{func.__name__}"
+
+    def record(start: float, failed: bool) -> None:
+        crud_duration.observe(time.perf_counter() - start, label)
+        if failed:
+            crud_errors.inc(label)
+
+    if inspect.iscoroutinefunction(func):
+
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                result = await func(*args, **kwargs)
+            except Exception:
+                record(start, failed=True)
+                raise
+            record(start, isinstance(result, Result) and result.is_err)
+            return result
+
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            record(start, failed=True)
+            raise
+        record(start, isinstance(result, Result) and result.is_err)
+        return result
+
+    return wrapper
+
+
+def route_template(app: ASGIApp, scope: Scope) -> str:
+    """The path template of the route scope will be dispatched to."""
+    partial = None
+    for route in getattr(app, "routes", ()):
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+        if match == Match.PARTIAL and partial is None:
+            # Right path, wrong method: Starlette answers 405 for it
+            partial = route.path
+    return partial or UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware (no BaseHTTPMiddleware task or body buffering)
+    timing each HTTP request until its response has been fully sent.
+    """
+
+    def __init__(self, app: ASGIApp, router: ASGIApp):
+        self.app = app
+        self.router = router
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = route_template(self.router, scope)
+        status_code = 500
+        start = time.perf_counter()
+        http_in_flight.inc(method, route)
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_in_flight.dec(method, route)
+            http_duration.observe(time.perf_counter() - start, method, route)
+            http_requests.inc(method, route, str(status_code))
+
+
+class QueryAccountingMiddleware:
+    """
+    Adds the request's SQL count and time as ``X-Query-Count`` and
+    ``Server-Timing: db;dur=...`` headers, and warns about statement shapes
+    repeated more than threshold times (likely N+1 loops).
+
+    Headers go out with the response start, so for streamed lists they
+    cover only the queries run before the first chunk; the N+1 check runs
+    once the body is complete and sees everything.
+    """
+
+    def __init__(self, app: ASGIApp, threshold: int = N_PLUS_ONE_THRESHOLD):
+        self.app = app
+        self.threshold = threshold
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = track_queries()
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(raw=list(message["headers"]))
+                headers.append("X-Query-Count", str(stats.count))
+                headers.append(
+                    "Server-Timing",
+                    f"db;dur={stats.seconds * 1000:.2f};"
+                    f'desc="{stats.count} queries"',
+                )
+                message["headers"] = headers.raw
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            for shape, count in stats.repeated(self.threshold):
+                print(
+                    f"Warning: Possible N+1 in {scope['method']} "
+                    f"{scope['path']}: {count} x {shape[:200]}"
+                )
@@ -0,0 +1,126 @@
+"""
+Password hashing on a dedicated, bounded executor.
+
+bcrypt is deliberately slow (~250 ms at cost 12). Run on Starlette's
+shared threadpool, a burst of logins would take every thread and stall
+all the sync endpoints. Hashes run on a small pool of their own instead;
+the bcrypt C code releases the GIL, so the pool uses real cores. Once
+``workers + queue_limit`` hashes are pending, new ones are refused with
+PasswordHasherBusyError (503 + Retry-After) rather than queueing without
+bound.
+"""
+
+import asyncio
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Tuple, TypeVar
+
+from passlib.context import CryptContext
+
+from exceptions import PasswordHasherBusyError
+from result import Result
+
+T = TypeVar("T")
+
+BCRYPT_ROUNDS = int(os.getenv("PETSHOP_BCRYPT_ROUNDS", "12"))
+HASH_WORKERS = int(os.getenv("PETSHOP_HASH_WORKERS", "2"))
+HASH_QUEUE_LIMIT = int(os.getenv("PETSHOP_HASH_QUEUE_LIMIT", "32"))
+
+
+def make_context(rounds: int = BCRYPT_ROUNDS) -> CryptContext:
+    # Hashes made with any other cost are flagged for rehashing
+    return CryptContext(
+        schemes=["bcrypt"], bcrypt__rounds=rounds, bcrypt__min_rounds=rounds
+    )
+
+
+pwd_context = make_context()
+
+
+class PasswordHasher:
+    """Runs CryptContext work on its own threads, with admission control."""
+
+    def __init__(
+        self,
+        context: CryptContext = pwd_context,
+        workers: int = HASH_WORKERS,
+        queue_limit: int = HASH_QUEUE_LIMIT,
+    ):
+        self.context = context
+        self.workers = workers
+        self.capacity = workers + queue_limit
+        self._executor: ThreadPoolExecutor | None = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        # Moving average of one hash, to tell refused clients when to retry
+        self._avg_seconds = 0.25
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    async def hash(self, password: str) -> Result[str]:
+        return await self._run(self.context.hash, password)
+
+    async def verify_and_update(
+        self, password: str, hashed: str
+    ) -> Result[Tuple[bool, str | None]]:
+        """
+        Check a password; on success with an outdated hash (e.g. a lower
+        cost than configured), also return its replacement hash.
+        """
+        return await self._run(
+            self.context.verify_and_update, password, hashed
+        )
+
+    async def _run(self, func: Callable[..., T], *args) -> Result[T]:
+        with self._lock:
+            if self._pending >= self.capacity:
+                return Result.err(
+                    PasswordHasherBusyError(
+                        "Too many password checks in progress",
+                        retry_after=self.retry_after(),
+                    )
+                )
+            self._pending += 1
+        try:
+            return Result.ok(
+                await asyncio.wrap_future(
+                    self._get_executor().submit(self._timed, func, *args)
+                )
+            )
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def _timed(self, func: Callable[..., T], *args) -> T:
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            elapsed = time.perf_counter() - start
+            self._avg_seconds += 0.2 * (elapsed - self._avg_seconds)
+
+    def retry_after(self) -> int:
+        """Seconds until the current backlog has drained, at least 1."""
+        return max(
+            1, math.ceil(self._pending / self.workers * self._avg_seconds)
+        )
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="bcrypt"
+            )
+        return self._executor
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher()
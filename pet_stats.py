@@ -0,0 +1,169 @@
+"""
+Pet statistics per species and per owner, kept in summary tables.
+
+species_stats and owner_stats hold running counts and sums, so /stats
+reads one row per species instead of scanning pets. Every pet insert
+(crud.create_pet, the async and bulk variants, the sample data loaders)
+adds its increments with an upsert in the same transaction as the pet,
+so the tables can't drift from a committed insert. The tables are created
+by the 20261017_add_pet_stats migration; after editing pets by hand, or
+for a database restored from a dump, run:
+
+    python -m pet_stats recompute
+"""
+
+import argparse
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Mapping, Tuple
+
+from sqlalchemy import Connection, case, delete, func, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.sql.dml import Insert
+
+from database import OwnerStats, Pet, PetAggregates, SpeciesStats
+
+# Key of the species_stats row for pets without a species
+UNKNOWN_SPECIES = ""
+
+AGGREGATES = (
+    "pet_count",
+    "vaccinated_count",
+    "age_sum",
+    "age_count",
+    "weight_sum",
+    "weight_count",
+)
+
+
+def pet_increments(pet: Mapping[str, Any]) -> Dict[str, Any]:
+    """What one pet adds to each aggregate of its species and owner."""
+    age = pet.get("age")
+    weight = pet.get("weight")
+    return {
+        "pet_count": 1,
+        "vaccinated_count": 1 if pet.get("is_vaccinated") else 0,
+        "age_sum": age or 0,
+        "age_count": 0 if age is None else 1,
+        "weight_sum": weight or 0.0,
+        "weight_count": 0 if weight is None else 1,
+    }
+
+
+def _upsert(dialect_name: str, model: type, key: str) -> Insert:
+    # ON CONFLICT DO UPDATE is atomic per row in both SQLite and Postgres,
+    # so concurrent inserts for one species add up instead of racing
+    dialect = postgresql if dialect_name == "postgresql" else sqlite
+    stmt = dialect.insert(model)
+    return stmt.on_conflict_do_update(
+        index_elements=[key],
+        set_={
+            name: getattr(model, name) + getattr(stmt.excluded, name)
+            for name in AGGREGATES
+        },
+    )
+
+
+def stats_upserts(
+    dialect_name: str, pets: Iterable[Mapping[str, Any]]
+) -> List[Tuple[Insert, List[Dict[str, Any]]]]:
+    """
+    The statements (and executemany parameters) that add pets to the
+    summary tables. Pets are summed per key first, so a batch costs one
+    row per species and owner touched, not one per pet.
+    """
+
+    def zeros() -> Dict[str, Any]:
+        return dict.fromkeys(AGGREGATES, 0)
+
+    by_species: Dict[str, Dict[str, Any]] = defaultdict(zeros)
+    by_owner: Dict[int, Dict[str, Any]] = defaultdict(zeros)
+    for pet in pets:
+        increments = pet_increments(pet)
+        for totals in (
+            by_species[pet.get("species") or UNKNOWN_SPECIES],
+            by_owner[pet["owner_id"]],
+        ):
+            for name, value in increments.items():
+                totals[name] += value
+    if not by_owner:
+        return []
+    return [
+        (
+            _upsert(dialect_name, SpeciesStats, "species"),
+            [{"species": k, **v} for k, v in by_species.items()],
+        ),
+        (
+            _upsert(dialect_name, OwnerStats, "owner_id"),
+            [{"owner_id": k, **v} for k, v in by_owner.items()],
+        ),
+    ]
+
+
+def _aggregate_columns() -> tuple:
+    return (
+        func.count(),
+        func.sum(case((Pet.is_vaccinated.is_(True), 1), else_=0)),
+        func.coalesce(func.sum(Pet.age), 0),
+        func.count(Pet.age),
+        func.coalesce(func.sum(Pet.weight), 0.0),
+        func.count(Pet.weight),
+    )
+
+
+def recompute_pet_stats(connection: Connection) -> None:
+    """Rebuild both summary tables from pets, in one GROUP BY each."""
+    species = func.coalesce(Pet.species, UNKNOWN_SPECIES)
+    connection.execute(delete(SpeciesStats))
+    connection.execute(delete(OwnerStats))
+    connection.execute(
+        insert(SpeciesStats).from_select(
+            ["species", *AGGREGATES],
+            select(species, *_aggregate_columns()).group_by(species),
+        )
+    )
+    connection.execute(
+        insert(OwnerStats).from_select(
+            ["owner_id", *AGGREGATES],
+            select(Pet.owner_id, *_aggregate_columns()).group_by(Pet.owner_id),
+        )
+    )
+
+
+def _ratio(part: float, whole: int, digits: int) -> float | None:
+    return round(part / whole, digits) if whole else None
+
+
+def summarize(rows: Iterable[PetAggregates]) -> Dict[str, Any]:
+    """Counts, vaccination rate and averages over one or more rows."""
+    totals = dict.fromkeys(AGGREGATES, 0)
+    for row in rows:
+        for name in AGGREGATES:
+            totals[name] += getattr(row, name) or 0
+    return {
+        "pet_count": totals["pet_count"],
+        "vaccination_rate": _ratio(
+            totals["vaccinated_count"], totals["pet_count"], 4
+        ),
+        "average_age": _ratio(totals["age_sum"], totals["age_count"], 2),
+        "average_weight": _ratio(
+            totals["weight_sum"], totals["weight_count"], 2
+        ),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Manage the pet statistics summary tables"
+    )
+    parser.add_argument("command", choices=["recompute"])
+    parser.parse_args()
+
+    from database import engine
+
+    with engine.begin() as connection:
+        recompute_pet_stats(connection)
+    print("Pet statistics recompute complete")
+
+
+if __name__ == "__main__":
+    main()
@@ -61,6 +61,10 @@ export function PetList() {
                   {pet.photo_filename && (
                     <img
                       src={`http://localhost:8000/images/${pet.photo_filename}`}
+                      srcSet={pet.photo_variants
+                        ?.map((v) => `http://localhost:8000${v.url} ${v.width}w`)
+                        .join(", ")}
+                      sizes="(min-width: 768px) 240px, (min-width: 640px) 50vw, 100vw"
                       alt={pet.name}
                       className="w-full h-40 object-cover rounded mb-2 border border-gray-200 bg-gray-50"
                       loading="lazy"
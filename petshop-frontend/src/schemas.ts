@@ -15,6 +15,10 @@ export const PetSchema = z.object({
   birthdate: z.string().nullable().optional(),
   date_added: z.string().nullable().optional(),
   photo_filename: z.string().nullable().optional(),
+  photo_variants: z
+    .array(z.object({ width: z.number(), url: z.string() }))
+    .nullable()
+    .optional(),
 });
 
 export const OwnerSchema = z.object({
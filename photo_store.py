@@ -0,0 +1,161 @@
+"""
+Content-addressed storage for pet photos.
+
+Uploads are streamed to disk in chunks from a worker thread, hashed as
+they are written, and moved to ``ab/cd/<sha256><ext>`` under the images
+directory. The name is derived from the bytes alone, so two uploads of
+the same photo share one file and two different photos called
+IMG_0001.jpg never overwrite each other. The stored name is what goes in
+Pet.photo_filename and is served from /images.
+"""
+
+import hashlib
+import os
+import re
+import tempfile
+from typing import BinaryIO
+
+from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
+
+from exceptions import PhotoTooLargeError, StorageError
+from result import Result
+
+IMAGES_DIR = os.getenv(
+    "PETSHOP_IMAGES_DIR", os.path.join(os.path.dirname(__file__), "images")
+)
+# Uploads in progress; outside IMAGES_DIR, which is served publicly, but on
+# the same filesystem so finished uploads are moved by an atomic rename
+# (set it when IMAGES_DIR is a mount point)
+INCOMING_DIR = os.getenv("PETSHOP_PHOTO_INCOMING_DIR")
+MAX_PHOTO_BYTES = int(os.getenv("PETSHOP_MAX_PHOTO_BYTES", str(10 * 1024**2)))
+CHUNK_SIZE = 1024 * 1024
+
+# Leading bytes of the image formats we accept, so the extension (and the
+# served Content-Type) comes from the content rather than the client
+MAGIC_EXTENSIONS = (
+    (b"\xff\xd8\xff", ".jpg"),
+    (b"\x89PNG\r\n\x1a\n", ".png"),
+    (b"GIF87a", ".gif"),
+    (b"GIF89a", ".gif"),
+)
+
+
+def photo_extension(head: bytes) -> str:
+    for magic, extension in MAGIC_EXTENSIONS:
+        if head.startswith(magic):
+            return extension
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return ".webp"
+    if head[4:12] in (b"ftypavif", b"ftypavis"):
+        return ".avif"
+    # Anything else gets no extension, whatever the client called it, so
+    # it can never be served as HTML, SVG or another active type
+    return ""
+
+
+# What content_path produces; anything else is a legacy upload name
+CONTENT_NAME = re.compile(
+    r"[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}(\.[a-z0-9]{1,5})?"
+)
+
+
+def is_content_name(name: str | None) -> bool:
+    return name is not None and CONTENT_NAME.fullmatch(name) is not None
+
+
+def content_path(digest: str, extension: str) -> str:
+    """Sharded relative path; 65536 directories keep each one small."""
+    return f"{digest[:2]}/{digest[2:4]}/{digest}{extension}"
+
+
+class PhotoStore:
+    """Streams uploads into a content-addressed directory tree."""
+
+    def __init__(
+        self,
+        root: str,
+        max_bytes: int = MAX_PHOTO_BYTES,
+        chunk_size: int = CHUNK_SIZE,
+        incoming_dir: str | None = None,
+    ):
+        self.root = str(root)
+        # Defaults to a sibling of root, e.g. images.incoming
+        self.incoming_dir = str(
+            incoming_dir or self.root.rstrip(os.sep) + ".incoming"
+        )
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.root, name)
+
+    async def save(self, upload: UploadFile) -> Result[str]:
+        """
+        Store an upload and return its content-addressed name.
+
+        Only one chunk is in memory at a time, and all file I/O and
+        hashing happen on the threadpool so the event loop never blocks.
+        """
+        if upload.size is not None and upload.size > self.max_bytes:
+            return Result.err(self._too_large())
+        temp_path = None
+        try:
+            temp_file, temp_path = await run_in_threadpool(self._open_temp)
+            digest = hashlib.sha256()
+            size = 0
+            head = b""
+            with temp_file:
+                while chunk := await upload.read(self.chunk_size):
+                    size += len(chunk)
+                    if size > self.max_bytes:
+                        return Result.err(self._too_large())
+                    if len(head) < 16:
+                        head += chunk[: 16 - len(head)]
+                    await run_in_threadpool(
+                        self._write_chunk, temp_file, digest, chunk
+                    )
+            name = content_path(digest.hexdigest(), photo_extension(head))
+            await run_in_threadpool(self._commit, temp_path, name)
+            temp_path = None
+            return Result.ok(name)
+        except OSError as e:
+            return Result.err(StorageError(f"Error storing photo: {str(e)}"))
+        finally:
+            if temp_path is not None:
+                await run_in_threadpool(self._discard, temp_path)
+
+    def _too_large(self) -> PhotoTooLargeError:
+        return PhotoTooLargeError(
+            f"Photo exceeds the {self.max_bytes} byte limit"
+        )
+
+    def _open_temp(self) -> tuple[BinaryIO, str]:
+        os.makedirs(self.incoming_dir, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=self.incoming_dir)
+        return os.fdopen(fd, "wb"), temp_path
+
+    @staticmethod
+    def _write_chunk(temp_file: BinaryIO, digest, chunk: bytes) -> None:
+        digest.update(chunk)
+        temp_file.write(chunk)
+
+    def _commit(self, temp_path: str, name: str) -> None:
+        final_path = self.path(name)
+        if os.path.exists(final_path):
+            # Already stored: same name means same bytes
+            os.remove(temp_path)
+            return
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, final_path)
+
+    @staticmethod
+    def _discard(temp_path: str) -> None:
+        try:
+            os.remove(temp_path)
+        except FileNotFoundError:
+            pass
+
+
+photo_store = PhotoStore(IMAGES_DIR, incoming_dir=INCOMING_DIR)
@@ -0,0 +1,187 @@
+"""
+Resized, re-encoded derivatives of stored pet photos.
+
+For every stored photo ``ab/cd/<digest>.<ext>`` a background process
+writes ``ab/cd/<digest>_<width>.<format>`` for each width in
+VARIANT_WIDTHS and each format in VARIANT_FORMATS. The derivatives are
+named after the source's content hash, so they never need regenerating
+and identical uploads share them.
+
+Encoding is CPU-bound and holds the GIL, so it runs in a process pool
+instead of the threadpool that serves requests.
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Tuple
+
+from photo_store import IMAGES_DIR
+
+# Card, grid and detail sizes used by the frontend
+VARIANT_WIDTHS = (160, 320, 640)
+
+# Best first; jpeg is the fallback every browser understands
+VARIANT_FORMATS = ("avif", "webp", "jpeg")
+
+MEDIA_TYPES = {
+    "avif": "image/avif",
+    "webp": "image/webp",
+    "jpeg": "image/jpeg",
+}
+
+EXTENSIONS = {"avif": ".avif", "webp": ".webp", "jpeg": ".jpg"}
+
+SAVE_OPTIONS: Dict[str, Dict[str, object]] = {
+    "avif": {"quality": 55, "speed": 8},
+    "webp": {"quality": 80, "method": 4},
+    "jpeg": {"quality": 82, "optimize": True, "progressive": True},
+}
+
+WORKERS = int(os.getenv("PETSHOP_VARIANT_WORKERS", "2"))
+
+
+def variant_name(name: str, width: int, fmt: str) -> str:
+    stem = os.path.splitext(name)[0]
+    return f"{stem}_{width}{EXTENSIONS[fmt]}"
+
+
+def pick_width(requested: int | None) -> int:
+    """Smallest variant at least as wide as requested (default: largest)."""
+    if requested is None:
+        return VARIANT_WIDTHS[-1]
+    for width in VARIANT_WIDTHS:
+        if width >= requested:
+            return width
+    return VARIANT_WIDTHS[-1]
+
+
+def accepted_formats(accept: str | None) -> List[str]:
+    """
+    Formats the client accepts, best first.
+
+    Only an explicit image/avif or image/webp (with q > 0) opts in, since
+    browsers send ``*/*`` without supporting either; jpeg is always last.
+    """
+    accepted = set()
+    for part in (accept or "").split(","):
+        media_type, *params = (p.strip() for p in part.split(";"))
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        if quality > 0:
+            accepted.add(media_type.lower())
+    return [
+        fmt
+        for fmt in VARIANT_FORMATS
+        if fmt == "jpeg" or MEDIA_TYPES[fmt] in accepted
+    ]
+
+
+def render_variants(root: str, name: str) -> List[str]:
+    """
+    Write every missing derivative of root/name; runs in a worker process.
+
+    Images are never upscaled: a variant wider than the source is the
+    source re-encoded at its own size. Returns the names written.
+    """
+    from PIL import Image, ImageOps
+
+    written = []
+    try:
+        with Image.open(os.path.join(root, name)) as source:
+            source = ImageOps.exif_transpose(source)
+            for width in VARIANT_WIDTHS:
+                image = source.copy()
+                image.thumbnail((width, width * 4), Image.Resampling.LANCZOS)
+                for fmt in VARIANT_FORMATS:
+                    target = variant_name(name, width, fmt)
+                    path = os.path.join(root, target)
+                    if os.path.exists(path):
+                        continue
+                    encoded = _for_format(image, fmt)
+                    temp_path = f"{path}.{os.getpid()}.tmp"
+                    encoded.save(temp_path, fmt.upper(), **SAVE_OPTIONS[fmt])
+                    os.replace(temp_path, path)
+                    written.append(target)
+    except (OSError, Image.DecompressionBombError) as e:
+        # Not an image Pillow can read; the original is still served
+        print(f"Warning: No variants for {name}: {str(e)}")
+    return written
+
+
+def _for_format(image, fmt: str):
+    from PIL import Image
+
+    if fmt == "jpeg" and image.mode not in ("RGB", "L"):
+        # JPEG has no alpha channel: flatten onto white
+        background = Image.new("RGB", image.size, "white")
+        rgba = image.convert("RGBA")
+        background.paste(rgba, mask=rgba.getchannel("A"))
+        return background
+    if image.mode not in ("RGB", "RGBA", "L"):
+        return image.convert("RGBA")
+    return image
+
+
+class VariantPipeline:
+    """Generates derivatives in a lazily started process pool."""
+
+    def __init__(self, root: str, workers: int = WORKERS):
+        self.root = str(root)
+        self.workers = workers
+        self._pool: ProcessPoolExecutor | None = None
+
+    def submit(self, name: str) -> Future:
+        try:
+            future = self._get_pool().submit(render_variants, self.root, name)
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM-killed); start a fresh pool
+            self.shutdown()
+            future = self._get_pool().submit(render_variants, self.root, name)
+        future.add_done_callback(_report_failure)
+        return future
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn, not fork: forking a process that runs threads (the
+            # server's threadpool, DB pool) can copy held locks
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._pool
+
+    def locate(
+        self, name: str, width: int | None, accept: str | None
+    ) -> Tuple[str, str] | None:
+        """
+        Path and media type of the best existing derivative, or None if
+        none has been generated (yet).
+        """
+        chosen = pick_width(width)
+        for fmt in accepted_formats(accept):
+            path = os.path.join(self.root, variant_name(name, chosen, fmt))
+            if os.path.exists(path):
+                return path, MEDIA_TYPES[fmt]
+        return None
+
+    def shutdown(self, wait: bool = False) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait, cancel_futures=True)
+            self._pool = None
+
+
+def _report_failure(future: Future) -> None:
+    if not future.cancelled() and future.exception() is not None:
+        print(
+            f"Warning: Photo variant generation failed: {future.exception()}"
+        )
+
+
+variant_pipeline = VariantPipeline(IMAGES_DIR)
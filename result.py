@@ -61,6 +61,9 @@ class Result(Generic[T]):
             EntityNotFoundError,
             IntegrityConstraintError,
             DatabaseError,
+            PhotoTooLargeError,
+            PasswordHasherBusyError,
+            SearchUnavailableError,
         )
 
         if not self.is_err:
@@ -78,10 +81,26 @@ class Result(Generic[T]):
             return HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail=self.error
             )
+        elif self.is_exception_type(SearchUnavailableError):
+            return HTTPException(
+                status_code=status.HTTP_501_NOT_IMPLEMENTED,
+                detail=self.error,
+            )
         elif self.is_exception_type(IntegrityConstraintError):
             return HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST, detail=self.error
             )
+        elif self.is_exception_type(PhotoTooLargeError):
+            return HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=self.error,
+            )
+        elif self.is_exception_type(PasswordHasherBusyError):
+            return HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=self.error,
+                headers={"Retry-After": str(self.exception.retry_after)},
+            )
         elif self.is_exception_type(DatabaseError):
             return HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -0,0 +1,365 @@
+"""
+Seeded synthetic owners and pets at any scale.
+
+The lifespan hook only inserts crud.create_sample_data's three owners and
+pets. For load tests and query-plan work, generate realistic volumes
+instead:
+
+    python -m sample_data --owners 1000000 --pets 3000000 --seed 42
+
+Rows are built from weighted species / breed tables, species-specific age
+and weight distributions, and go in through Core executemany inserts of
+--chunk-size rows in a single transaction, skipping the ORM unit of work
+that dominates one-object-at-a-time inserts. The same seed and starting
+ids always produce the same rows. Distributions can be replaced with
+--species or a JSON file (--distributions) holding any of the
+Distributions fields.
+"""
+
+import argparse
+import bisect
+import itertools
+import json
+import random
+from dataclasses import dataclass, field, fields, replace
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple, TypeVar
+
+from sqlalchemy import Connection, func, insert, select
+
+from database import Owner, Pet
+from change_feed import claim_versions, claimed_range
+from pet_stats import stats_upserts
+
+T = TypeVar("T")
+
+CHUNK_SIZE = 10_000
+
+# Fixed so generated dates don't depend on when the generator runs
+REFERENCE_DATE = date(2026, 1, 1)
+
+# fmt: off
+FIRST_NAMES = (
+    "Alice", "Bob", "Carol", "David", "Emma", "Farid", "Grace", "Hiro",
+    "Isabel", "James", "Kemi", "Liam", "Maria", "Noah", "Olivia", "Priya",
+    "Quinn", "Rosa", "Sam", "Tariq", "Uma", "Victor", "Wen", "Yusuf", "Zoe",
+)
+LAST_NAMES = (
+    "Smith", "Johnson", "Lee", "Garcia", "Brown", "Nguyen", "Patel", "Kim",
+    "Martinez", "Okafor", "Rossi", "Schmidt", "Tanaka", "Walker", "Young",
+)
+PET_NAMES = (
+    "Bella", "Max", "Luna", "Charlie", "Lucy", "Cooper", "Daisy", "Milo",
+    "Fluffy", "Rex", "Tweety", "Nibbles", "Shadow", "Coco", "Pepper",
+    "Oliver", "Bubbles", "Ziggy", "Rocky", "Willow", "Goldie", "Simba",
+)
+# fmt: on
+CITIES = (
+    ("Meowtown", "CA", "90001"),
+    ("Barksville", "TX", "73301"),
+    ("Tweet City", "FL", "33101"),
+    ("Springfield", "IL", "62701"),
+    ("Portland", "OR", "97201"),
+    ("Burlington", "VT", "05401"),
+    ("Austin", "TX", "78701"),
+    ("Seattle", "WA", "98101"),
+)
+STREETS = ("Cat Lane", "Dog Ave", "Bird Rd", "Main St", "Oak Dr", "Elm St")
+COLORS = ("Black", "White", "Brown", "Grey", "Golden", "Spotted", "Tabby")
+
+
+@dataclass(frozen=True)
+class Distributions:
+    """
+    Relative weights and ranges the generator draws from.
+
+    Ages are triangular between 0 and the species' lifespan, peaking at a
+    third of it; weights are normal (mean, stddev) in kg, never below a
+    tenth of the mean. A species missing from breeds, lifespans or
+    weights_kg gets no breed, ages up to 15 and no weight.
+    """
+
+    species: Dict[str, float] = field(
+        default_factory=lambda: {
+            "Dog": 45,
+            "Cat": 35,
+            "Bird": 8,
+            "Rabbit": 6,
+            "Fish": 4,
+            "Reptile": 2,
+        }
+    )
+    breeds: Dict[str, Dict[str, float]] = field(
+        default_factory=lambda: {
+            "Dog": {
+                "Mixed": 30,
+                "Labrador Retriever": 12,
+                "Golden Retriever": 8,
+                "German Shepherd": 7,
+                "French Bulldog": 6,
+                "Poodle": 5,
+                "Beagle": 5,
+                "Dachshund": 4,
+            },
+            "Cat": {
+                "Domestic Shorthair": 50,
+                "Maine Coon": 8,
+                "Siamese": 7,
+                "Persian": 6,
+                "Ragdoll": 6,
+                "Bengal": 4,
+            },
+            "Bird": {"Budgerigar": 40, "Cockatiel": 25, "Canary": 20},
+            "Rabbit": {"Holland Lop": 30, "Netherland Dwarf": 25},
+            "Fish": {"Goldfish": 50, "Betta": 30},
+            "Reptile": {"Bearded Dragon": 40, "Leopard Gecko": 35},
+        }
+    )
+    lifespans: Dict[str, int] = field(
+        default_factory=lambda: {
+            "Dog": 15,
+            "Cat": 20,
+            "Bird": 12,
+            "Rabbit": 10,
+            "Fish": 8,
+            "Reptile": 15,
+        }
+    )
+    weights_kg: Dict[str, Tuple[float, float]] = field(
+        default_factory=lambda: {
+            "Dog": (18.0, 10.0),
+            "Cat": (4.5, 1.2),
+            "Bird": (0.1, 0.05),
+            "Rabbit": (2.0, 0.6),
+            "Fish": (0.05, 0.03),
+            "Reptile": (0.4, 0.2),
+        }
+    )
+    vaccinated_share: float = 0.8
+
+
+def load_distributions(path: str) -> Distributions:
+    """Defaults overridden by the fields present in a JSON file."""
+    with open(path) as f:
+        overrides = json.load(f)
+    known = {f.name for f in fields(Distributions)}
+    unknown = set(overrides) - known
+    if unknown:
+        raise ValueError(
+            f"Unknown distribution fields: {', '.join(sorted(unknown))}"
+        )
+    if "weights_kg" in overrides:
+        overrides["weights_kg"] = {
+            species: tuple(params)
+            for species, params in overrides["weights_kg"].items()
+        }
+    return replace(Distributions(), **overrides)
+
+
+# random.choice / randint go through getrandbits rejection sampling; a
+# single random() per draw is several times cheaper at millions of rows
+def _pick(rng: random.Random, values: Sequence[T]) -> T:
+    return values[int(rng.random() * len(values))]
+
+
+def _between(rng: random.Random, low: int, high: int) -> int:
+    """Uniform integer in [low, high]."""
+    return low + int(rng.random() * (high - low + 1))
+
+
+class _Picker:
+    """Weighted choice with the cumulative weights computed once."""
+
+    def __init__(self, weights: Dict[str, float]):
+        self.values = list(weights)
+        self.cum_weights = list(itertools.accumulate(weights.values()))
+        self.total = self.cum_weights[-1]
+
+    def __call__(self, rng: random.Random) -> str:
+        index = bisect.bisect(self.cum_weights, rng.random() * self.total)
+        return self.values[min(index, len(self.values) - 1)]
+
+
+def owner_rows(
+    rng: random.Random, first_id: int, count: int
+) -> Iterator[Dict[str, object]]:
+    for owner_id in range(first_id, first_id + count):
+        first, last = _pick(rng, FIRST_NAMES), _pick(rng, LAST_NAMES)
+        city, state, zip_code = _pick(rng, CITIES)
+        born = REFERENCE_DATE - timedelta(
+            days=_between(rng, 18 * 365, 85 * 365)
+        )
+        yield {
+            "id": owner_id,
+            "name": f"{first} {last}",
+            # The id keeps emails unique across any number of owners
+            "email": f"{first}.{last}.{owner_id}@example.com".lower(),
+            "phone": f"555-{_between(rng, 0, 9999):04d}",
+            "address": f"{_between(rng, 1, 9999)} {_pick(rng, STREETS)}",
+            "city": city,
+            "state": state,
+            "zip_code": zip_code,
+            "country": "USA",
+            "date_of_birth": born.isoformat(),
+        }
+
+
+def pet_rows(
+    rng: random.Random,
+    first_id: int,
+    count: int,
+    owner_ids: Tuple[int, int],
+    distributions: Distributions = Distributions(),
+) -> Iterator[Dict[str, object]]:
+    """Pets owned by random owners with ids in the inclusive owner_ids."""
+    pick_species = _Picker(distributions.species)
+    pick_breed = {
+        species: _Picker(breeds)
+        for species, breeds in distributions.breeds.items()
+        if breeds
+    }
+    added_from = datetime.combine(REFERENCE_DATE, datetime.min.time())
+    for pet_id in range(first_id, first_id + count):
+        species = pick_species(rng)
+        lifespan = distributions.lifespans.get(species, 15)
+        age = int(rng.triangular(0, lifespan, lifespan / 3))
+        weight = None
+        if species in distributions.weights_kg:
+            mean, stddev = distributions.weights_kg[species]
+            weight = round(max(mean / 10, rng.gauss(mean, stddev)), 2)
+        born = REFERENCE_DATE - timedelta(
+            days=age * 365 + _between(rng, 0, 364)
+        )
+        added = added_from - timedelta(
+            seconds=_between(rng, 0, 5 * 365 * 86400)
+        )
+        yield {
+            "id": pet_id,
+            "name": _pick(rng, PET_NAMES),
+            "owner_id": _between(rng, *owner_ids),
+            "species": species,
+            "breed": (
+                pick_breed[species](rng) if species in pick_breed else None
+            ),
+            "age": age,
+            "weight": weight,
+            "color": _pick(rng, COLORS),
+            "gender": "male" if rng.random() < 0.5 else "female",
+            "is_vaccinated": rng.random() < distributions.vaccinated_share,
+            "birthdate": born,
+            "date_added": added,
+        }
+
+
+def _chunks(
+    rows: Iterable[Dict[str, object]], size: int
+) -> Iterator[List[Dict[str, object]]]:
+    iterator = iter(rows)
+    while chunk := list(itertools.islice(iterator, size)):
+        yield chunk
+
+
+def _stamp_versions(
+    connection: Connection, chunk: List[Dict[str, object]]
+) -> None:
+    stmt = claim_versions(connection.dialect.name, len(chunk))
+    last = connection.execute(stmt).scalar_one()
+    for row, version in zip(chunk, claimed_range(last, len(chunk))):
+        row["change_version"] = version
+
+
+def generate(
+    connection: Connection,
+    owners: int,
+    pets: int,
+    seed: int = 0,
+    chunk_size: int = CHUNK_SIZE,
+    distributions: Distributions = Distributions(),
+) -> Tuple[int, int]:
+    """
+    Insert owners, then pets spread over those new owners, after any rows
+    already present. Returns the first owner and pet ids used.
+    """
+    if pets and not owners:
+        raise ValueError("Pets need at least one owner to belong to")
+    rng = random.Random(seed)
+    first_owner = (
+        connection.execute(select(func.max(Owner.id))).scalar() or 0
+    ) + 1
+    first_pet = (
+        connection.execute(select(func.max(Pet.id))).scalar() or 0
+    ) + 1
+    # Core inserts skip the unit of work; a list of dicts runs as one
+    # executemany per chunk
+    for chunk in _chunks(owner_rows(rng, first_owner, owners), chunk_size):
+        _stamp_versions(connection, chunk)
+        connection.execute(insert(Owner), chunk)
+    owner_ids = (first_owner, first_owner + owners - 1)
+    rows = pet_rows(rng, first_pet, pets, owner_ids, distributions)
+    for chunk in _chunks(rows, chunk_size):
+        _stamp_versions(connection, chunk)
+        connection.execute(insert(Pet), chunk)
+        for stmt, stats in stats_upserts(connection.dialect.name, chunk):
+            connection.execute(stmt, stats)
+    return first_owner, first_pet
+
+
+def parse_weights(pairs: List[str]) -> Dict[str, float]:
+    """``["Dog=3", "Cat=1"]`` -> ``{"Dog": 3.0, "Cat": 1.0}``"""
+    weights = {}
+    for pair in pairs:
+        name, sep, weight = pair.partition("=")
+        if not sep or not name:
+            raise ValueError(f"Expected NAME=WEIGHT, got '{pair}'")
+        weights[name] = float(weight)
+    return weights
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Insert seeded synthetic owners and pets"
+    )
+    parser.add_argument("--owners", type=int, default=1000)
+    parser.add_argument("--pets", type=int, default=3000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument(
+        "--distributions", help="JSON file overriding Distributions fields"
+    )
+    parser.add_argument(
+        "--species",
+        nargs="+",
+        metavar="NAME=WEIGHT",
+        help="Species mix, e.g. Dog=3 Cat=2 Bird=1",
+    )
+    args = parser.parse_args()
+
+    distributions = (
+        load_distributions(args.distributions)
+        if args.distributions
+        else Distributions()
+    )
+    if args.species:
+        distributions = replace(
+            distributions, species=parse_weights(args.species)
+        )
+
+    from database import engine
+
+    with engine.begin() as connection:
+        first_owner, first_pet = generate(
+            connection,
+            args.owners,
+            args.pets,
+            seed=args.seed,
+            chunk_size=args.chunk_size,
+            distributions=distributions,
+        )
+    print(
+        f"Inserted owners {first_owner}..{first_owner + args.owners - 1} "
+        f"and pets {first_pet}..{first_pet + args.pets - 1}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,24 @@
-from pydantic import BaseModel, ConfigDict
-from typing import List
+import functools
+
+from pydantic import (
+    AfterValidator,
+    BaseModel,
+    ConfigDict,
+    Field,
+    computed_field,
+    create_model,
+)
+from typing import Annotated, Generic, List, Tuple, Type, TypeVar
 from datetime import date, datetime
 
+from photo_store import is_content_name
+from photo_variants import VARIANT_WIDTHS
+
+T = TypeVar("T")
+
+# Most rows a single bulk create request may carry
+MAX_BULK_SIZE = 5000
+
 
 # Pet schemas
 class PetCreate(BaseModel):
@@ -37,6 +54,54 @@ class PetRead(BaseModel):
 
     model_config = ConfigDict(from_attributes=True)
 
+    @computed_field
+    @property
+    def photo_variants(self) -> List["PhotoVariant"] | None:
+        """Resized copies of the photo; the format follows `Accept`."""
+        if not is_content_name(self.photo_filename):
+            return None
+        return [
+            PhotoVariant(
+                width=width, url=f"/photos/{self.photo_filename}?w={width}"
+            )
+            for width in VARIANT_WIDTHS
+        ]
+
+
+class PhotoVariant(BaseModel):
+    width: int
+    url: str
+
+
+def _naive_local(value: datetime) -> datetime:
+    # date_added is stored as naive server-local time and the database
+    # driver drops any offset, so convert instead
+    if value.tzinfo is None:
+        return value
+    return value.astimezone().replace(tzinfo=None)
+
+
+# A point in time compared with date_added
+LocalDateTime = Annotated[datetime, AfterValidator(_naive_local)]
+
+
+class PetFilters(BaseModel):
+    """Server-side filters for pet listings; None means "any"."""
+
+    species: str | None = None
+    owner_id: int | None = None
+    is_vaccinated: bool | None = None
+    gender: str | None = None
+    min_age: int | None = None
+    max_age: int | None = None
+    min_weight: float | None = None
+    max_weight: float | None = None
+    # date_added window, since inclusive and before exclusive
+    added_since: LocalDateTime | None = None
+    added_before: LocalDateTime | None = None
+    # Newest date_added first instead of id order
+    newest_first: bool = False
+
 
 # Owner schemas
 class OwnerCreate(BaseModel):
@@ -51,7 +116,7 @@ class OwnerCreate(BaseModel):
     date_of_birth: str | None = None
 
 
-class OwnerRead(BaseModel):
+class OwnerReadBase(BaseModel):
     id: int
     name: str
     email: str | None = None
@@ -62,6 +127,109 @@ class OwnerRead(BaseModel):
     zip_code: str | None = None
     country: str | None = None
     date_of_birth: str | None = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class OwnerRead(OwnerReadBase):
     pets: List["PetRead"] = []
 
+
+class OwnerSummary(OwnerReadBase):
+    """An owner with the number of pets instead of the pets themselves."""
+
+    pet_count: int = 0
+
+
+@functools.lru_cache(maxsize=256)
+def field_subset(
+    schema: Type[BaseModel], fields: Tuple[str, ...]
+) -> Type[BaseModel]:
+    """schema cut down to fields, for ``?fields=`` sparse fieldsets."""
+    return create_model(
+        f"{schema.__name__}Fields",
+        __config__=ConfigDict(from_attributes=True),
+        **{
+            name: (
+                schema.model_fields[name].annotation,
+                schema.model_fields[name],
+            )
+            for name in fields
+        },
+    )
+
+
+# User schemas
+class UserRead(BaseModel):
+    id: int
+    username: str
+    email: str | None = None
+    full_name: str | None = None
+    is_active: bool = True
+
     model_config = ConfigDict(from_attributes=True)
+
+
+# Bulk schemas
+BulkOwnerCreate = Annotated[
+    List[OwnerCreate], Field(min_length=1, max_length=MAX_BULK_SIZE)
+]
+BulkPetCreate = Annotated[
+    List[PetCreate], Field(min_length=1, max_length=MAX_BULK_SIZE)
+]
+
+
+class BulkItemResult(BaseModel, Generic[T]):
+    """Outcome of one row of a bulk create, in request order."""
+
+    index: int
+    ok: bool
+    item: T | None = None
+    error: str | None = None
+    error_type: str | None = None
+
+
+# Search schemas
+class SearchResults(BaseModel):
+    """Best matches first; next_offset is None on the last page."""
+
+    pets: List[PetRead] = []
+    owners: List[OwnerReadBase] = []
+    next_offset: int | None = None
+
+
+# Statistics schemas
+class PetSummary(BaseModel):
+    """Averages are None when no pet in the group has that value."""
+
+    pet_count: int = 0
+    vaccination_rate: float | None = None
+    average_age: float | None = None
+    average_weight: float | None = None
+
+
+class SpeciesSummary(PetSummary):
+    # None groups the pets without a species
+    species: str | None = None
+
+
+class PetStats(BaseModel):
+    total: PetSummary
+    species: List[SpeciesSummary] = []
+
+
+class OwnerPetStats(PetSummary):
+    owner_id: int
+
+
+# Change feed schemas
+class ChangeSet(BaseModel):
+    """
+    Rows created after `since`, oldest first. Pass `cursor` as the next
+    `since`; has_more means another request would return more right away.
+    """
+
+    owners: List[OwnerReadBase] = []
+    pets: List[PetRead] = []
+    cursor: int
+    has_more: bool = False
@@ -0,0 +1,104 @@
+"""
+SQLite FTS5 full-text index over pets and owners.
+
+The pets_fts / owners_fts tables are external-content FTS5 tables: they
+store only the index and read the text from pets / owners, and triggers
+keep them in step with every insert, update and delete. They are created
+by the 20261017_add_search_index migration; for a database built with
+create_all (or restored from a dump) run:
+
+    python -m search_index rebuild
+
+Other databases (PostgreSQL) have no search index, and searching them
+fails with SearchUnavailableError.
+"""
+
+import argparse
+import re
+from typing import List
+
+from sqlalchemy import Connection, text
+
+# (fts table, content table, indexed columns)
+SEARCH_TABLES = (
+    ("pets_fts", "pets", ("name", "breed", "description")),
+    ("owners_fts", "owners", ("name", "email", "city")),
+)
+
+
+def search_index_ddl() -> List[str]:
+    """CREATE statements for the FTS tables and their sync triggers."""
+    statements = []
+    for fts, table, columns in SEARCH_TABLES:
+        cols = ", ".join(columns)
+        new = ", ".join(f"new.{c}" for c in columns)
+        old = ", ".join(f"old.{c}" for c in columns)
+        statements += [
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+            f"{cols}, content='{table}', content_rowid='id', "
+            f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} "
+            f"BEGIN INSERT INTO {fts}(rowid, {cols}) "
+            f"VALUES (new.id, {new}); END",
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} "
+            f"BEGIN INSERT INTO {fts}({fts}, rowid, {cols}) "
+            f"VALUES ('delete', old.id, {old}); END",
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE ON {table} "
+            f"BEGIN INSERT INTO {fts}({fts}, rowid, {cols}) "
+            f"VALUES ('delete', old.id, {old}); "
+            f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new}); END",
+        ]
+    return statements
+
+
+def create_search_index(connection: Connection) -> None:
+    for statement in search_index_ddl():
+        connection.execute(text(statement))
+
+
+def rebuild_search_index(connection: Connection) -> None:
+    """Create the index if needed and re-read every row into it."""
+    create_search_index(connection)
+    for fts, _, _ in SEARCH_TABLES:
+        connection.execute(
+            text(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+        )
+
+
+def supports_search(dialect_name: str) -> bool:
+    return dialect_name == "sqlite"
+
+
+def match_query(user_query: str) -> str | None:
+    """
+    Turn free text into a safe FTS5 MATCH expression.
+
+    Every word becomes a quoted prefix term and all of them must match, so
+    user input can never be parsed as FTS5 syntax. Returns None when the
+    text has no searchable words.
+    """
+    words = re.findall(r"\w+", user_query)
+    if not words:
+        return None
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Manage the full-text search index"
+    )
+    parser.add_argument("command", choices=["create", "rebuild"])
+    args = parser.parse_args()
+
+    from database import engine
+
+    with engine.begin() as connection:
+        if args.command == "create":
+            create_search_index(connection)
+        else:
+            rebuild_search_index(connection)
+    print(f"Search index {args.command} complete")
+
+
+if __name__ == "__main__":
+    main()
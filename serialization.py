@@ -0,0 +1,52 @@
+"""
+Opt-in fast JSON rendering for list responses.
+
+The default path validates every ORM row into its schema one
+``model_validate`` call at a time and then walks the result again with
+FastAPI's pure-Python ``jsonable_encoder``. With PETSHOP_FAST_SERIALIZATION
+set, the whole list goes through one cached TypeAdapter instead (a single
+pydantic-core call to validate, one to dump) and is encoded by the stdlib
+C encoder with JSONResponse's exact settings, so the bytes (and therefore
+the ETags) are identical to the default path.
+
+orjson was measured too: on top of pydantic-core it saved nothing, and it
+writes exponent floats differently (``1e-5`` for Python's ``1e-05``), which
+would break byte compatibility.
+"""
+
+import functools
+import json
+import os
+from typing import Any, List, Sequence, Type
+
+from pydantic import BaseModel, TypeAdapter
+
+FAST_SERIALIZATION = os.getenv("PETSHOP_FAST_SERIALIZATION", "").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+
+
+@functools.lru_cache(maxsize=None)
+def list_adapter(schema: Type[BaseModel]) -> TypeAdapter:
+    # Building an adapter compiles a validator and serializer; do it once
+    return TypeAdapter(List[schema])
+
+
+def dump_list(schema: Type[BaseModel], items: Sequence[Any]) -> bytes:
+    """
+    The JSON array JSONResponse would render for
+    ``jsonable_encoder([schema.model_validate(i) for i in items])``.
+    """
+    adapter = list_adapter(schema)
+    models = adapter.validate_python(items, from_attributes=True)
+    # jsonable_encoder dumps models in json mode by alias
+    content = adapter.dump_python(models, mode="json", by_alias=True)
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
@@ -1,9 +1,41 @@
+import asyncio
+import os
 import pytest
+import tempfile
+from contextlib import contextmanager
+from dataclasses import replace
 from unittest.mock import MagicMock
 from fastapi.testclient import TestClient
-
-from database import Owner, Pet
-from main import app, get_db
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+# Importing database creates tables in the configured database, so point
+# it at a scratch file before anything imports it, never ./petshop.db
+_scratch_dir = tempfile.TemporaryDirectory()
+os.environ["PETSHOP_DB_PROFILE"] = "test"
+os.environ["PETSHOP_DATABASE_URL"] = (
+    f"sqlite:///{os.path.join(_scratch_dir.name, 'petshop.db')}"
+)
+
+from auth import user_cache
+from cache import response_cache
+from database import (
+    ENGINE_PROFILES,
+    Base,
+    Owner,
+    Pet,
+    PrimarySession,
+    QueryStats,
+    create_profile_engine,
+)
+from main import (
+    app,
+    get_db,
+    get_async_db,
+    get_read_db,
+    get_session_factory,
+)
 from result import Result
 
 
@@ -17,12 +49,93 @@ def mock_db():
 @pytest.fixture
 def test_app(mock_db):
     """Test client with mocked database session"""
+    response_cache.invalidate()
+    user_cache.clear()
     app.dependency_overrides[get_db] = lambda: mock_db
+    app.dependency_overrides[get_async_db] = lambda: mock_db
+    app.dependency_overrides[get_read_db] = lambda: mock_db
+    app.dependency_overrides[get_session_factory] = lambda: lambda: mock_db
     client = TestClient(app)
     yield client
     app.dependency_overrides.clear()
 
 
+@pytest.fixture
+def sqlite_engine(tmp_path):
+    """Engine on a scratch SQLite file with the schema created, set up
+    like the app's own (pragmas, query accounting)"""
+    db_engine = create_profile_engine(
+        replace(
+            ENGINE_PROFILES["test"], url=f"sqlite:///{tmp_path / 'app.db'}"
+        )
+    )
+    Base.metadata.create_all(db_engine)
+    yield db_engine
+    db_engine.dispose()
+
+
+@pytest.fixture
+def sqlite_app(sqlite_engine):
+    """Test client whose sessions all use the scratch SQLite database"""
+    response_cache.invalidate()
+    user_cache.clear()
+    session_factory = sessionmaker(bind=sqlite_engine, class_=PrimarySession)
+    async_engine = create_async_engine(
+        sqlite_engine.url.set(drivername="sqlite+aiosqlite")
+    )
+    async_session_factory = async_sessionmaker(
+        async_engine, expire_on_commit=False, sync_session_class=PrimarySession
+    )
+
+    def db():
+        with session_factory() as session:
+            yield session
+
+    async def async_db():
+        async with async_session_factory() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = db
+    app.dependency_overrides[get_read_db] = db
+    app.dependency_overrides[get_async_db] = async_db
+    app.dependency_overrides[get_session_factory] = lambda: session_factory
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+    asyncio.run(async_engine.dispose())
+
+
+@pytest.fixture
+def query_budget(sqlite_engine):
+    """
+    Context manager failing the test if more than max_queries statements
+    run against sqlite_engine inside it:
+
+        with query_budget(2):
+            sqlite_app.get("/owners/?include=pets")
+    """
+
+    @contextmanager
+    def budget(max_queries: int):
+        stats = QueryStats()
+
+        def record(conn, cursor, statement, parameters, context, many):
+            stats.record(statement, 0.0)
+
+        event.listen(sqlite_engine, "after_cursor_execute", record)
+        try:
+            yield stats
+        finally:
+            event.remove(sqlite_engine, "after_cursor_execute", record)
+        shapes = "\n".join(
+            f"  {count} x {shape}" for shape, count in stats.shapes.items()
+        )
+        assert (
+            stats.count <= max_queries
+        ), f"{stats.count} queries, budget {max_queries}:\n{shapes}"
+
+    return budget
+
+
 @pytest.fixture
 def test_owner():
     """Sample owner data"""
@@ -1,12 +1,26 @@
-from unittest.mock import patch
+import hashlib
+import pytest
+from datetime import date, datetime, timedelta, timezone
+from unittest.mock import MagicMock, patch
 from fastapi import status
+from starlette.requests import ClientDisconnect
+from sqlalchemy.orm import Session
 
 from exceptions import (
     EntityNotFoundError,
+    IntegrityConstraintError,
+    PasswordHasherBusyError,
 )
-from database import Owner, Pet
+import crud
+from database import Owner, Pet, User
+from main import stream_list
+from schemas import PetFilters, PetRead
+from photo_store import PhotoStore
 from result import Result
 
+# JPEG magic bytes, so the stored name gets a .jpg extension
+FAKE_JPEG = b"\xff\xd8\xff\xe0fake image data"
+
 
 class TestOwnerEndpoints:
     def test_create_owner_success(self, test_app, mock_owner_result):
@@ -34,6 +48,38 @@ class TestOwnerEndpoints:
                 response.status_code == status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    def test_create_owners_bulk_partial(self, test_app):
+        """Test a rejected row is reported without hiding the others"""
+        # Setup
+        row_results = Result.ok(
+            [
+                Result.ok(Owner(id=1, name="A")),
+                Result.err(IntegrityConstraintError("duplicate email")),
+            ]
+        )
+        with patch(
+            "crud.create_owners_bulk", return_value=row_results
+        ) as create_bulk:
+            # Execute
+            response = test_app.post(
+                "/owners/bulk", json=[{"name": "A"}, {"name": "B"}]
+            )
+
+            # Assert
+            assert response.status_code == status.HTTP_207_MULTI_STATUS
+            data = response.json()
+            assert data[0]["ok"] is True
+            assert data[0]["item"]["name"] == "A"
+            assert data[1]["ok"] is False
+            assert data[1]["error_type"] == "IntegrityConstraintError"
+            rows = create_bulk.call_args[0][1]
+            assert [r["name"] for r in rows] == ["A", "B"]
+
+    def test_create_owners_bulk_empty(self, test_app):
+        """Test an empty bulk request is rejected"""
+        response = test_app.post("/owners/bulk", json=[])
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
     def test_list_owners_success(self, test_app):
         """Test successful listing of owners"""
         # Setup
@@ -71,21 +117,112 @@ class TestOwnerEndpoints:
             assert response.status_code == status.HTTP_200_OK
             assert response.json() == []
 
+    def test_list_owners_paginated(self, test_app, mock_db):
+        """Test a full page advertises the cursor of its last owner"""
+        # Setup - crud returns limit + 1 rows when another page exists
+        mock_owners = [Owner(id=i, name=f"User {i}") for i in (3, 4, 5)]
+        with patch(
+            "crud.get_owners", return_value=Result.ok(mock_owners)
+        ) as get_owners:
+            # Execute
+            response = test_app.get("/owners/?limit=2&after=2")
+
+            # Assert
+            assert response.status_code == status.HTTP_200_OK
+            assert [o["id"] for o in response.json()] == [3, 4]
+            assert response.headers["X-Next-Cursor"] == "4"
+            get_owners.assert_called_once_with(
+                mock_db,
+                limit=3,
+                after=2,
+                include_pets=False,
+                with_pet_count=False,
+            )
+
+    def test_list_owners_without_pets(self, test_app):
+        """Test owners are listed without a pets key by default"""
+        # Setup
+        mock_owners = [Owner(id=1, name="User 1")]
+        with patch(
+            "crud.get_owners", return_value=Result.ok(mock_owners)
+        ) as get_owners:
+            # Execute
+            response = test_app.get("/owners/")
+
+            # Assert
+            assert response.status_code == status.HTTP_200_OK
+            assert "pets" not in response.json()[0]
+            assert get_owners.call_args.kwargs["include_pets"] is False
+
+    def test_list_owners_include_pets(self, test_app):
+        """Test include=pets embeds each owner's pets"""
+        # Setup
+        owner = Owner(id=1, name="User 1")
+        owner.pets = [Pet(id=5, name="Rex", owner_id=1)]
+        with patch(
+            "crud.get_owners",
+            return_value=Result.ok([owner, Owner(id=2, name="User 2")]),
+        ) as get_owners:
+            # Execute
+            response = test_app.get("/owners/?include=pets&limit=1")
+
+            # Assert
+            assert response.status_code == status.HTTP_200_OK
+            data = response.json()
+            assert len(data) == 1
+            assert data[0]["pets"][0]["name"] == "Rex"
+            assert response.headers["X-Next-Cursor"] == "1"
+            assert get_owners.call_args.kwargs["include_pets"] is True
+
+    def test_list_owners_include_pet_count(self, test_app):
+        """Test include=pet_count adds a count instead of the pets"""
+        # Setup
+        owner = Owner(id=1, name="User 1")
+        owner.pet_count = 3
+        with patch(
+            "crud.get_owners", return_value=Result.ok([owner])
+        ) as get_owners:
+            # Execute
+            response = test_app.get("/owners/?include=pet_count")
+
+            # Assert
+            assert response.status_code == status.HTTP_200_OK
+            assert response.json()[0]["pet_count"] == 3
+            assert "pets" not in response.json()[0]
+            assert get_owners.call_args.kwargs["with_pet_count"] is True
+            assert get_owners.call_args.kwargs["include_pets"] is False
+
+    def test_list_owners_pets_and_pet_count(self, test_app):
+        """Test pets and pet_count can't both be included"""
+        response = test_app.get("/owners/?include=pets,pet_count")
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_list_owners_unknown_include(self, test_app):
+        """Test unsupported include values are rejected"""
+        response = test_app.get("/owners/?include=vets")
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
 
 class TestPetEndpoints:
     def test_create_pet_success(
-        self, test_app, mock_pet_result, mock_owner_result
+        self, test_app, mock_pet_result, mock_owner_result, tmp_path
     ):
         """Test successful pet creation with photo and species"""
         # Setup
         mock_pet_result.value.species = "Dog"
         mock_pet_result.value.photo_filename = "test.jpg"
-        with patch("crud.get_owner", return_value=mock_owner_result), patch(
-            "crud.create_pet", return_value=mock_pet_result
-        ):
+        with patch(
+            "async_crud.get_owner", return_value=mock_owner_result
+        ), patch(
+            "async_crud.create_pet", return_value=mock_pet_result
+        ) as create_pet, patch(
+            "main.photo_store", PhotoStore(tmp_path)
+        ), patch(
+            "main.variant_pipeline.submit"
+        ) as submit_variants:
             # Simulate file upload
             files = {
-                "photo": ("test.jpg", b"fake image data", "image/jpeg"),
+                "photo": ("test.jpg", FAKE_JPEG, "image/jpeg"),
             }
             data = {
                 "name": "Test Pet",
@@ -105,12 +242,36 @@ class TestPetEndpoints:
             assert data["owner_id"] == 1
             assert data["species"] == "Dog"
             assert "photo_filename" in data
+            # Stored under its content hash, not the client's filename
+            stored = create_pet.call_args.args[4]
+            digest = hashlib.sha256(FAKE_JPEG).hexdigest()
+            assert stored == f"{digest[:2]}/{digest[2:4]}/{digest}.jpg"
+            assert (tmp_path / stored).read_bytes() == FAKE_JPEG
+            submit_variants.assert_called_once_with(stored)
+
+    def test_create_pet_photo_too_large(self, test_app, mock_owner_result):
+        """Test an oversized photo is rejected with 413"""
+        with patch(
+            "async_crud.get_owner", return_value=mock_owner_result
+        ), patch("async_crud.create_pet") as create_pet, patch(
+            "main.photo_store.max_bytes", 4
+        ):
+            response = test_app.post(
+                "/pets/",
+                data={"name": "Test Pet", "owner_id": 1},
+                files={"photo": ("a.jpg", b"too big", "image/jpeg")},
+            )
+            assert (
+                response.status_code
+                == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+            )
+            create_pet.assert_not_called()
 
     def test_create_pet_owner_not_found(self, test_app):
         """Test pet creation with non-existent owner"""
         # Setup - owner doesn't exist
         error_result = Result.err(EntityNotFoundError("Owner not found"))
-        with patch("crud.get_owner", return_value=error_result):
+        with patch("async_crud.get_owner", return_value=error_result):
             # Use form data, not JSON
             data = {"name": "Test Pet", "owner_id": 999}
             response = test_app.post(
@@ -121,6 +282,45 @@ class TestPetEndpoints:
             # Assert
             assert response.status_code == status.HTTP_404_NOT_FOUND
 
+    def test_create_pets_bulk_success(self, test_app):
+        """Test bulk pet creation returns 201 when every row is created"""
+        # Setup
+        row_results = Result.ok(
+            [Result.ok(Pet(id=i, name=f"Pet {i}", owner_id=1)) for i in (1, 2)]
+        )
+        with patch(
+            "crud.create_pets_bulk", return_value=row_results
+        ) as create_bulk:
+            # Execute
+            response = test_app.post(
+                "/pets/bulk",
+                json=[
+                    {
+                        "name": "Pet 1",
+                        "owner_id": 1,
+                        "birthdate": "2020-01-02",
+                    },
+                    {"name": "Pet 2", "owner_id": 1},
+                ],
+            )
+
+            # Assert
+            assert response.status_code == status.HTTP_201_CREATED
+            assert [r["item"]["id"] for r in response.json()] == [1, 2]
+            rows = create_bulk.call_args[0][1]
+            assert rows[0]["birthdate"] == date(2020, 1, 2)
+            assert rows[0]["date_added"] == rows[1]["date_added"]
+
+    def test_create_pets_bulk_error(self, test_app, mock_error_result):
+        """Test a failed bulk transaction is a single error"""
+        with patch("crud.create_pets_bulk", return_value=mock_error_result):
+            response = test_app.post(
+                "/pets/bulk", json=[{"name": "Pet 1", "owner_id": 1}]
+            )
+            assert (
+                response.status_code == status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
     def test_list_pets_success(self, test_app):
         """Test successful listing of pets with photo and species"""
         # Setup
@@ -154,3 +354,443 @@ class TestPetEndpoints:
             assert data[1]["name"] == "Spot"
             assert data[1]["species"] == "Dog"
             assert data[1]["photo_filename"] is None
+
+    def test_list_pets_last_page(self, test_app):
+        """Test a short page carries no next cursor"""
+        # Setup
+        mock_pets = [Pet(id=7, name="Rex", owner_id=1)]
+        with patch("crud.get_pets", return_value=Result.ok(mock_pets)):
+            # Execute
+            response = test_app.get("/pets/?limit=2&after=6")
+
+            # Assert
+            assert response.status_code == status.HTTP_200_OK
+            assert len(response.json()) == 1
+            assert "X-Next-Cursor" not in response.headers
+
+    def test_list_pets_limit_too_large(self, test_app):
+        """Test page sizes above the maximum are rejected"""
+        response = test_app.get("/pets/?limit=100000")
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+    def test_list_pets_stream_json(self, test_app, mock_db):
+        """Test streaming pets as a JSON array from a cursor"""
+        # Setup
+        mock_pets = (Pet(id=i, name=f"Pet {i}", owner_id=1) for i in (1, 2))
+        with patch("crud.stream_pets", return_value=Result.ok(mock_pets)):
+            # Execute
+            response = test_app.get("/pets/?stream=json")
+
+            # Assert
+            assert response.status_code == status.HTTP_200_OK
+            assert response.headers["content-type"] == "application/json"
+            assert [p["name"] for p in response.json()] == ["Pet 1", "Pet 2"]
+            mock_db.close.assert_called_once()
+
+    def test_list_pets_stream_ndjson(self, test_app):
+        """Test streaming pets as newline-delimited JSON"""
+        # Setup
+        mock_pets = iter([Pet(id=1, name="Rex", owner_id=1)])
+        with patch("crud.stream_pets", return_value=Result.ok(mock_pets)):
+            # Execute
+            response = test_app.get("/pets/?stream=ndjson")
+
+            # Assert
+            assert response.status_code == status.HTTP_200_OK
+            assert response.headers["content-type"] == "application/x-ndjson"
+            lines = response.text.splitlines()
+            assert len(lines) == 1
+            assert '"name":"Rex"' in lines[0]
+
+    def test_list_pets_stream_empty(self, test_app):
+        """Test streaming an empty table yields an empty JSON array"""
+        with patch("crud.stream_pets", return_value=Result.ok(iter([]))):
+            response = test_app.get("/pets/?stream=json")
+            assert response.json() == []
+
+    async def test_stream_closes_session_when_client_never_reads(self):
+        """Test the cursor's session is closed if no chunk is ever sent"""
+        # Setup
+        close = MagicMock()
+        response = stream_list(PetRead, iter([]), "json", close)
+
+        async def send(message):
+            raise OSError("client went away")
+
+        # Execute
+        with pytest.raises(ClientDisconnect):
+            await response(
+                {"type": "http", "asgi": {"spec_version": "2.4"}}, None, send
+            )
+
+        # Assert
+        close.assert_called_once()
+
+    def test_list_pets_stream_error(
+        self, test_app, mock_db, mock_error_result
+    ):
+        """Test a failed cursor is reported before streaming starts"""
+        with patch("crud.stream_pets", return_value=mock_error_result):
+            response = test_app.get("/pets/?stream=json")
+            assert (
+                response.status_code == status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+            mock_db.close.assert_called_once()
+
+
+class TestPetFiltering:
+    def test_list_pets_passes_filters(self, test_app):
+        """Test query filters reach the crud layer"""
+        with patch("crud.get_pets", return_value=Result.ok([])) as get_pets:
+            # Execute
+            response = test_app.get(
+                "/pets/?species=Cat&is_vaccinated=true&min_age=1&max_weight=5"
+            )
+
+            # Assert
+            assert response.status_code == status.HTTP_200_OK
+            filters = get_pets.call_args.kwargs["filters"]
+            assert filters.species == "Cat"
+            assert filters.is_vaccinated is True
+            assert filters.min_age == 1
+            assert filters.max_weight == 5.0
+            assert filters.owner_id is None
+
+    def test_newest_first_pages_by_date_added(self, sqlite_app, sqlite_engine):
+        """Test newest-first paging, id tie-breaks and the time window"""
+        # Setup - ties on date_added, and a pet without one
+        added = [
+            datetime(2025, 1, 1),
+            datetime(2025, 3, 1),
+            datetime(2025, 3, 1),
+            datetime(2025, 2, 1),
+            None,
+        ]
+        with Session(sqlite_engine) as db:
+            db.add(Owner(id=1, name="Alice"))
+            db.add_all(
+                Pet(id=i, name=f"Pet {i}", owner_id=1, date_added=when)
+                for i, when in enumerate(added, start=1)
+            )
+            db.commit()
+
+        # Execute
+        first = sqlite_app.get("/pets/?order=newest&limit=2")
+        cursor = first.headers["X-Next-Cursor"]
+        second = sqlite_app.get(f"/pets/?order=newest&limit=2&after={cursor}")
+        window = sqlite_app.get(
+            "/pets/?order=newest&added_since=2025-02-01"
+            "&added_before=2025-03-01T00:00:00"
+        )
+
+        # Assert
+        assert [p["id"] for p in first.json()] == [3, 2]
+        assert cursor == "2"
+        assert [p["id"] for p in second.json()] == [4, 1]
+        assert "X-Next-Cursor" not in second.headers
+        assert [p["id"] for p in window.json()] == [4]
+        assert first.json()[0]["date_added"] == "2025-03-01T00:00:00"
+
+    def test_added_since_with_offset(self, sqlite_app, sqlite_engine):
+        """Test an aware time filters by the instant, not the wall clock"""
+        # Setup
+        with Session(sqlite_engine) as db:
+            db.add(Owner(id=1, name="Alice"))
+            db.add(
+                Pet(
+                    id=1,
+                    name="Rex",
+                    owner_id=1,
+                    date_added=datetime(2025, 2, 1, 9),
+                )
+            )
+            db.commit()
+        since = datetime(2025, 2, 1, 8).astimezone(
+            timezone(timedelta(hours=14))
+        )
+
+        # Execute
+        response = sqlite_app.get(
+            "/pets/", params={"added_since": since.isoformat()}
+        )
+
+        # Assert
+        assert [p["id"] for p in response.json()] == [1]
+
+    def test_newest_first_is_an_index_scan(self, sqlite_engine):
+        """Test the newest-first page walks the date_added index"""
+        # Setup
+        stmt = crud._pets_stmt(
+            10,
+            5,
+            PetFilters(added_since=datetime(2025, 1, 1), newest_first=True),
+        )
+        sql = str(
+            stmt.compile(sqlite_engine, compile_kwargs={"literal_binds": True})
+        )
+
+        # Execute
+        with sqlite_engine.connect() as conn:
+            plan = " ".join(
+                row[-1]
+                for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")
+            )
+
+        # Assert
+        assert "USING INDEX ix_pets_date_added_id" in plan
+        assert "TEMP B-TREE" not in plan
+
+    def test_list_pets_rejects_negative_range(self, test_app):
+        """Test negative range bounds are rejected"""
+        response = test_app.get("/pets/?min_age=-1")
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+    def test_list_owner_pets(self, test_app, mock_owner_result):
+        """Test the owner-scoped listing filters on owner_id"""
+        # Setup
+        mock_pets = [Pet(id=4, name="Rex", owner_id=1)]
+        with patch("crud.get_owner", return_value=mock_owner_result), patch(
+            "crud.get_pets", return_value=Result.ok(mock_pets)
+        ) as get_pets:
+            # Execute
+            response = test_app.get("/owners/1/pets")
+
+            # Assert
+            assert response.status_code == status.HTTP_200_OK
+            assert [p["name"] for p in response.json()] == ["Rex"]
+            assert get_pets.call_args.kwargs["filters"].owner_id == 1
+
+    def test_list_owner_pets_unknown_owner(self, test_app):
+        """Test listing pets of a missing owner is a 404"""
+        error_result = Result.err(EntityNotFoundError("Owner not found"))
+        with patch("crud.get_owner", return_value=error_result):
+            response = test_app.get("/owners/999/pets")
+            assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+class TestSparseFieldsets:
+    def test_pets_fields_projection(
+        self, sqlite_app, sqlite_engine, query_budget
+    ):
+        """Test only the requested columns are selected and returned"""
+        # Setup
+        with Session(sqlite_engine) as db:
+            db.add(Owner(id=1, name="Alice"))
+            db.add_all(
+                Pet(
+                    name=f"Pet {i}",
+                    owner_id=1,
+                    species="Cat",
+                    description="long text " * 50,
+                    date_added=datetime(2025, 6, 1, 10),
+                )
+                for i in range(3)
+            )
+            db.commit()
+
+        # Execute
+        with query_budget(1) as stats:
+            response = sqlite_app.get(
+                "/pets/?fields=species,name,date_added&limit=2"
+            )
+
+        # Assert
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == [
+            {
+                "id": 1,
+                "name": "Pet 0",
+                "species": "Cat",
+                "date_added": "2025-06-01T10:00:00",
+            },
+            {
+                "id": 2,
+                "name": "Pet 1",
+                "species": "Cat",
+                "date_added": "2025-06-01T10:00:00",
+            },
+        ]
+        assert response.headers["X-Next-Cursor"] == "2"
+        (statement,) = stats.shapes
+        assert "description" not in statement
+
+    def test_owners_fields_uses_projection(self, test_app):
+        """Test owners fields are passed to crud in schema order"""
+        with patch(
+            "crud.get_owner_fields",
+            return_value=Result.ok([{"id": 1, "city": "Meowtown"}]),
+        ) as get_owner_fields:
+            # Execute
+            response = test_app.get("/owners/?fields=city")
+
+            # Assert
+            assert response.status_code == status.HTTP_200_OK
+            assert response.json() == [{"id": 1, "city": "Meowtown"}]
+            assert get_owner_fields.call_args.args[1] == ("id", "city")
+
+    def test_unknown_field_rejected(self, test_app):
+        """Test unknown or computed fields are a 400"""
+        response = test_app.get("/pets/?fields=name,photo_variants")
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "photo_variants" in response.json()["detail"]
+
+    def test_fields_with_include_or_stream_rejected(self, test_app):
+        """Test fields can't be combined with include or stream"""
+        assert (
+            test_app.get("/owners/?fields=name&include=pets").status_code
+            == status.HTTP_400_BAD_REQUEST
+        )
+        assert (
+            test_app.get("/pets/?fields=name&stream=ndjson").status_code
+            == status.HTTP_400_BAD_REQUEST
+        )
+
+
+class TestListCaching:
+    def test_list_pets_etag_and_304(self, test_app):
+        """Test list responses carry a strong ETag honoured by 304s"""
+        # Setup
+        mock_pets = [Pet(id=1, name="Fluffy", owner_id=1)]
+        with patch("crud.get_pets", return_value=Result.ok(mock_pets)):
+            # Execute
+            first = test_app.get("/pets/")
+            etag = first.headers["ETag"]
+            second = test_app.get("/pets/", headers={"If-None-Match": etag})
+
+            # Assert
+            assert first.status_code == status.HTTP_200_OK
+            assert etag.startswith('"') and etag.endswith('"')
+            assert second.status_code == status.HTTP_304_NOT_MODIFIED
+            assert second.content == b""
+            assert second.headers["ETag"] == etag
+
+    def test_list_pets_served_from_cache(self, test_app):
+        """Test a repeated list request does not query the database"""
+        # Setup
+        mock_pets = [Pet(id=1, name="Fluffy", owner_id=1)]
+        with patch(
+            "crud.get_pets", return_value=Result.ok(mock_pets)
+        ) as get_pets:
+            # Execute
+            first = test_app.get("/pets/?limit=5&after=0")
+            second = test_app.get("/pets/?after=0&limit=5")
+
+            # Assert
+            assert second.content == first.content
+            assert second.headers["ETag"] == first.headers["ETag"]
+            get_pets.assert_called_once()
+
+    def test_create_owner_invalidates_cache(self, test_app, mock_db):
+        """Test a successful write makes the next list re-query"""
+        # Setup
+        mock_db.refresh = lambda x: setattr(x, "id", 3)
+        mock_db.execute.return_value.scalar_one.return_value = 1
+        with patch(
+            "crud.get_owners", return_value=Result.ok([])
+        ) as get_owners:
+            # Execute
+            test_app.get("/owners/")
+            test_app.post("/owners/", json={"name": "New Owner"})
+            test_app.get("/owners/")
+
+            # Assert
+            assert get_owners.call_count == 2
+
+
+class TestSearch:
+    def test_search_pets_and_owners(self, test_app):
+        """Test search returns both kinds and the next page offset"""
+        # Setup
+        pets = [Pet(id=i, name=f"Goldie {i}", owner_id=1) for i in (1, 2, 3)]
+        owners = [Owner(id=1, name="Alice Golden")]
+        with patch(
+            "crud.search_pets", return_value=Result.ok(pets)
+        ) as search_pets, patch(
+            "crud.search_owners", return_value=Result.ok(owners)
+        ):
+            # Execute
+            response = test_app.get("/search?q=gold&limit=2&offset=4")
+
+            # Assert
+            assert response.status_code == status.HTTP_200_OK
+            body = response.json()
+            assert [p["id"] for p in body["pets"]] == [1, 2]
+            assert [o["name"] for o in body["owners"]] == ["Alice Golden"]
+            assert body["next_offset"] == 6
+            assert search_pets.call_args.args[1:] == ("gold", 3, 4)
+            assert "ETag" in response.headers
+
+    def test_search_scope(self, test_app):
+        """Test scope=owners skips the pet search"""
+        with patch("crud.search_pets") as search_pets, patch(
+            "crud.search_owners", return_value=Result.ok([])
+        ):
+            response = test_app.get("/search?q=gold&scope=owners")
+            assert response.status_code == status.HTTP_200_OK
+            assert response.json() == {
+                "pets": [],
+                "owners": [],
+                "next_offset": None,
+            }
+            search_pets.assert_not_called()
+
+    def test_search_requires_query(self, test_app):
+        """Test an empty query is rejected"""
+        response = test_app.get("/search?q=")
+        assert response.status_code == 422
+
+
+class TestAuthEndpoints:
+    def test_signup_hashes_off_threadpool(self, test_app):
+        """Test signup stores the hash from the password hasher"""
+        # Setup
+        with patch(
+            "async_crud.get_user_by_username", return_value=Result.ok(None)
+        ), patch(
+            "main.password_hasher.hash", return_value=Result.ok("$2b$hash")
+        ), patch(
+            "async_crud.create_user",
+            return_value=Result.ok(User(id=1, username="bob")),
+        ) as create_user:
+            # Execute
+            response = test_app.post(
+                "/signup", json={"username": "bob", "password": "pw"}
+            )
+
+            # Assert
+            assert response.status_code == status.HTTP_200_OK
+            assert create_user.call_args.args[1:] == ("bob", "$2b$hash")
+
+    def test_login_rehashes_outdated_hash(self, test_app):
+        """Test a successful login saves the upgraded hash"""
+        # Setup
+        user = User(id=1, username="bob", hashed_password="$2b$04$old")
+        with patch(
+            "async_crud.get_user_by_username", return_value=Result.ok(user)
+        ), patch(
+            "main.password_hasher.verify_and_update",
+            return_value=Result.ok((True, "$2b$12$new")),
+        ), patch(
+            "async_crud.update_password_hash"
+        ) as update_hash:
+            # Execute
+            response = test_app.post(
+                "/login", json={"username": "bob", "password": "pw"}
+            )
+
+            # Assert
+            assert response.status_code == status.HTTP_200_OK
+            assert update_hash.call_args.args[1:] == (user, "$2b$12$new")
+
+    def test_login_when_hasher_saturated(self, test_app):
+        """Test a saturated hasher answers 503 with Retry-After"""
+        user = User(id=1, username="bob", hashed_password="$2b$12$x")
+        busy = Result.err(PasswordHasherBusyError("busy", retry_after=3))
+        with patch(
+            "async_crud.get_user_by_username", return_value=Result.ok(user)
+        ), patch("main.password_hasher.verify_and_update", return_value=busy):
+            response = test_app.post(
+                "/login", json={"username": "bob", "password": "pw"}
+            )
+            assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+            assert response.headers["Retry-After"] == "3"
@@ -0,0 +1,148 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+from database import Owner, Pet, User
+import async_crud
+from exceptions import (
+    EntityNotFoundError,
+    IntegrityConstraintError,
+    DatabaseError,
+)
+
+
+@pytest.fixture
+def mock_async_db():
+    """Mock async database session"""
+    mock = MagicMock()
+    # Awaiting execute gives a plain (sync) result, as in SQLAlchemy
+    mock.execute = AsyncMock(return_value=MagicMock())
+    mock.commit = AsyncMock()
+    mock.refresh = AsyncMock()
+    mock.rollback = AsyncMock()
+    return mock
+
+
+class TestAsyncCrudOwnerOperations:
+    async def test_create_owner_success(self, mock_async_db):
+        """Test successful async owner creation"""
+        # Execute
+        result = await async_crud.create_owner(mock_async_db, "Test User")
+
+        # Assert
+        assert result.is_ok is True
+        assert result.value.name == "Test User"
+        assert result.value.pets == []
+        mock_async_db.add.assert_called_once()
+        mock_async_db.commit.assert_awaited_once()
+
+    async def test_create_owner_integrity_error(self, mock_async_db):
+        """Test async owner creation with integrity error"""
+        # Setup
+        mock_async_db.commit.side_effect = IntegrityError(
+            "stmt", "params", Exception("orig")
+        )
+
+        # Execute
+        result = await async_crud.create_owner(mock_async_db, "Test User")
+
+        # Assert
+        assert result.is_exception_type(IntegrityConstraintError)
+        mock_async_db.rollback.assert_awaited_once()
+
+    async def test_get_owner_found(self, mock_async_db):
+        """Test async retrieval of a specific owner"""
+        # Setup
+        execution_result = MagicMock()
+        execution_result.scalar_one_or_none.return_value = Owner(
+            id=1, name="User 1"
+        )
+        mock_async_db.execute.return_value = execution_result
+
+        # Execute
+        result = await async_crud.get_owner(mock_async_db, 1)
+
+        # Assert
+        assert result.is_ok is True
+        assert result.value.id == 1
+
+    async def test_get_owner_not_found(self, mock_async_db):
+        """Test async owner not found"""
+        # Setup
+        execution_result = MagicMock()
+        execution_result.scalar_one_or_none.return_value = None
+        mock_async_db.execute.return_value = execution_result
+
+        # Execute
+        result = await async_crud.get_owner(mock_async_db, 999)
+
+        # Assert
+        assert result.is_exception_type(EntityNotFoundError)
+
+
+class TestAsyncCrudPetOperations:
+    async def test_create_pet_success(self, mock_async_db):
+        """Test successful async pet creation"""
+        # Execute
+        result = await async_crud.create_pet(mock_async_db, "Fluffy", 1)
+
+        # Assert
+        assert result.is_ok is True
+        assert result.value.name == "Fluffy"
+        assert result.value.owner_id == 1
+        mock_async_db.commit.assert_awaited_once()
+        mock_async_db.refresh.assert_awaited_once()
+
+    async def test_create_pet_database_error(self, mock_async_db):
+        """Test async pet creation with database error"""
+        # Setup
+        mock_async_db.commit.side_effect = SQLAlchemyError("Database error")
+
+        # Execute
+        result = await async_crud.create_pet(mock_async_db, "Fluffy", 1)
+
+        # Assert
+        assert result.is_exception_type(DatabaseError)
+        mock_async_db.rollback.assert_awaited_once()
+
+    async def test_get_pets_success(self, mock_async_db):
+        """Test async retrieval of pets"""
+        # Setup
+        execution_result = MagicMock()
+        execution_result.scalars().all.return_value = [
+            Pet(id=1, name="Fluffy", owner_id=1)
+        ]
+        mock_async_db.execute.return_value = execution_result
+
+        # Execute
+        result = await async_crud.get_pets(mock_async_db, limit=5)
+
+        # Assert
+        assert result.is_ok is True
+        assert [p.name for p in result.value] == ["Fluffy"]
+
+
+class TestAsyncCrudUserOperations:
+    async def test_create_user_duplicate(self, mock_async_db):
+        """Test a username taken concurrently maps to an integrity error"""
+        # Setup
+        mock_async_db.commit.side_effect = IntegrityError(
+            "stmt", "params", Exception("orig")
+        )
+
+        # Execute
+        result = await async_crud.create_user(mock_async_db, "bob", "$2b$x")
+
+        # Assert
+        assert result.is_exception_type(IntegrityConstraintError)
+        mock_async_db.rollback.assert_awaited_once()
+
+    async def test_update_password_hash(self, mock_async_db):
+        """Test the replacement hash is stored and committed"""
+        user = User(id=1, username="bob", hashed_password="$2b$04$old")
+        result = await async_crud.update_password_hash(
+            mock_async_db, user, "$2b$12$new"
+        )
+        assert result.is_ok is True
+        assert user.hashed_password == "$2b$12$new"
+        mock_async_db.commit.assert_awaited_once()
@@ -0,0 +1,137 @@
+import pytest
+from fastapi import status
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from unittest.mock import patch
+
+from auth import UserCache, user_cache
+from database import Base, PrimarySession, User
+from result import Result
+from schemas import UserRead
+
+
+def _log_in(client, user):
+    """Log a client in as user, skipping the database and bcrypt"""
+    with patch(
+        "async_crud.get_user_by_username", return_value=Result.ok(user)
+    ), patch(
+        "main.password_hasher.verify_and_update",
+        return_value=Result.ok((True, None)),
+    ):
+        response = client.post(
+            "/login", json={"username": user.username, "password": "pw"}
+        )
+    assert response.status_code == status.HTTP_200_OK
+
+
+class TestUserCache:
+    def test_entries_expire_after_ttl(self):
+        """Test cached users are dropped after the TTL"""
+        cache = UserCache(ttl=30)
+        with patch("auth.time.monotonic", return_value=100.0):
+            cache.put(UserRead(id=1, username="bob"), cache.generation)
+        with patch("auth.time.monotonic", return_value=131.0):
+            assert cache.get(1) is None
+
+    def test_lru_eviction(self):
+        """Test the least recently used user is evicted first"""
+        cache = UserCache(ttl=30, max_entries=2)
+        for user_id in (1, 2):
+            cache.put(UserRead(id=user_id, username="u"), cache.generation)
+        cache.get(1)
+        cache.put(UserRead(id=3, username="u"), cache.generation)
+        assert cache.get(2) is None
+        assert cache.get(1) is not None
+
+    def test_stale_lookup_not_stored(self):
+        """Test a read that raced an invalidation is not cached"""
+        cache = UserCache(ttl=30)
+        generation = cache.generation
+        cache.invalidate(1)
+        cache.put(UserRead(id=1, username="bob"), generation)
+        assert cache.get(1) is None
+
+
+class TestCurrentUser:
+    def test_requires_login(self, test_app):
+        """Test anonymous requests are rejected"""
+        response = test_app.get("/me")
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_second_request_is_served_from_cache(self, test_app):
+        """Test the user is only loaded once across requests"""
+        # Setup
+        user = User(id=7, username="bob", is_active=True)
+        _log_in(test_app, user)
+
+        with patch("crud.get_user", return_value=Result.ok(user)) as get_user:
+            # Execute
+            first = test_app.get("/me")
+            second = test_app.get("/me")
+
+            # Assert
+            assert first.json()["username"] == "bob"
+            assert second.status_code == status.HTTP_200_OK
+            get_user.assert_called_once()
+
+    def test_inactive_user_rejected(self, test_app):
+        """Test a deactivated user is treated as logged out"""
+        user = User(id=7, username="bob", is_active=False)
+        _log_in(test_app, user)
+        with patch("crud.get_user", return_value=Result.ok(user)):
+            response = test_app.get("/me")
+            assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.fixture
+def primary(tmp_path):
+    """A PrimarySession factory over a scratch SQLite file"""
+    db_engine = create_engine(f"sqlite:///{tmp_path / 'users.db'}")
+    Base.metadata.create_all(db_engine)
+    yield sessionmaker(bind=db_engine, class_=PrimarySession)
+    db_engine.dispose()
+
+
+class TestUserInvalidation:
+    def test_commit_invalidates_changed_user(self, primary):
+        """Test deactivating a user drops them from the cache on commit"""
+        # Setup
+        user_cache.clear()
+        with primary() as db:
+            db.add_all(
+                [
+                    User(id=1, username="bob", hashed_password="x"),
+                    User(id=2, username="amy", hashed_password="x"),
+                ]
+            )
+            db.commit()
+        for user_id in (1, 2):
+            user_cache.put(
+                UserRead(id=user_id, username="u"), user_cache.generation
+            )
+
+        # Execute
+        with primary() as db:
+            db.get(User, 1).is_active = False
+            db.flush()
+            # Not yet committed, so still cached
+            assert user_cache.get(1) is not None
+            db.commit()
+
+        # Assert
+        assert user_cache.get(1) is None
+        assert user_cache.get(2) is not None
+
+    def test_rollback_keeps_cache(self, primary):
+        """Test a rolled back change does not invalidate"""
+        user_cache.clear()
+        with primary() as db:
+            db.add(User(id=1, username="bob", hashed_password="x"))
+            db.commit()
+        user_cache.put(UserRead(id=1, username="bob"), user_cache.generation)
+        with primary() as db:
+            db.get(User, 1).is_active = False
+            db.flush()
+            db.rollback()
+            db.commit()
+        assert user_cache.get(1) is not None
@@ -0,0 +1,73 @@
+from unittest.mock import patch
+
+from cache import ResponseCache, make_etag
+
+
+def _put(cache, key, body=b"[]", generation=None):
+    cache.put(
+        key,
+        body,
+        make_etag(body),
+        {},
+        "application/json",
+        cache.generation if generation is None else generation,
+    )
+
+
+class TestResponseCache:
+    def test_get_returns_stored_entry(self):
+        """Test a stored body is returned with its ETag"""
+        cache = ResponseCache(ttl=30)
+        _put(cache, "/pets/?", b'[{"id":1}]')
+        entry = cache.get("/pets/?")
+        assert entry is not None
+        assert entry.body == b'[{"id":1}]'
+        assert entry.etag == make_etag(b'[{"id":1}]')
+
+    def test_entries_expire_after_ttl(self):
+        """Test entries older than the TTL are dropped"""
+        cache = ResponseCache(ttl=30)
+        with patch("cache.time.monotonic", return_value=100.0):
+            _put(cache, "/pets/?")
+        with patch("cache.time.monotonic", return_value=131.0):
+            assert cache.get("/pets/?") is None
+        assert len(cache) == 0
+
+    def test_lru_eviction_by_entry_count(self):
+        """Test the least recently used entry is evicted first"""
+        cache = ResponseCache(ttl=30, max_entries=2)
+        _put(cache, "a")
+        _put(cache, "b")
+        cache.get("a")
+        _put(cache, "c")
+        assert cache.get("b") is None
+        assert cache.get("a") is not None
+        assert cache.get("c") is not None
+
+    def test_byte_budget(self):
+        """Test entries are evicted to stay within the byte budget"""
+        cache = ResponseCache(ttl=30, max_bytes=10)
+        _put(cache, "a", b"123456")
+        _put(cache, "b", b"123456")
+        assert cache.get("a") is None
+        assert cache.size == 6
+        # Bodies larger than the whole budget are never stored
+        _put(cache, "c", b"12345678901")
+        assert cache.get("c") is None
+
+    def test_invalidate_clears_and_rejects_stale_renders(self):
+        """Test a render started before a write is not stored after it"""
+        cache = ResponseCache(ttl=30)
+        _put(cache, "a")
+        generation = cache.generation
+        cache.invalidate()
+        assert len(cache) == 0
+        _put(cache, "a", generation=generation)
+        assert cache.get("a") is None
+
+    def test_disabled_with_zero_ttl(self):
+        """Test a zero TTL turns the cache off"""
+        cache = ResponseCache(ttl=0)
+        _put(cache, "a")
+        assert cache.enabled is False
+        assert cache.get("a") is None
@@ -0,0 +1,95 @@
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+import crud
+from change_feed import page_changes
+from database import Owner, Pet
+from sample_data import generate
+
+
+class TestPageChanges:
+    def test_merges_oldest_first_across_tables(self):
+        """Test the page takes the lowest versions of both kinds"""
+        # Setup
+        owners = [
+            Owner(id=i, name="o", change_version=v)
+            for i, v in ((1, 1), (2, 4))
+        ]
+        pets = [
+            Pet(id=i, name="p", owner_id=1, change_version=v)
+            for i, v in ((1, 2), (2, 3), (3, 5))
+        ]
+
+        # Execute
+        page_owners, page_pets, cursor, has_more = page_changes(
+            owners, pets, since=0, limit=3
+        )
+
+        # Assert
+        assert [o.change_version for o in page_owners] == [1]
+        assert [p.change_version for p in page_pets] == [2, 3]
+        assert cursor == 3
+        assert has_more is True
+
+    def test_no_changes_keeps_cursor(self):
+        """Test an empty page hands the same cursor back"""
+        assert page_changes([], [], since=7, limit=10) == ([], [], 7, False)
+
+
+class TestChangeVersions:
+    def test_every_insert_path_stamps_increasing_versions(self, sqlite_engine):
+        """Test single, bulk and generated rows get distinct versions"""
+        # Setup
+        with Session(sqlite_engine) as db:
+            owner = crud.create_owner(db, "Alice").value.id
+            crud.create_pet(db, "Rex", owner)
+            crud.create_owners_bulk(db, [{"name": "Bob"}, {"name": "Eve"}])
+            crud.create_pets_bulk(db, [{"name": "Tom", "owner_id": owner}])
+        with sqlite_engine.begin() as conn:
+            generate(conn, owners=3, pets=5, chunk_size=2)
+
+        # Execute
+        with Session(sqlite_engine) as db:
+            versions = list(
+                db.scalars(select(Owner.change_version).order_by(Owner.id))
+            ) + list(db.scalars(select(Pet.change_version).order_by(Pet.id)))
+
+        # Assert
+        assert sorted(versions) == list(range(1, 14))
+        assert versions[:3] == [1, 3, 4]
+
+
+class TestChangesEndpoint:
+    def test_sync_pages_through_new_rows(
+        self, sqlite_app, sqlite_engine, query_budget
+    ):
+        """Test clients only get rows added after their cursor"""
+        # Setup
+        owner = sqlite_app.post("/owners/", json={"name": "Alice"}).json()
+        for name in ("Rex", "Tom"):
+            sqlite_app.post(
+                "/pets/", data={"name": name, "owner_id": owner["id"]}
+            )
+
+        # Execute
+        with query_budget(2):
+            first = sqlite_app.get("/changes?limit=2").json()
+        second = sqlite_app.get(f"/changes?since={first['cursor']}").json()
+        sqlite_app.post("/owners/", json={"name": "Bob"})
+        third = sqlite_app.get(f"/changes?since={second['cursor']}").json()
+        idle = sqlite_app.get(f"/changes?since={third['cursor']}").json()
+
+        # Assert
+        assert [o["name"] for o in first["owners"]] == ["Alice"]
+        assert [p["name"] for p in first["pets"]] == ["Rex"]
+        assert first["has_more"] is True
+        assert [p["name"] for p in second["pets"]] == ["Tom"]
+        assert second["owners"] == [] and second["has_more"] is False
+        assert [o["name"] for o in third["owners"]] == ["Bob"]
+        assert third["pets"] == []
+        assert idle == {
+            "owners": [],
+            "pets": [],
+            "cursor": third["cursor"],
+            "has_more": False,
+        }
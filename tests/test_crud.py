@@ -3,17 +3,28 @@ from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 
 from database import Owner, Pet
 import crud
+from schemas import PetFilters
 from exceptions import (
     EntityNotFoundError,
     IntegrityConstraintError,
     DatabaseError,
+    SearchUnavailableError,
 )
 
 
+def _claim(last_version):
+    # Result of the change counter upsert
+    result = MagicMock()
+    result.scalar_one.return_value = last_version
+    return result
+
+
 class TestCrudOwnerOperations:
     def test_create_owner_success(self, mock_db):
         """Test successful owner creation"""
         # Setup
+        # The change version claim hands out version 1
+        mock_db.execute.return_value.scalar_one.return_value = 1
         mock_db.add.return_value = None
         mock_db.commit.return_value = None
         mock_db.refresh = lambda x: setattr(x, "id", 1)
@@ -32,6 +43,8 @@ class TestCrudOwnerOperations:
     def test_create_owner_integrity_error(self, mock_db):
         """Test owner creation with integrity error"""
         # Setup
+        # The change version claim hands out version 1
+        mock_db.execute.return_value.scalar_one.return_value = 1
         mock_db.add.return_value = None
         mock_db.commit.side_effect = IntegrityError(
             "stmt", "params", Exception("orig")
@@ -51,6 +64,8 @@ class TestCrudOwnerOperations:
     def test_create_owner_database_error(self, mock_db):
         """Test owner creation with database error"""
         # Setup
+        # The change version claim hands out version 1
+        mock_db.execute.return_value.scalar_one.return_value = 1
         mock_db.add.return_value = None
         mock_db.commit.side_effect = SQLAlchemyError("Database error")
         mock_db.rollback.return_value = None
@@ -65,6 +80,46 @@ class TestCrudOwnerOperations:
         mock_db.commit.assert_called_once()
         mock_db.rollback.assert_called_once()
 
+    def test_create_owners_bulk_rejects_taken_emails(self, mock_db):
+        """Test duplicate emails are rejected per row, others inserted"""
+        # Setup - first query finds a taken email, then versions 9 and 10
+        # are claimed for the bulk INSERT
+        taken = MagicMock()
+        taken.scalars().all.return_value = ["taken@example.com"]
+        inserted = MagicMock()
+        inserted.all.return_value = ["row-a", "row-d"]
+        mock_db.execute.side_effect = [taken, _claim(10), inserted]
+        owners = [
+            {"name": "A", "email": "a@example.com"},
+            {"name": "B", "email": "taken@example.com"},
+            {"name": "C", "email": "a@example.com"},
+            {"name": "D", "email": None},
+        ]
+
+        # Execute
+        result = crud.create_owners_bulk(mock_db, owners)
+
+        # Assert
+        assert result.is_ok is True
+        rows = result.value
+        assert [r.is_ok for r in rows] == [True, False, False, True]
+        assert rows[0].value == "row-a"
+        assert rows[3].value == "row-d"
+        assert rows[1].is_exception_type(IntegrityConstraintError)
+        # One executemany for the accepted rows, one commit
+        assert mock_db.execute.call_args[0][1] == [
+            {**owners[0], "change_version": 9},
+            {**owners[3], "change_version": 10},
+        ]
+        mock_db.commit.assert_called_once()
+
+    def test_create_owners_bulk_database_error(self, mock_db):
+        """Test a failing batch rolls back and reports one error"""
+        mock_db.execute.side_effect = SQLAlchemyError("Database error")
+        result = crud.create_owners_bulk(mock_db, [{"name": "A"}])
+        assert result.is_exception_type(DatabaseError)
+        mock_db.rollback.assert_called_once()
+
     def test_get_owners_success(self, mock_db):
         """Test successful retrieval of all owners"""
         # Setup
@@ -83,6 +138,21 @@ class TestCrudOwnerOperations:
         assert result.value[0].name == "User 1"
         assert result.value[1].name == "User 2"
 
+    def test_get_owners_loading_strategy(self, mock_db):
+        """Test pets are selectin-loaded only when requested"""
+        # Setup
+        mock_execution_result = MagicMock()
+        mock_execution_result.scalars().all.return_value = []
+        mock_db.execute.return_value = mock_execution_result
+
+        for include_pets, strategy in ((True, "selectin"), (False, "raise")):
+            # Execute
+            crud.get_owners(mock_db, include_pets=include_pets)
+
+            # Assert
+            (option,) = mock_db.execute.call_args[0][0]._with_options
+            assert option.context[0].strategy == (("lazy", strategy),)
+
     def test_get_owners_error(self, mock_db):
         """Test error during retrieval of all owners"""
         # Setup
@@ -131,6 +201,8 @@ class TestCrudPetOperations:
     def test_create_pet_success(self, mock_db):
         """Test successful pet creation"""
         # Setup
+        # The change version claim hands out version 1
+        mock_db.execute.return_value.scalar_one.return_value = 1
         mock_db.add.return_value = None
         mock_db.commit.return_value = None
         mock_db.refresh = lambda x: setattr(x, "id", 1)
@@ -146,6 +218,37 @@ class TestCrudPetOperations:
         mock_db.add.assert_called_once()
         mock_db.commit.assert_called_once()
 
+    def test_create_pets_bulk_unknown_owner(self, mock_db):
+        """Test pets of missing owners are rejected per row"""
+        # Setup - owner lookup, the change version claim, the bulk INSERT,
+        # then the two summary table upserts
+        known = MagicMock()
+        known.scalars().all.return_value = [1]
+        inserted = MagicMock()
+        inserted.all.return_value = ["row-1"]
+        mock_db.execute.side_effect = [
+            known,
+            _claim(1),
+            inserted,
+            None,
+            None,
+        ]
+
+        # Execute
+        result = crud.create_pets_bulk(
+            mock_db,
+            [
+                {"name": "Fluffy", "owner_id": 1},
+                {"name": "Rex", "owner_id": 9},
+            ],
+        )
+
+        # Assert
+        assert result.is_ok is True
+        assert result.value[0].value == "row-1"
+        assert result.value[1].is_exception_type(EntityNotFoundError)
+        mock_db.commit.assert_called_once()
+
     def test_get_pets_success(self, mock_db):
         """Test successful retrieval of all pets"""
         # Setup
@@ -167,6 +270,105 @@ class TestCrudPetOperations:
         assert result.value[0].name == "Fluffy"
         assert result.value[1].name == "Spot"
 
+    def test_get_pets_keyset_page(self, mock_db):
+        """Test pagination seeks past the cursor instead of using OFFSET"""
+        # Setup
+        mock_execution_result = MagicMock()
+        mock_execution_result.scalars().all.return_value = []
+        mock_db.execute.return_value = mock_execution_result
+
+        # Execute
+        result = crud.get_pets(mock_db, limit=10, after=40)
+
+        # Assert
+        assert result.is_ok is True
+        sql = str(mock_db.execute.call_args[0][0])
+        assert "pets.id > :id_1" in sql
+        assert "ORDER BY pets.id" in sql
+        assert "LIMIT" in sql
+        assert "OFFSET" not in sql
+
+    def test_search_pets_ranked(self, mock_db):
+        """Test pet search matches the FTS table and orders by bm25"""
+        # Setup
+        mock_execution_result = MagicMock()
+        mock_execution_result.scalars().all.return_value = [
+            Pet(id=1, name="Goldie", owner_id=1)
+        ]
+        mock_db.execute.return_value = mock_execution_result
+        mock_db.get_bind.return_value.dialect.name = "sqlite"
+
+        # Execute
+        result = crud.search_pets(mock_db, "gold fish", limit=5, offset=10)
+
+        # Assert
+        assert result.is_ok is True
+        stmt = mock_db.execute.call_args[0][0]
+        sql = str(stmt)
+        assert "JOIN pets_fts ON pets_fts.rowid = pets.id" in sql
+        assert "pets_fts MATCH" in sql
+        assert "ORDER BY bm25(pets_fts" in sql
+        params = stmt.compile().params
+        assert '"gold"* "fish"*' in params.values()
+
+    def test_search_pets_without_words(self, mock_db):
+        """Test a query with no searchable words skips the database"""
+        mock_db.get_bind.return_value.dialect.name = "sqlite"
+        result = crud.search_pets(mock_db, "*()", limit=5)
+        assert result.is_ok is True
+        assert result.value == []
+        mock_db.execute.assert_not_called()
+
+    def test_search_unavailable_without_fts(self, mock_db):
+        """Test search on PostgreSQL reports it is unsupported"""
+        mock_db.get_bind.return_value.dialect.name = "postgresql"
+        result = crud.search_owners(mock_db, "alice", limit=5)
+        assert result.is_exception_type(SearchUnavailableError)
+        assert result.as_http_error().status_code == 501
+        mock_db.execute.assert_not_called()
+
+    def test_get_pets_filters(self, mock_db):
+        """Test filters compile to WHERE clauses on the indexed columns"""
+        # Setup
+        mock_db.execute.return_value.scalars().all.return_value = []
+        filters = PetFilters(
+            species="Cat", owner_id=2, min_age=1, max_age=4, min_weight=2.5
+        )
+
+        # Execute
+        result = crud.get_pets(mock_db, limit=10, after=5, filters=filters)
+
+        # Assert
+        assert result.is_ok is True
+        sql = str(mock_db.execute.call_args[0][0])
+        assert "pets.species = :species_1" in sql
+        assert "pets.owner_id = :owner_id_1" in sql
+        assert "pets.age >= :age_1" in sql
+        assert "pets.age <= :age_2" in sql
+        assert "pets.weight >= :weight_1" in sql
+        assert "is_vaccinated" not in sql.split("WHERE")[1]
+
+    def test_stream_pets_uses_server_side_cursor(self, mock_db):
+        """Test streaming fetches rows in yield_per batches"""
+        # Setup
+        mock_pets = [Pet(id=1, name="Fluffy", owner_id=1)]
+        mock_db.execute.return_value.scalars.return_value = mock_pets
+
+        # Execute
+        result = crud.stream_pets(mock_db, batch_size=100)
+
+        # Assert
+        assert result.is_ok is True
+        assert list(result.value) == mock_pets
+        stmt = mock_db.execute.call_args[0][0]
+        assert stmt.get_execution_options()["yield_per"] == 100
+
+    def test_stream_pets_error(self, mock_db):
+        """Test a failing cursor is returned as an error result"""
+        mock_db.execute.side_effect = SQLAlchemyError("Database error")
+        result = crud.stream_pets(mock_db)
+        assert result.is_exception_type(DatabaseError)
+
 
 class TestSampleData:
     def test_create_sample_data_empty_db(self, mock_db):
@@ -0,0 +1,258 @@
+import os
+import pytest
+import subprocess
+import sys
+import time
+from dataclasses import replace
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session, sessionmaker
+
+from database import (
+    ENGINE_PROFILES,
+    Base,
+    Owner,
+    PrimarySession,
+    SessionRouter,
+    async_database_url,
+    create_profile_engine,
+    load_engine_profile,
+    track_writes,
+)
+from main import app, get_db
+
+
+class TestEngineProfiles:
+    def test_default_profile_is_dev(self):
+        """Test the dev profile is used when nothing is configured"""
+        profile = load_engine_profile({})
+        assert profile == ENGINE_PROFILES["dev"]
+        assert profile.echo is True
+
+    def test_env_overrides(self):
+        """Test environment variables override the selected profile"""
+        profile = load_engine_profile(
+            {
+                "PETSHOP_DB_PROFILE": "prod",
+                "PETSHOP_DATABASE_URL": "sqlite:////tmp/other.db",
+                "PETSHOP_DB_ECHO": "true",
+                "PETSHOP_DB_POOL_SIZE": "3",
+                "PETSHOP_SQLITE_PRAGMAS": "synchronous=FULL,cache_size=-2000",
+            }
+        )
+        assert profile.url == "sqlite:////tmp/other.db"
+        assert profile.echo is True
+        assert profile.pool_size == 3
+        assert profile.max_overflow == ENGINE_PROFILES["prod"].max_overflow
+        assert profile.sqlite_pragmas["synchronous"] == "FULL"
+        assert profile.sqlite_pragmas["cache_size"] == "-2000"
+        assert profile.sqlite_pragmas["journal_mode"] == "WAL"
+
+    def test_unknown_profile(self):
+        """Test an unknown profile name is rejected"""
+        with pytest.raises(ValueError):
+            load_engine_profile({"PETSHOP_DB_PROFILE": "staging"})
+
+    def test_pragmas_applied_on_connect(self, tmp_path):
+        """Test every new SQLite connection gets the profile's pragmas"""
+        # Setup
+        profile = replace(
+            ENGINE_PROFILES["prod"],
+            url=f"sqlite:///{tmp_path / 'prod.db'}",
+            echo=False,
+        )
+
+        # Execute
+        db_engine = create_profile_engine(profile)
+        with db_engine.connect() as conn:
+            journal_mode = conn.execute(text("PRAGMA journal_mode")).scalar()
+            foreign_keys = conn.execute(text("PRAGMA foreign_keys")).scalar()
+            busy_timeout = conn.execute(text("PRAGMA busy_timeout")).scalar()
+        db_engine.dispose()
+
+        # Assert
+        assert journal_mode == "wal"
+        assert foreign_keys == 1
+        assert busy_timeout == 5000
+        assert db_engine.pool.size() == profile.pool_size
+
+    def test_invalid_pragma_rejected(self, tmp_path):
+        """Test pragma values cannot smuggle in extra SQL"""
+        profile = replace(
+            ENGINE_PROFILES["test"],
+            url=f"sqlite:///{tmp_path / 'bad.db'}",
+            sqlite_pragmas={"cache_size": "1; DROP TABLE pets"},
+        )
+        with pytest.raises(ValueError):
+            create_profile_engine(profile)
+
+    def test_async_database_url(self):
+        """Test sync URLs map to their asyncio drivers"""
+        assert (
+            async_database_url("sqlite:///./petshop.db")
+            == "sqlite+aiosqlite:///./petshop.db"
+        )
+        assert (
+            async_database_url("postgresql://u:p@db/petshop")
+            == "postgresql+psycopg://u:p@db/petshop"
+        )
+
+
+@pytest.fixture
+def primary_and_replica(tmp_path):
+    """Two SQLite files standing in for a primary and a lagging replica"""
+    factories = []
+    for name in ("primary", "replica"):
+        db_engine = create_engine(f"sqlite:///{tmp_path / name}.db")
+        Base.metadata.create_all(db_engine)
+        factories.append(
+            sessionmaker(
+                bind=db_engine,
+                class_=PrimarySession if name == "primary" else Session,
+            )
+        )
+    yield factories
+    for factory in factories:
+        factory.kw["bind"].dispose()
+
+
+class TestSessionRouter:
+    def test_no_replicas_reads_primary(self, primary_and_replica):
+        """Test reads fall back to the primary without replicas"""
+        primary, _ = primary_and_replica
+        router = SessionRouter(primary)
+        assert router.reader() is primary
+
+    def test_reads_rotate_across_replicas(self, primary_and_replica):
+        """Test reads go to the replicas in turn"""
+        primary, replica = primary_and_replica
+        other = sessionmaker()
+        router = SessionRouter(primary, [replica, other])
+        assert [router.reader() for _ in range(3)] == [replica, other, replica]
+
+    def test_recent_writer_sticks_to_primary(self, primary_and_replica):
+        """Test a client that just wrote reads its write from the primary"""
+        primary, replica = primary_and_replica
+        router = SessionRouter(primary, [replica], sticky_seconds=5)
+        assert router.reader(time.time()) is primary
+        assert router.reader(time.time() - 60) is replica
+
+    def test_primary_commits_are_tracked(self, primary_and_replica):
+        """Test only commits on the primary mark the request as a writer"""
+        primary, replica = primary_and_replica
+        tracker = track_writes()
+        with replica() as db:
+            db.commit()
+        assert tracker.wrote is False
+        with primary() as db:
+            db.add(Owner(name="Alice"))
+            db.commit()
+        assert tracker.wrote is True
+
+
+class TestReadYourWrites:
+    def test_writer_reads_primary_others_read_replica(
+        self, primary_and_replica
+    ):
+        """Test stickiness end to end with two SQLite files"""
+        # Setup
+        primary, replica = primary_and_replica
+
+        def primary_db():
+            with primary() as db:
+                yield db
+
+        app.dependency_overrides[get_db] = primary_db
+        router = SessionRouter(primary, [replica], sticky_seconds=30)
+        try:
+            with patch("database.router", router):
+                writer = TestClient(app)
+                reader = TestClient(app)
+
+                # Execute
+                created = writer.post("/owners/", json={"name": "Alice"})
+                writer_view = writer.get("/owners/").json()
+                reader_view = reader.get("/owners/").json()
+        finally:
+            app.dependency_overrides.clear()
+
+        # Assert
+        assert created.status_code == 201
+        assert "max-age=30" in created.headers["set-cookie"].lower()
+        assert [o["name"] for o in writer_view] == ["Alice"]
+        assert "set-cookie" not in writer.get("/owners/").headers
+        assert reader_view == []
+
+    def test_replica_reads_not_cached_right_after_a_write(
+        self, primary_and_replica
+    ):
+        """Test a lagging replica's view doesn't outlive its catching up"""
+        # Setup
+        primary, replica = primary_and_replica
+
+        def primary_db():
+            with primary() as db:
+                yield db
+
+        app.dependency_overrides[get_db] = primary_db
+        router = SessionRouter(primary, [replica], sticky_seconds=30)
+        try:
+            with patch("database.router", router):
+                writer = TestClient(app)
+                reader = TestClient(app)
+                writer.post("/owners/", json={"name": "Alice"})
+
+                # Execute
+                before = reader.get("/owners/").json()
+                with replica() as db:
+                    db.add(Owner(name="Alice"))
+                    db.commit()
+                after = reader.get("/owners/").json()
+        finally:
+            app.dependency_overrides.clear()
+
+        # Assert
+        assert before == []
+        assert [o["name"] for o in after] == ["Alice"]
+
+    def test_no_cookie_without_replicas(self, sqlite_app):
+        """Test writes leave responses cookie-free when reads use the primary"""
+        # Execute
+        created = sqlite_app.post("/owners/", json={"name": "Alice"})
+        listed = sqlite_app.get("/owners/")
+
+        # Assert
+        assert created.status_code == 201
+        assert "set-cookie" not in created.headers
+        assert "set-cookie" not in listed.headers
+
+
+class TestFreshDatabase:
+    def test_writes_work_on_empty_database(self, tmp_path):
+        """Test a new database gets every table the write paths need"""
+        # Setup: a new process, since the schema is created on import
+        script = (
+            "from fastapi.testclient import TestClient\n"
+            "import main\n"
+            "with TestClient(main.app) as client:\n"
+            "    owner = client.post('/owners/', json={'name': 'Alice'})\n"
+            "    print(owner.status_code, client.get('/stats').status_code)\n"
+        )
+        env = {
+            **os.environ,
+            "PETSHOP_DATABASE_URL": f"sqlite:///{tmp_path / 'fresh.db'}",
+        }
+
+        # Execute
+        result = subprocess.run(
+            [sys.executable, "-c", script],
+            env=env,
+            cwd=os.path.dirname(os.path.dirname(__file__)),
+            capture_output=True,
+            text=True,
+            timeout=60,
+        )
+
+        # Assert
+        assert result.stdout.split() == ["201", "200"], result.stderr
@@ -0,0 +1,215 @@
+import pytest
+from fastapi import status
+from starlette.applications import Starlette
+from starlette.routing import Mount
+from starlette.testclient import TestClient
+from unittest.mock import patch
+
+from image_files import (
+    IMMUTABLE_CACHE_CONTROL,
+    PhotoStaticFiles,
+    SendfileResponse,
+)
+from main import app
+from photo_store import PhotoStore
+from photo_variants import VariantPipeline, variant_name
+
+DIGEST = "ab" * 32
+NAME = f"ab/cd/{DIGEST}.jpg"
+BODY = bytes(range(256)) * 4
+
+
+@pytest.fixture
+def photo_root(tmp_path):
+    """A stored photo plus a legacy, non content-addressed upload"""
+    (tmp_path / "ab" / "cd").mkdir(parents=True)
+    (tmp_path / NAME).write_bytes(BODY)
+    (tmp_path / "IMG_0001.jpg").write_bytes(b"legacy")
+    return tmp_path
+
+
+@pytest.fixture
+def images_client(photo_root):
+    """Client for a PhotoStaticFiles mount over photo_root"""
+    app = Starlette(
+        routes=[Mount("/images", PhotoStaticFiles(directory=photo_root))]
+    )
+    return TestClient(app)
+
+
+class TestPhotoStaticFiles:
+    def test_content_addressed_photo_is_immutable(self, images_client):
+        """Test hashed names get a year-long immutable policy and ETag"""
+        response = images_client.get(f"/images/{NAME}")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.content == BODY
+        assert response.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+        assert response.headers["etag"] == f'"{DIGEST}.jpg"'
+
+    def test_if_none_match_returns_304(self, images_client):
+        """Test a client holding the ETag gets a bodiless 304"""
+        response = images_client.get(
+            f"/images/{NAME}", headers={"If-None-Match": f'"{DIGEST}.jpg"'}
+        )
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response.content == b""
+
+    def test_byte_range(self, images_client):
+        """Test a Range request gets 206 with just those bytes"""
+        response = images_client.get(
+            f"/images/{NAME}", headers={"Range": "bytes=10-19"}
+        )
+        assert response.status_code == status.HTTP_206_PARTIAL_CONTENT
+        assert response.content == BODY[10:20]
+        assert response.headers["content-range"] == f"bytes 10-19/{len(BODY)}"
+
+    def test_legacy_name_is_revalidated(self, images_client):
+        """Test mutable upload names must be revalidated"""
+        response = images_client.get("/images/IMG_0001.jpg")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["cache-control"] == "no-cache"
+
+
+class TestPhotoEndpointCaching:
+    def test_best_variant_is_immutable(self, test_app, photo_root):
+        """Test the negotiated route is immutable once the best variant exists"""
+        # Setup
+        for fmt in ("webp", "jpeg"):
+            (photo_root / variant_name(NAME, 160, fmt)).write_bytes(b"v")
+        with patch("main.photo_store", PhotoStore(photo_root)), patch(
+            "main.variant_pipeline", VariantPipeline(photo_root)
+        ):
+            # Execute
+            webp = test_app.get(
+                f"/photos/{NAME}?w=100", headers={"Accept": "image/webp"}
+            )
+            # AVIF is preferred but not generated yet
+            avif = test_app.get(
+                f"/photos/{NAME}?w=100",
+                headers={"Accept": "image/avif,image/webp"},
+            )
+            cached = test_app.get(
+                f"/photos/{NAME}?w=100",
+                headers={
+                    "Accept": "image/webp",
+                    "If-None-Match": webp.headers["etag"],
+                },
+            )
+
+        # Assert
+        assert webp.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+        assert webp.headers["etag"] == f'"{DIGEST}_160.webp"'
+        assert avif.headers["content-type"] == "image/webp"
+        assert avif.headers["cache-control"] == "no-cache"
+        assert cached.status_code == status.HTTP_304_NOT_MODIFIED
+        assert cached.headers["vary"] == "Accept"
+
+
+class TestSendfileResponse:
+    async def _send(self, path, extensions, headers=()):
+        messages = []
+
+        async def send(message):
+            if message["type"] == "http.response.zerocopysend":
+                file = message["file"]
+                file.seek(message.get("offset", 0))
+                message = {**message, "data": file.read(message.get("count"))}
+            messages.append(message)
+
+        scope = {
+            "type": "http",
+            "method": "GET",
+            "headers": list(headers),
+            "extensions": extensions,
+        }
+        await SendfileResponse(path)(scope, None, send)
+        return messages
+
+    async def test_pathsend(self, photo_root):
+        """Test the server sends the file itself when it supports pathsend"""
+        messages = await self._send(
+            photo_root / NAME, {"http.response.pathsend": {}}
+        )
+        assert messages[1] == {
+            "type": "http.response.pathsend",
+            "path": str(photo_root / NAME),
+        }
+
+    async def test_zerocopysend(self, photo_root):
+        """Test the server gets an open file when it supports zerocopysend"""
+        messages = await self._send(
+            photo_root / NAME, {"http.response.zerocopysend": {}}
+        )
+        assert messages[0]["status"] == 200
+        assert messages[1]["data"] == BODY
+
+    async def test_range_is_read_by_starlette(self, photo_root):
+        """Test byte ranges fall back to FileResponse's chunked reads"""
+        messages = await self._send(
+            photo_root / NAME,
+            {"http.response.zerocopysend": {}},
+            [(b"range", b"bytes=4-7")],
+        )
+        assert messages[0]["status"] == 206
+        assert messages[1]["body"] == BODY[4:8]
+
+
+def zero_copy_server(app, extension):
+    """
+    The app behind a server advertising extension, turning the zero-copy
+    messages back into a body for TestClient
+    """
+
+    async def server(scope, receive, send):
+        scope["extensions"] = {**scope.get("extensions", {}), extension: {}}
+
+        async def send_file(message):
+            if message["type"] == "http.response.pathsend":
+                with open(message["path"], "rb") as file:
+                    message = {
+                        "type": "http.response.body",
+                        "body": file.read(),
+                    }
+            elif message["type"] == "http.response.zerocopysend":
+                message = {
+                    "type": "http.response.body",
+                    "body": message["file"].read(),
+                }
+            await send(message)
+
+        await app(scope, receive, send_file)
+
+    return server
+
+
+@pytest.mark.parametrize(
+    "extension", ["http.response.pathsend", "http.response.zerocopysend"]
+)
+class TestZeroCopyThroughApp:
+    def test_photo_route(self, test_app, photo_root, extension):
+        """Test /photos sends zero-copy through every middleware"""
+        # Setup
+        client = TestClient(zero_copy_server(app, extension))
+        with patch("main.photo_store", PhotoStore(photo_root)), patch(
+            "main.variant_pipeline", VariantPipeline(photo_root)
+        ):
+            # Execute
+            response = client.get(f"/photos/{NAME}")
+
+        # Assert
+        assert response.status_code == status.HTTP_200_OK
+        assert response.content == BODY
+
+    def test_images_mount(self, test_app, photo_root, extension):
+        """Test /images sends zero-copy through every middleware"""
+        # Setup
+        client = TestClient(zero_copy_server(app, extension))
+        images = next(route for route in app.routes if route.path == "/images")
+        with patch.object(images.app, "all_directories", [photo_root]):
+            # Execute
+            response = client.get(f"/images/{NAME}")
+
+        # Assert
+        assert response.status_code == status.HTTP_200_OK
+        assert response.content == BODY
+        assert response.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
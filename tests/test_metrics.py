@@ -0,0 +1,146 @@
+from unittest.mock import patch
+
+import pytest
+
+from exceptions import DatabaseError
+from metrics import (
+    UNMATCHED_ROUTE,
+    Counter,
+    Histogram,
+    MetricsRegistry,
+    crud_duration,
+    crud_errors,
+    http_requests,
+    timed,
+)
+from result import Result
+
+
+class TestMetricTypes:
+    def test_histogram_renders_cumulative_buckets(self):
+        """Test buckets are cumulative and end with +Inf, sum and count"""
+        # Setup
+        histogram = Histogram("h", "help", ("route",), buckets=(0.1, 1.0))
+
+        # Execute
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(value, "/pets/")
+
+        # Assert
+        assert histogram.render() == [
+            'h_bucket{route="/pets/",le="0.1"} 2',
+            'h_bucket{route="/pets/",le="1.0"} 3',
+            'h_bucket{route="/pets/",le="+Inf"} 4',
+            'h_sum{route="/pets/"} 3.65',
+            'h_count{route="/pets/"} 4',
+        ]
+
+    def test_label_values_are_escaped(self):
+        """Test quotes, backslashes and newlines can't break the format"""
+        counter = Counter("c", "help", ("route",))
+        counter.inc('a"b\\c\nd')
+        assert counter.render() == ['c{route="a\\"b\\\\c\\nd"} 1']
+
+    def test_registry_skips_empty_families(self):
+        """Test metrics without samples are left out of the exposition"""
+        # Setup
+        registry = MetricsRegistry()
+        registry.counter("unused_total", "never incremented")
+        registry.counter("used_total", "incremented").inc()
+
+        # Execute
+        text = registry.render()
+
+        # Assert
+        assert "unused_total" not in text
+        assert "# TYPE used_total counter\nused_total 1\n" in text
+
+
+class TestTimed:
+    def test_records_duration_and_error_results(self):
+        """Test calls are timed and error Results counted"""
+
+        # Setup
+        @timed
+        def lookup(ok: bool):
+            if ok:
+                return Result.ok(1)
+            return Result.err(DatabaseError("boom"))
+
+        label = f"{__name__}.lookup"
+        calls = crud_duration.count(label)
+        errors = crud_errors.value(label)
+
+        # Execute
+        lookup(True)
+        lookup(False)
+
+        # Assert
+        assert crud_duration.count(label) == calls + 2
+        assert crud_errors.value(label) == errors + 1
+
+    async def test_async_exceptions_counted(self):
+        """Test a coroutine that raises is timed, counted and re-raised"""
+
+        # Setup
+        @timed
+        async def explode():
+            raise RuntimeError("boom")
+
+        label = f"{__name__}.explode"
+        errors = crud_errors.value(label)
+
+        # Execute
+        with pytest.raises(RuntimeError):
+            await explode()
+
+        # Assert
+        assert crud_errors.value(label) == errors + 1
+        assert crud_duration.count(label) >= 1
+
+
+class TestMetricsEndpoint:
+    def test_requests_labelled_by_route_template(self, test_app):
+        """Test concrete paths are recorded under their route template"""
+        # Setup
+        key = ("GET", "/owners/{owner_id}/pets", "200")
+        before = http_requests.value(*key)
+
+        # Execute
+        with patch("crud.get_owner", return_value=Result.ok(None)), patch(
+            "crud.get_pets", return_value=Result.ok([])
+        ):
+            test_app.get("/owners/7/pets")
+            test_app.get("/owners/8/pets")
+
+        # Assert
+        assert http_requests.value(*key) == before + 2
+
+    def test_unknown_paths_share_one_label(self, test_app):
+        """Test unmatched paths don't create a series each"""
+        # Setup
+        key = ("GET", UNMATCHED_ROUTE, "404")
+        before = http_requests.value(*key)
+
+        # Execute
+        test_app.get("/no-such-path/1")
+        test_app.get("/no-such-path/2")
+
+        # Assert
+        assert http_requests.value(*key) == before + 2
+
+    def test_exposition(self, test_app):
+        """Test /metrics serves the Prometheus text format"""
+        # Setup
+        test_app.get("/no-such-path")
+
+        # Execute
+        response = test_app.get("/metrics")
+
+        # Assert
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith(
+            "text/plain; version=0.0.4"
+        )
+        assert "# TYPE petshop_http_requests_total counter" in response.text
+        assert "petshop_db_pool_size" in response.text
@@ -0,0 +1,80 @@
+import os
+import pytest
+import shutil
+from dataclasses import replace
+from unittest.mock import patch
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, inspect
+
+from database import ENGINE_PROFILES, create_profile_engine, missing_columns
+
+REPO = os.path.dirname(os.path.dirname(__file__))
+
+
+def upgrade(url: str, revision: str = "head") -> None:
+    config = Config()
+    config.set_main_option("script_location", os.path.join(REPO, "alembic"))
+    # env.py takes the URL from database, not alembic.ini
+    with patch("database.DATABASE_URL", url):
+        command.upgrade(config, revision)
+
+
+@pytest.fixture
+def baseline_db(tmp_path):
+    """URL of a copy of the checked-in database, built by create_all
+    before any of the migrations"""
+    shutil.copy(os.path.join(REPO, "petshop.db"), tmp_path / "app.db")
+    return f"sqlite:///{tmp_path / 'app.db'}"
+
+
+@pytest.fixture
+def sqlite_engine(baseline_db):
+    """The baseline database upgraded to head, for sqlite_app"""
+    upgrade(baseline_db)
+    db_engine = create_profile_engine(
+        replace(ENGINE_PROFILES["test"], url=baseline_db)
+    )
+    yield db_engine
+    db_engine.dispose()
+
+
+class TestUpgrade:
+    def test_create_all_database_upgrades_to_head(self, baseline_db):
+        """Test columns create_all already made are not added again"""
+        # Execute
+        upgrade(baseline_db)
+
+        # Assert
+        db_engine = create_engine(baseline_db)
+        columns = {c["name"] for c in inspect(db_engine).get_columns("pets")}
+        db_engine.dispose()
+        assert {"age", "breed", "is_vaccinated", "date_added"} <= columns
+
+    def test_baseline_schema_is_reported_missing(self, baseline_db):
+        """Test startup can tell an unmigrated database apart"""
+        db_engine = create_engine(baseline_db)
+        missing = missing_columns(db_engine)
+        db_engine.dispose()
+        assert {"owners.change_version", "pets.change_version"} <= set(missing)
+
+    def test_upgraded_baseline_serves_reads_and_writes(self, sqlite_app):
+        """Test the API works on a baseline database after upgrade head"""
+        # Setup
+        owner = sqlite_app.post("/owners/", json={"name": "Alice"})
+
+        # Execute
+        created = sqlite_app.post(
+            "/pets/", data={"name": "Rex", "owner_id": owner.json()["id"]}
+        )
+        pets = sqlite_app.get("/pets/")
+        changes = sqlite_app.get("/changes?limit=1000")
+
+        # Assert
+        assert owner.status_code == 201
+        assert created.status_code == 201
+        assert pets.status_code == 200
+        assert "Rex" in [p["name"] for p in pets.json()]
+        assert changes.status_code == 200
+        assert [p["name"] for p in changes.json()["pets"]][-1] == "Rex"
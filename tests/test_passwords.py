@@ -0,0 +1,59 @@
+import asyncio
+import threading
+
+from exceptions import PasswordHasherBusyError
+from passwords import PasswordHasher, make_context
+
+
+class TestPasswordHasher:
+    async def test_hash_and_verify(self):
+        """Test hashes use the configured cost and verify"""
+        # Setup
+        hasher = PasswordHasher(make_context(4), workers=1, queue_limit=1)
+
+        # Execute
+        hashed = await hasher.hash("secret")
+        checked = await hasher.verify_and_update("secret", hashed.value)
+        wrong = await hasher.verify_and_update("nope", hashed.value)
+
+        # Assert
+        assert hashed.value.startswith("$2b$04$")
+        assert checked.value == (True, None)
+        assert wrong.value == (False, None)
+        hasher.shutdown()
+
+    async def test_outdated_cost_is_rehashed(self):
+        """Test a hash with a lower cost gets a replacement on success"""
+        old_hash = make_context(4).hash("secret")
+        hasher = PasswordHasher(make_context(5), workers=1, queue_limit=0)
+        result = await hasher.verify_and_update("secret", old_hash)
+        valid, new_hash = result.value
+        assert valid is True
+        assert new_hash.startswith("$2b$05$")
+        hasher.shutdown()
+
+    async def test_full_queue_is_refused(self):
+        """Test work beyond workers + queue_limit is rejected, not queued"""
+        # Setup - a context whose hashes block until released
+        release = threading.Event()
+
+        class SlowContext:
+            def hash(self, password):
+                release.wait(5)
+                return password
+
+        hasher = PasswordHasher(SlowContext(), workers=1, queue_limit=1)
+        running = [asyncio.create_task(hasher.hash("a")) for _ in range(2)]
+        await asyncio.sleep(0.05)
+
+        # Execute
+        refused = await hasher.hash("b")
+        release.set()
+        accepted = await asyncio.gather(*running)
+
+        # Assert
+        assert refused.is_exception_type(PasswordHasherBusyError)
+        assert refused.exception.retry_after >= 1
+        assert all(r.is_ok for r in accepted)
+        assert hasher.pending == 0
+        hasher.shutdown()
@@ -0,0 +1,180 @@
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+import crud
+from database import Owner, OwnerStats, SpeciesStats
+from pet_stats import AGGREGATES, recompute_pet_stats, summarize
+from sample_data import generate
+
+
+def _values(row):
+    # Sums added in a different order may differ in the last float bits
+    return tuple(round(getattr(row, name), 6) for name in AGGREGATES)
+
+
+def _snapshot(db_engine):
+    with Session(db_engine) as db:
+        species = {
+            row.species: _values(row)
+            for row in db.scalars(select(SpeciesStats))
+        }
+        owners = {
+            row.owner_id: _values(row)
+            for row in db.scalars(select(OwnerStats))
+        }
+    return species, owners
+
+
+class TestSummaryTables:
+    def test_inserts_match_full_recompute(self, sqlite_engine):
+        """Test single, bulk and generated inserts keep exact totals"""
+        # Setup
+        with Session(sqlite_engine) as db:
+            owner_id = crud.create_owner(db, "Alice").value.id
+            crud.create_pet(db, "Tom", owner_id, species="Cat", age=3)
+            crud.create_pet(
+                db, "Rex", owner_id, "Dog", weight=20.5, is_vaccinated=True
+            )
+            crud.create_pet(db, "Nameless", owner_id)
+            crud.create_pets_bulk(
+                db,
+                [
+                    {"name": "Kit", "owner_id": owner_id, "species": "Cat"},
+                    {"name": "Lost", "owner_id": 999, "species": "Cat"},
+                ],
+            )
+        with sqlite_engine.begin() as conn:
+            generate(conn, owners=5, pets=40, chunk_size=7)
+
+        # Execute
+        incremental = _snapshot(sqlite_engine)
+        with sqlite_engine.begin() as conn:
+            recompute_pet_stats(conn)
+
+        # Assert
+        assert incremental == _snapshot(sqlite_engine)
+        assert sum(v[0] for v in incremental[0].values()) == 44
+
+    def test_failed_insert_leaves_stats_alone(self, sqlite_engine):
+        """Test the stats roll back with a pet that doesn't commit"""
+        with Session(sqlite_engine) as db:
+            result = crud.create_pet(db, "Orphan", 999, species="Cat")
+        assert result.is_err
+        assert _snapshot(sqlite_engine) == ({}, {})
+
+
+class TestSummarize:
+    def test_empty_group_has_no_rates(self):
+        """Test zero pets gives None instead of dividing by zero"""
+        assert summarize([]) == {
+            "pet_count": 0,
+            "vaccination_rate": None,
+            "average_age": None,
+            "average_weight": None,
+        }
+
+    def test_averages_skip_missing_values(self):
+        """Test rows are summed and averages only count known values"""
+        # Setup
+        rows = [
+            SpeciesStats(
+                species="Cat",
+                pet_count=3,
+                vaccinated_count=1,
+                age_sum=9,
+                age_count=2,
+                weight_sum=8.0,
+                weight_count=2,
+            ),
+            SpeciesStats(
+                species="Dog",
+                pet_count=1,
+                vaccinated_count=1,
+                age_sum=0,
+                age_count=0,
+                weight_sum=22.0,
+                weight_count=1,
+            ),
+        ]
+
+        # Execute
+        summary = summarize(rows)
+
+        # Assert
+        assert summary == {
+            "pet_count": 4,
+            "vaccination_rate": 0.5,
+            "average_age": 4.5,
+            "average_weight": 10.0,
+        }
+
+
+class TestStatsEndpoints:
+    def test_stats_follow_new_pets(self, sqlite_app, sqlite_engine):
+        """Test a created pet shows up in /stats at once"""
+        # Setup
+        with Session(sqlite_engine) as db:
+            db.add(Owner(id=1, name="Alice"))
+            db.commit()
+        assert sqlite_app.get("/stats").json()["total"]["pet_count"] == 0
+
+        # Execute
+        for name, species, age in (("Tom", "Cat", 2), ("Kit", "Cat", 4)):
+            sqlite_app.post(
+                "/pets/",
+                data={
+                    "name": name,
+                    "owner_id": 1,
+                    "species": species,
+                    "age": age,
+                },
+            )
+        sqlite_app.post("/pets/", data={"name": "Blob", "owner_id": 1})
+        response = sqlite_app.get("/stats")
+
+        # Assert
+        assert response.status_code == 200
+        body = response.json()
+        assert body["total"]["pet_count"] == 3
+        assert body["species"] == [
+            {
+                "species": None,
+                "pet_count": 1,
+                "vaccination_rate": 0.0,
+                "average_age": None,
+                "average_weight": None,
+            },
+            {
+                "species": "Cat",
+                "pet_count": 2,
+                "vaccination_rate": 0.0,
+                "average_age": 3.0,
+                "average_weight": None,
+            },
+        ]
+
+    def test_stats_is_one_query(self, sqlite_app, sqlite_engine, query_budget):
+        """Test /stats reads the summary table, not the pets"""
+        with sqlite_engine.begin() as conn:
+            generate(conn, owners=10, pets=200)
+        with query_budget(1):
+            body = sqlite_app.get("/stats").json()
+        assert body["total"]["pet_count"] == 200
+
+    def test_owner_stats(self, sqlite_app, sqlite_engine):
+        """Test per-owner stats, zeros for no pets and 404 for no owner"""
+        # Setup
+        with Session(sqlite_engine) as db:
+            alice = crud.create_owner(db, "Alice").value.id
+            bob = crud.create_owner(db, "Bob").value.id
+            crud.create_pet(db, "Rex", alice, weight=20.0)
+
+        # Execute
+        alice_stats = sqlite_app.get(f"/owners/{alice}/stats")
+        bob_stats = sqlite_app.get(f"/owners/{bob}/stats")
+        missing = sqlite_app.get("/owners/999/stats")
+
+        # Assert
+        assert alice_stats.json()["average_weight"] == 20.0
+        assert bob_stats.json()["pet_count"] == 0
+        assert missing.status_code == 404
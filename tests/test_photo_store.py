@@ -0,0 +1,82 @@
+import io
+import os
+
+from starlette.datastructures import UploadFile
+
+from exceptions import PhotoTooLargeError
+from photo_store import PhotoStore, photo_extension
+
+JPEG = b"\xff\xd8\xff\xe0" + b"\x00" * 32
+
+
+def _upload(data: bytes, filename: str = "IMG_0001.jpg") -> UploadFile:
+    return UploadFile(io.BytesIO(data), filename=filename)
+
+
+class TestPhotoStore:
+    async def test_save_streams_to_content_path(self, tmp_path):
+        """Test an upload is written in chunks under its sha256"""
+        # Setup
+        store = PhotoStore(tmp_path / "images", chunk_size=8)
+
+        # Execute
+        result = await store.save(_upload(JPEG))
+
+        # Assert
+        assert result.is_ok is True
+        name = result.value
+        digest = os.path.basename(name).removesuffix(".jpg")
+        assert name == f"{digest[:2]}/{digest[2:4]}/{digest}.jpg"
+        assert (tmp_path / "images" / name).read_bytes() == JPEG
+        # Partial uploads are kept outside the served directory
+        assert os.listdir(tmp_path / "images") == [digest[:2]]
+        assert os.listdir(tmp_path / "images.incoming") == []
+
+    async def test_identical_uploads_are_stored_once(self, tmp_path):
+        """Test the same bytes under different names share one file"""
+        store = PhotoStore(tmp_path / "images")
+        first = await store.save(_upload(JPEG, "a.jpg"))
+        second = await store.save(_upload(JPEG, "b.jpeg"))
+        other = await store.save(_upload(JPEG + b"x", "a.jpg"))
+        assert first.value == second.value
+        assert other.value != first.value
+        assert len(list((tmp_path / "images").glob("*/*/*"))) == 2
+
+    async def test_too_large_is_rejected_midstream(self, tmp_path):
+        """Test the size limit holds even when the size is not declared"""
+        # Setup
+        store = PhotoStore(
+            tmp_path / "images",
+            max_bytes=16,
+            chunk_size=8,
+            incoming_dir=tmp_path / "incoming",
+        )
+
+        # Execute
+        result = await store.save(_upload(JPEG))
+
+        # Assert
+        assert result.is_exception_type(PhotoTooLargeError)
+        assert not (tmp_path / "images").exists()
+        assert os.listdir(tmp_path / "incoming") == []
+
+
+class TestPhotoExtension:
+    def test_extension_from_content(self):
+        """Test the extension is sniffed from the leading bytes"""
+        assert photo_extension(JPEG) == ".jpg"
+        assert photo_extension(b"\x89PNG\r\n\x1a\n") == ".png"
+        assert photo_extension(b"RIFF\x00\x00\x00\x00WEBPVP8 ") == ".webp"
+
+    async def test_unknown_content_gets_no_extension(self, tmp_path):
+        """Test non-image uploads can't pick an active type like .html"""
+        # Setup
+        store = PhotoStore(tmp_path / "images")
+
+        # Execute
+        html = await store.save(_upload(b"<script>x</script>", "a.html"))
+        svg = await store.save(_upload(b"<svg onload=x>", "a.svg"))
+
+        # Assert
+        assert os.path.splitext(html.value)[1] == ""
+        assert os.path.splitext(svg.value)[1] == ""
@@ -0,0 +1,100 @@
+import io
+
+import pytest
+from fastapi import status
+from PIL import Image
+from unittest.mock import patch
+
+from photo_store import PhotoStore
+from photo_variants import (
+    VariantPipeline,
+    accepted_formats,
+    pick_width,
+    render_variants,
+    variant_name,
+)
+
+NAME = "ab/cd/" + "ab" * 32 + ".png"
+
+
+@pytest.fixture
+def stored_photo(tmp_path):
+    """A 1000x500 RGBA PNG stored under a content-addressed name"""
+    path = tmp_path / NAME
+    path.parent.mkdir(parents=True)
+    Image.new("RGBA", (1000, 500), (200, 100, 50, 128)).save(path)
+    return tmp_path
+
+
+class TestRenderVariants:
+    def test_every_width_and_format_is_written(self, stored_photo):
+        """Test derivatives are resized, re-encoded and never upscaled"""
+        # Execute
+        written = render_variants(str(stored_photo), NAME)
+
+        # Assert
+        assert len(written) == 9
+        for fmt in ("avif", "webp", "jpeg"):
+            with Image.open(stored_photo / variant_name(NAME, 320, fmt)) as im:
+                assert im.size == (320, 160)
+                assert im.format == fmt.upper()
+        # Already present, so a second run does nothing
+        assert render_variants(str(stored_photo), NAME) == []
+
+    def test_unreadable_photo_is_skipped(self, tmp_path):
+        """Test a file Pillow cannot open produces no variants"""
+        (tmp_path / "photo.jpg").write_bytes(b"not an image")
+        assert render_variants(str(tmp_path), "photo.jpg") == []
+
+
+class TestNegotiation:
+    def test_accepted_formats(self):
+        """Test only explicitly accepted modern formats are offered"""
+        chrome = "image/avif,image/webp,image/apng,image/*,*/*;q=0.8"
+        assert accepted_formats(chrome) == ["avif", "webp", "jpeg"]
+        assert accepted_formats("image/webp;q=0,*/*") == ["jpeg"]
+        assert accepted_formats(None) == ["jpeg"]
+
+    def test_pick_width(self):
+        """Test the smallest variant covering the requested width wins"""
+        assert pick_width(100) == 160
+        assert pick_width(161) == 320
+        assert pick_width(5000) == 640
+        assert pick_width(None) == 640
+
+
+class TestPhotoEndpoint:
+    def test_serves_negotiated_variant(self, test_app, stored_photo):
+        """Test Accept and w pick the derivative"""
+        # Setup
+        render_variants(str(stored_photo), NAME)
+        with patch("main.photo_store", PhotoStore(stored_photo)), patch(
+            "main.variant_pipeline", VariantPipeline(stored_photo)
+        ):
+            # Execute
+            webp = test_app.get(
+                f"/photos/{NAME}?w=150", headers={"Accept": "image/webp"}
+            )
+            jpeg = test_app.get(f"/photos/{NAME}?w=600")
+
+        # Assert
+        assert webp.status_code == status.HTTP_200_OK
+        assert webp.headers["content-type"] == "image/webp"
+        assert webp.headers["vary"] == "Accept"
+        assert Image.open(io.BytesIO(webp.content)).size == (160, 80)
+        assert jpeg.headers["content-type"] == "image/jpeg"
+        assert Image.open(io.BytesIO(jpeg.content)).size == (640, 320)
+
+    def test_original_until_variants_exist(self, test_app, stored_photo):
+        """Test the original is served while the pipeline catches up"""
+        with patch("main.photo_store", PhotoStore(stored_photo)), patch(
+            "main.variant_pipeline", VariantPipeline(stored_photo)
+        ):
+            response = test_app.get(f"/photos/{NAME}?w=150")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-type"] == "image/png"
+
+    def test_unknown_photo(self, test_app):
+        """Test names that are not content-addressed are rejected"""
+        response = test_app.get("/photos/../petshop.db")
+        assert response.status_code == status.HTTP_404_NOT_FOUND
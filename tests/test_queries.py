@@ -0,0 +1,111 @@
+import contextvars
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from database import Owner, Pet, QueryStats, statement_shape, track_queries
+from main import app
+from metrics import QueryAccountingMiddleware
+
+
+def _seed(db_engine, owners=3, pets_each=2):
+    with Session(db_engine) as db:
+        for i in range(owners):
+            owner = Owner(name=f"Owner {i}")
+            owner.pets = [Pet(name=f"Pet {i}.{j}") for j in range(pets_each)]
+            db.add(owner)
+        db.commit()
+
+
+class TestQueryStats:
+    def test_shape_ignores_in_list_length_and_whitespace(self):
+        """Test IN lists of any length and reflowed SQL share a shape"""
+        assert statement_shape(
+            "SELECT * FROM pets\n WHERE owner_id IN (?, ?, ?)"
+        ) == statement_shape("SELECT * FROM pets WHERE owner_id IN (?)")
+
+    def test_repeated_shapes_reported(self):
+        """Test only shapes above the threshold are flagged"""
+        # Setup
+        stats = QueryStats()
+        for owner_id in range(6):
+            stats.record("SELECT * FROM pets WHERE owner_id = ?", 0.001)
+        stats.record("SELECT * FROM owners", 0.001)
+
+        # Execute
+        repeated = stats.repeated(threshold=5)
+
+        # Assert
+        assert stats.count == 7
+        assert repeated == [("SELECT * FROM pets WHERE owner_id = ?", 6)]
+
+    def test_tracks_queries_in_current_context(self, sqlite_engine):
+        """Test the engine listeners count into the active tracker"""
+
+        # Setup
+        def run_queries():
+            stats = track_queries()
+            with sqlite_engine.connect() as conn:
+                conn.exec_driver_sql("SELECT 1")
+                conn.exec_driver_sql("SELECT 2")
+            return stats
+
+        # Execute
+        # In a copy so the tracker doesn't outlive the test
+        stats = contextvars.copy_context().run(run_queries)
+
+        # Assert
+        assert stats.count == 2
+        assert stats.seconds > 0
+
+
+class TestQueryAccountingMiddleware:
+    def test_headers_and_n_plus_one_warning(self, sqlite_app, capsys):
+        """Test query headers are added and repeated shapes reported"""
+        # Setup
+        client = TestClient(QueryAccountingMiddleware(app, threshold=0))
+
+        # Execute
+        response = client.get("/pets/")
+
+        # Assert
+        assert response.status_code == 200
+        assert int(response.headers["X-Query-Count"]) >= 1
+        assert response.headers["Server-Timing"].startswith("db;dur=")
+        assert "Possible N+1 in GET /pets/" in capsys.readouterr().out
+
+
+class TestQueryBudgets:
+    def test_list_pets(self, sqlite_app, sqlite_engine, query_budget):
+        """Test a page of pets is one query"""
+        _seed(sqlite_engine)
+        with query_budget(1):
+            assert sqlite_app.get("/pets/").status_code == 200
+
+    def test_owners_with_pets_not_n_plus_one(
+        self, sqlite_app, sqlite_engine, query_budget
+    ):
+        """Test embedding pets costs one extra query, not one per owner"""
+        _seed(sqlite_engine, owners=10)
+        with query_budget(2):
+            response = sqlite_app.get("/owners/?include=pets")
+        assert len(response.json()) == 10
+
+    def test_owners_with_pet_count_one_query(
+        self, sqlite_app, sqlite_engine, query_budget
+    ):
+        """Test pet counts come from the owners query itself"""
+        _seed(sqlite_engine, owners=10, pets_each=3)
+        with query_budget(1):
+            response = sqlite_app.get("/owners/?include=pet_count&limit=5")
+        assert [o["pet_count"] for o in response.json()] == [3] * 5
+
+    def test_budget_exceeded_fails(
+        self, sqlite_app, sqlite_engine, query_budget
+    ):
+        """Test the helper fails with the statements it saw"""
+        _seed(sqlite_engine)
+        with pytest.raises(AssertionError, match="budget 0"):
+            with query_budget(0):
+                sqlite_app.get("/pets/")
@@ -6,6 +6,7 @@ from exceptions import (
     EntityNotFoundError,
     IntegrityConstraintError,
     DatabaseError,
+    PhotoTooLargeError,
 )
 
 
@@ -73,6 +74,14 @@ class TestResult:
         assert http_error.status_code == 500
         assert http_error.detail == "Database error"
 
+    def test_as_http_error_photo_too_large(self):
+        """Test as_http_error with PhotoTooLargeError"""
+        result = Result.err(PhotoTooLargeError("Photo too large"))
+        http_error = result.as_http_error()
+        assert isinstance(http_error, HTTPException)
+        assert http_error.status_code == 413
+        assert http_error.detail == "Photo too large"
+
     def test_as_http_error_generic_exception(self):
         """Test as_http_error with generic exception"""
         result = Result.err(Exception("Unknown error"))
@@ -0,0 +1,143 @@
+import json
+import random
+
+import pytest
+from sqlalchemy import create_engine, func, select
+
+from database import Base, Owner, Pet
+from sample_data import (
+    Distributions,
+    generate,
+    load_distributions,
+    parse_weights,
+    pet_rows,
+)
+
+
+@pytest.fixture
+def db_engine(tmp_path):
+    db_engine = create_engine(f"sqlite:///{tmp_path / 'sample.db'}")
+    Base.metadata.create_all(db_engine)
+    yield db_engine
+    db_engine.dispose()
+
+
+class TestGenerate:
+    def test_inserts_requested_rows_in_chunks(self, db_engine):
+        """Test counts, ownership and unique emails across chunks"""
+        # Execute
+        with db_engine.begin() as conn:
+            generate(conn, owners=25, pets=80, chunk_size=7)
+
+        # Assert
+        with db_engine.connect() as conn:
+            assert conn.execute(select(func.count(Owner.id))).scalar() == 25
+            assert conn.execute(select(func.count(Pet.id))).scalar() == 80
+            emails = conn.execute(
+                select(func.count(func.distinct(Owner.email)))
+            ).scalar()
+            assert emails == 25
+            owner_ids = set(conn.execute(select(Pet.owner_id)).scalars())
+            assert owner_ids <= set(range(1, 26))
+
+    def test_appends_after_existing_rows(self, db_engine):
+        """Test a second run continues from the current max ids"""
+        # Setup
+        with db_engine.begin() as conn:
+            generate(conn, owners=3, pets=5)
+
+        # Execute
+        with db_engine.begin() as conn:
+            first_owner, first_pet = generate(conn, owners=2, pets=4, seed=1)
+
+        # Assert
+        assert (first_owner, first_pet) == (4, 6)
+        with db_engine.connect() as conn:
+            new_owners = set(
+                conn.execute(select(Pet.owner_id).where(Pet.id >= 6)).scalars()
+            )
+            assert new_owners <= {4, 5}
+
+    def test_pets_without_owners_rejected(self, db_engine):
+        """Test pets can't be generated without owners to attach them to"""
+        with db_engine.begin() as conn, pytest.raises(ValueError):
+            generate(conn, owners=0, pets=1)
+
+
+class TestPetRows:
+    def test_same_seed_same_rows(self):
+        """Test generation is deterministic for a seed"""
+        # Execute
+        first = list(pet_rows(random.Random(7), 1, 50, (1, 10)))
+        second = list(pet_rows(random.Random(7), 1, 50, (1, 10)))
+
+        # Assert
+        assert first == second
+
+    def test_follows_distributions(self):
+        """Test species, breeds, ages and weights come from the config"""
+        # Setup
+        distributions = Distributions(
+            species={"Cat": 1},
+            breeds={"Cat": {"Siamese": 1}},
+            lifespans={"Cat": 4},
+            weights_kg={"Cat": (5.0, 0.0)},
+        )
+
+        # Execute
+        rows = list(pet_rows(random.Random(0), 1, 200, (1, 1), distributions))
+
+        # Assert
+        assert {row["species"] for row in rows} == {"Cat"}
+        assert {row["breed"] for row in rows} == {"Siamese"}
+        assert {row["weight"] for row in rows} == {5.0}
+        assert all(0 <= row["age"] < 4 for row in rows)
+
+    def test_unconfigured_species_gets_defaults(self):
+        """Test a species without breed or weight tables still generates"""
+        # Execute
+        rows = list(
+            pet_rows(
+                random.Random(0),
+                1,
+                20,
+                (1, 1),
+                Distributions(species={"Ferret": 1}),
+            )
+        )
+
+        # Assert
+        assert all(row["breed"] is None for row in rows)
+        assert all(row["weight"] is None for row in rows)
+        assert all(0 <= row["age"] < 15 for row in rows)
+
+
+class TestConfiguration:
+    def test_parse_weights(self):
+        """Test NAME=WEIGHT pairs are parsed"""
+        assert parse_weights(["Dog=3", "Cat=1.5"]) == {"Dog": 3.0, "Cat": 1.5}
+        with pytest.raises(ValueError):
+            parse_weights(["Dog"])
+
+    def test_load_distributions_overrides_fields(self, tmp_path):
+        """Test a JSON file replaces only the fields it names"""
+        # Setup
+        path = tmp_path / "dist.json"
+        path.write_text(
+            json.dumps({"species": {"Dog": 1}, "weights_kg": {"Dog": [9, 1]}})
+        )
+
+        # Execute
+        distributions = load_distributions(str(path))
+
+        # Assert
+        assert distributions.species == {"Dog": 1}
+        assert distributions.weights_kg == {"Dog": (9, 1)}
+        assert distributions.lifespans == Distributions().lifespans
+
+    def test_load_distributions_rejects_unknown_fields(self, tmp_path):
+        """Test typos in the JSON file are reported"""
+        path = tmp_path / "dist.json"
+        path.write_text(json.dumps({"specie": {"Dog": 1}}))
+        with pytest.raises(ValueError):
+            load_distributions(str(path))
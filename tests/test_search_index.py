@@ -0,0 +1,64 @@
+from sqlalchemy import create_engine, text
+
+from database import Base
+from search_index import create_search_index, match_query, rebuild_search_index
+
+
+def _matches(conn, fts, query):
+    return (
+        conn.execute(
+            text(
+                f"SELECT rowid FROM {fts} WHERE {fts} MATCH :q ORDER BY rowid"
+            ),
+            {"q": match_query(query)},
+        )
+        .scalars()
+        .all()
+    )
+
+
+class TestMatchQuery:
+    def test_words_become_prefix_terms(self):
+        """Test every word is quoted and prefix-matched"""
+        assert match_query("Golden retr") == '"Golden"* "retr"*'
+
+    def test_fts_syntax_is_neutralised(self):
+        """Test FTS5 operators and quotes in user input are dropped"""
+        assert match_query('a" OR b*') == '"a"* "OR"* "b"*'
+        assert match_query('"*() -') is None
+
+
+class TestSearchIndex:
+    def test_triggers_keep_index_in_sync(self, tmp_path):
+        """Test inserts, updates and deletes are reflected in the index"""
+        # Setup
+        db_engine = create_engine(f"sqlite:///{tmp_path / 'search.db'}")
+        Base.metadata.create_all(db_engine)
+        with db_engine.begin() as conn:
+            conn.execute(text("INSERT INTO owners (id, name) VALUES (1, 'A')"))
+            conn.execute(
+                text(
+                    "INSERT INTO pets (id, name, owner_id, breed) "
+                    "VALUES (1, 'Goldie', 1, 'Goldfish')"
+                )
+            )
+            # Rows that predate the index are picked up by a rebuild
+            rebuild_search_index(conn)
+            create_search_index(conn)
+
+            # Execute
+            conn.execute(
+                text(
+                    "INSERT INTO pets (id, name, owner_id, breed) "
+                    "VALUES (2, 'Rex', 1, 'Golden Retriever')"
+                )
+            )
+            conn.execute(text("UPDATE pets SET name = 'Zed' WHERE id = 2"))
+            conn.execute(text("DELETE FROM pets WHERE id = 1"))
+
+            # Assert
+            assert _matches(conn, "pets_fts", "gold") == [2]
+            assert _matches(conn, "pets_fts", "zed") == [2]
+            assert _matches(conn, "pets_fts", "rex") == []
+            assert _matches(conn, "owners_fts", "a") == [1]
+        db_engine.dispose()
@@ -0,0 +1,83 @@
+from unittest.mock import patch
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from cache import response_cache
+from database import Owner, Pet
+from result import Result
+from schemas import OwnerRead, OwnerReadBase, PetRead
+from serialization import dump_list, list_adapter
+
+
+def _default(schema, items) -> bytes:
+    content = jsonable_encoder([schema.model_validate(i) for i in items])
+    return bytes(JSONResponse(content=content).body)
+
+
+def _pets():
+    return [
+        Pet(
+            id=1,
+            name='Flüffy "the" 😺\n',
+            owner_id=1,
+            weight=1e-05,
+            age=2,
+            photo_filename="ab/cd/" + "a" * 64 + ".jpg",
+        ),
+        Pet(id=2, name="Rex", owner_id=1, weight=1e16, is_vaccinated=True),
+        Pet(id=3, name="Tweety", owner_id=2, weight=4.5),
+    ]
+
+
+class TestDumpList:
+    def test_pets_match_default_bytes(self):
+        """Test unicode, escapes, exponent floats and computed fields"""
+        pets = _pets()
+        assert dump_list(PetRead, pets) == _default(PetRead, pets)
+
+    def test_nested_owners_match_default_bytes(self):
+        """Test owners with embedded pets render identically"""
+        # Setup
+        owner = Owner(id=1, name="Alice", email="alice@example.com")
+        owner.pets = _pets()[:2]
+        owners = [owner, Owner(id=2, name="Bob", pets=[])]
+
+        # Execute / Assert
+        assert dump_list(OwnerRead, owners) == _default(OwnerRead, owners)
+        assert dump_list(OwnerReadBase, owners) == _default(
+            OwnerReadBase, owners
+        )
+
+    def test_empty_list(self):
+        """Test no rows renders an empty array"""
+        assert dump_list(PetRead, []) == b"[]"
+
+    def test_adapter_is_cached(self):
+        """Test the TypeAdapter is built once per schema"""
+        assert list_adapter(PetRead) is list_adapter(PetRead)
+
+
+class TestFastListEndpoint:
+    def test_same_response_as_default(self, test_app):
+        """Test the fast path keeps the body, ETag and cursor header"""
+        # Setup
+        pets = _pets()
+        responses = []
+
+        # Execute
+        for fast in (False, True):
+            with patch("main.FAST_SERIALIZATION", fast), patch(
+                "crud.get_pets", return_value=Result.ok(pets)
+            ):
+                responses.append(test_app.get("/pets/?limit=2"))
+            # So the second request isn't answered from the cache
+            response_cache.invalidate()
+
+        # Assert
+        default, fast = responses
+        assert fast.status_code == default.status_code == 200
+        assert fast.content == default.content
+        assert fast.headers["content-type"] == default.headers["content-type"]
+        assert fast.headers["etag"] == default.headers["etag"]
+        assert fast.headers["x-next-cursor"] == "2"